@@ -0,0 +1,103 @@
+"""Compare decoding single-object encoded messages with and without resolution plans.
+
+Decoding used to pass both the writer and reader schemas to fastavro for every message, so fastavro resolved every
+record. With resolution plans, fastavro only resolves records when the schemas differ in ways the plan can't handle
+itself, such as type promotions. Run from the root of the repository:
+
+    python -m benchmarks.resolution_plans
+"""
+
+import copy
+import json
+import timeit
+from unittest.mock import patch
+
+from lab_share_lib.rabbit.avro_encoder import AvroEncoderBinaryMessage
+from lab_share_lib.rabbit.resolution_plan import ResolutionPlan
+from lab_share_lib.rabbit.schema_registry import RESPONSE_KEY_SCHEMA, RESPONSE_KEY_VERSION
+
+DECODES = 20000
+FIELD_COUNT = 30
+
+WRITER_SCHEMA = {
+    "type": "record",
+    "name": "sample",
+    "fields": [{"name": f"field_{index}", "type": ["null", "string"]} for index in range(FIELD_COUNT)],
+}
+RECORD = {f"field_{index}": f"value {index}" for index in range(FIELD_COUNT)}
+
+
+def with_defaults(schema):
+    schema = copy.deepcopy(schema)
+    for field in schema["fields"]:
+        field["default"] = None
+    return schema
+
+
+def with_field_added(schema):
+    schema = copy.deepcopy(schema)
+    schema["fields"].append({"name": "volume", "type": "int", "default": 10})
+    return schema
+
+
+def with_field_removed(schema):
+    schema = copy.deepcopy(schema)
+    del schema["fields"][0]
+    return schema
+
+
+def with_type_promoted(schema):
+    schema = copy.deepcopy(schema)
+    schema["fields"][0]["type"] = ["null", "bytes"]
+    return schema
+
+
+class SchemaRegistry:
+    """A registry serving schemas from memory, so the benchmark measures decoding rather than the registry."""
+
+    def __init__(self, schemas):
+        self._responses = {
+            version: {RESPONSE_KEY_SCHEMA: json.dumps(schema), RESPONSE_KEY_VERSION: int(version)}
+            for version, schema in schemas.items()
+        }
+
+    def get_schema(self, subject, schema_version="latest"):
+        return self._responses[schema_version]
+
+
+class AlwaysResolvePlanCache:
+    """Plans to resolve every pair of schemas, which is how messages were decoded before resolution plans."""
+
+    def get(self, writer_schema, reader_schema):
+        return ResolutionPlan(writer_schema.schema, reader_schema.schema)
+
+
+def time_decodes(encoder, body):
+    return min(timeit.repeat(lambda: encoder.decode(body, "2", "1"), number=DECODES, repeat=3))
+
+
+def benchmark(name, reader_schema):
+    # Each benchmark has its own subject so they don't share schemas in the parsed schema cache.
+    encoder = AvroEncoderBinaryMessage(SchemaRegistry({"1": WRITER_SCHEMA, "2": reader_schema}), name)
+    body = encoder.encode_single_object(RECORD, "1").body
+
+    with patch("lab_share_lib.rabbit.avro_encoder.RESOLUTION_PLAN_CACHE", AlwaysResolvePlanCache()):
+        without_plan = time_decodes(encoder, body)
+    with_plan = time_decodes(encoder, body)
+
+    print(
+        f"{name:<20} without plan: {without_plan:.3f}s  with plan: {with_plan:.3f}s  "
+        f"speed up: {without_plan / with_plan:.2f}x  ({DECODES} decodes)"
+    )
+
+
+def main():
+    benchmark("same schema", WRITER_SCHEMA)
+    benchmark("defaults added", with_defaults(WRITER_SCHEMA))
+    benchmark("field added", with_field_added(WRITER_SCHEMA))
+    benchmark("field removed", with_field_removed(WRITER_SCHEMA))
+    benchmark("type promoted", with_type_promoted(WRITER_SCHEMA))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,9 +6,19 @@ from processors import Example1MessageProcessor
 
 LOCALHOST = os.getenv("LOCALHOST", "localhost")
 
-# REDPANDA_BASE_URI defines the URL where the Redpanda service is running
+# REDPANDA_BASE_URI defines the URL where the Redpanda service is running. It can also be a list of the URLs of several
+# Redpanda nodes, in which case requests that a node is slow to answer are repeated on the next node. The percentile of
+# a node's recent response times to wait for before repeating a request can be set with REDPANDA_HEDGE_PERCENTILE.
 REDPANDA_BASE_URI = f"http://{ LOCALHOST }:8081"
 
+# REDPANDA_SCHEMA_SNAPSHOT_DIR optionally defines a directory to save fetched schemas in, so they are loaded from disk
+# when the consumer restarts and remain available while the Redpanda service can't be reached.
+# REDPANDA_SCHEMA_SNAPSHOT_DIR = "/tmp/lab-share-schemas"
+
+# REDPANDA_SCHEMA_FILES_DIR optionally defines a directory of schema files to use instead of the Redpanda service,
+# with a directory per subject holding a `<version>.avsc` file per schema version.
+# REDPANDA_SCHEMA_FILES_DIR = "/path/to/schemas"
+
 # Define one (or more) Rabbit servers to consume from and publish to.
 RABBIT_SERVER_DETAILS = RabbitServerDetails(
     uses_ssl=False,  # Whether to use SSL/TLS for the connection
@@ -43,3 +53,17 @@ RABBITMQ_PUBLISH_RETRY_DELAY = 5
 
 # RABBITMQ_PUBLISH_RETRIES is the number of retries we will perform
 RABBITMQ_PUBLISH_RETRIES = 36
+
+# RABBITMQ_PUBLISH_OUTBOX_PATH optionally defines a directory for a durable outbox per RabbitMQ server. Messages that
+# can't be published are saved there instead of retrying while the consumer waits, and are published in order from a
+# background thread, waiting RABBITMQ_PUBLISH_RETRY_DELAY seconds between attempts, once the server accepts them again.
+# RABBITMQ_PUBLISH_OUTBOX_PATH = "/var/lib/lab-share/outbox"
+
+# RABBITMQ_BLOCKED_CONNECTION_TIMEOUT optionally overrides the number of seconds a publish waits while RabbitMQ has
+# blocked the connection for a memory or disk alarm before giving up with a ConnectionBlockedError (default 60).
+# RABBITMQ_BLOCKED_CONNECTION_TIMEOUT = 60
+
+# RABBITMQ_PUBLISH_BLOCKED_BUFFER_SIZE optionally sets how many messages a publisher buffers in memory while its
+# connection is blocked, to publish once it is unblocked. Beyond that, or with the default of 0, publishing raises a
+# ConnectionBlockedError straight away so the message can be processed again later.
+# RABBITMQ_PUBLISH_BLOCKED_BUFFER_SIZE = 100
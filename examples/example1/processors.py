@@ -4,18 +4,18 @@ from typing import Any
 from lab_share_lib.processing.base_processor import BaseProcessor
 from lab_share_lib.processing.rabbit_message import RabbitMessage
 from lab_share_lib.rabbit.basic_publisher import BasicPublisher
-from lab_share_lib.rabbit.schema_registry import SchemaRegistry
+from lab_share_lib.rabbit.schema_registry import SchemaRegistryBase
 
 
 class Example1MessageProcessor(BaseProcessor):
-    def __init__(self, schema_registry: SchemaRegistry, basic_publisher: BasicPublisher, config: Any):
+    def __init__(self, schema_registry: SchemaRegistryBase, basic_publisher: BasicPublisher, config: Any):
         """Store the provided arguments for use during processing."""
         self._basic_publisher = basic_publisher
         self._schema_registry = schema_registry
         self._config = config
 
     @staticmethod
-    def instantiate(schema_registry: SchemaRegistry, basic_publisher: BasicPublisher, config: Any) -> BaseProcessor:
+    def instantiate(schema_registry: SchemaRegistryBase, basic_publisher: BasicPublisher, config: Any) -> BaseProcessor:
         """Instantiate the processor."""
         return Example1MessageProcessor(schema_registry, basic_publisher, config)
 
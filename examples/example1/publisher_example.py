@@ -30,3 +30,4 @@ publisher.publish_message(
     encoded_message.version,
     RABBITMQ_HEADER_VALUE_ENCODER_TYPE_BINARY,
 )
+publisher.close()
@@ -1,7 +1,8 @@
-from dataclasses import dataclass
-from typing import Dict, Type
+from dataclasses import dataclass, field
+from typing import Dict, List, Type
 
 from lab_share_lib.config.rabbit_server_details import RabbitServerDetails
+from lab_share_lib.constants import VALIDATION_MODE_FULL, VALIDATION_SAMPLE_RATE_DEFAULT, ValidationMode
 from lab_share_lib.processing.base_processor import BaseProcessor
 
 
@@ -9,6 +10,10 @@ from lab_share_lib.processing.base_processor import BaseProcessor
 class MessageSubjectConfig:
     processor: Type[BaseProcessor]
     reader_schema_version: str
+    validation_mode: ValidationMode = VALIDATION_MODE_FULL
+    validation_sample_rate: int = VALIDATION_SAMPLE_RATE_DEFAULT
+    # Schema versions that messages for the subject are known to be written with, fetched when prewarming.
+    writer_schema_versions: List[str] = field(default_factory=list)
 
 
 @dataclass
@@ -1,9 +1,11 @@
-from lab_share_lib.rabbit.schema_registry import SchemaRegistry
+from lab_share_lib.rabbit.file_schema_registry import FileSchemaRegistry
+from lab_share_lib.rabbit.schema_registry import SchemaRegistry, SchemaRegistryBase
 from lab_share_lib.config.rabbit_server_details import RabbitServerDetails
 from lab_share_lib.rabbit.basic_publisher import BasicPublisher
+from lab_share_lib.rabbit.publish_outbox import get_publish_outbox
 import sys
 import os
-from typing import Tuple, cast
+from typing import Any, Dict, Tuple, cast
 from importlib import import_module
 
 from lab_share_lib.types import Config
@@ -31,14 +33,43 @@ def get_config(settings_module: str = "") -> Tuple[Config, str]:
         sys.exit(f"{e} required in environment variables for config.")
 
 
-def get_redpanda_schema_registry(config: Config) -> SchemaRegistry:
+def get_redpanda_schema_registry(config: Config) -> SchemaRegistryBase:
+    schema_files_dir = getattr(config, "REDPANDA_SCHEMA_FILES_DIR", None)
+    if schema_files_dir:
+        return FileSchemaRegistry(schema_files_dir)
+
     redpanda_url = config.REDPANDA_BASE_URI
-    return SchemaRegistry(redpanda_url)
+    registry_options: Dict[str, Any] = {}
+
+    snapshot_dir = getattr(config, "REDPANDA_SCHEMA_SNAPSHOT_DIR", None)
+    if snapshot_dir:
+        registry_options["snapshot_dir"] = snapshot_dir
+
+    hedge_percentile = getattr(config, "REDPANDA_HEDGE_PERCENTILE", None)
+    if hedge_percentile is not None:
+        registry_options["hedge_percentile"] = hedge_percentile
+
+    return SchemaRegistry(redpanda_url, **registry_options)
 
 
 def get_basic_publisher(server_details: RabbitServerDetails, config: Config) -> BasicPublisher:
+    publisher_options: Dict[str, Any] = {}
+
+    outbox_path = getattr(config, "RABBITMQ_PUBLISH_OUTBOX_PATH", None)
+    if outbox_path:
+        publisher_options["outbox"] = get_publish_outbox(outbox_path, server_details)
+
+    blocked_connection_timeout = getattr(config, "RABBITMQ_BLOCKED_CONNECTION_TIMEOUT", None)
+    if blocked_connection_timeout is not None:
+        publisher_options["blocked_connection_timeout"] = blocked_connection_timeout
+
+    blocked_buffer_size = getattr(config, "RABBITMQ_PUBLISH_BLOCKED_BUFFER_SIZE", None)
+    if blocked_buffer_size is not None:
+        publisher_options["blocked_buffer_size"] = blocked_buffer_size
+
     return BasicPublisher(
         server_details,
         config.RABBITMQ_PUBLISH_RETRY_DELAY,
         config.RABBITMQ_PUBLISH_RETRIES,
+        **publisher_options,
     )
@@ -4,16 +4,75 @@ RABBITMQ_HEADER_KEY_SUBJECT: Final[str] = "subject"
 RABBITMQ_HEADER_KEY_VERSION: Final[str] = "version"
 RABBITMQ_HEADER_KEY_ENCODER_TYPE: Final[str] = "encoder_type"
 
-EncoderType = Literal["binary", "json"]
+EncoderType = Literal["binary", "json", "confluent"]
 ENCODER_TYPE_BINARY: Final[EncoderType] = "binary"
 ENCODER_TYPE_JSON: Final[EncoderType] = "json"
+# Binary records framed with the Confluent wire format: a zero magic byte followed by the 4-byte schema registry ID.
+ENCODER_TYPE_CONFLUENT: Final[EncoderType] = "confluent"
 
 RABBITMQ_HEADER_VALUE_ENCODER_TYPE_BINARY: Final[str] = ENCODER_TYPE_BINARY
 RABBITMQ_HEADER_VALUE_ENCODER_TYPE_JSON: Final[str] = ENCODER_TYPE_JSON
+RABBITMQ_HEADER_VALUE_ENCODER_TYPE_CONFLUENT: Final[str] = ENCODER_TYPE_CONFLUENT
 RABBITMQ_HEADER_VALUE_ENCODER_TYPE_DEFAULT: Final[str] = "default"
 
 SCHEMA_VERSION = "schema_version"
 
+# How decoded messages are validated against the reader schema before being processed:
+# - "full" validates every message.
+# - "sampled" validates one message in every `validation_sample_rate` for the subject.
+# - "trusted-decode" skips validation, trusting that decoding with the reader schema produced data that fits it.
+ValidationMode = Literal["full", "sampled", "trusted-decode"]
+VALIDATION_MODE_FULL: Final[ValidationMode] = "full"
+VALIDATION_MODE_SAMPLED: Final[ValidationMode] = "sampled"
+VALIDATION_MODE_TRUSTED_DECODE: Final[ValidationMode] = "trusted-decode"
+VALIDATION_SAMPLE_RATE_DEFAULT: Final[int] = 100
+
+# Schema registry responses cached per process. Numbered schema versions never change so they are kept until evicted,
+# while aliases such as "latest" expire after a minute. Errors and responses for missing schemas are kept briefly.
+SCHEMA_CACHE_MAX_SIZE_DEFAULT: Final[int] = 1024
+SCHEMA_CACHE_ALIAS_TTL_DEFAULT: Final[float] = 60.0
+SCHEMA_CACHE_NEGATIVE_TTL_DEFAULT: Final[float] = 5.0
+
+# Requests to the schema registry share a pool of keep-alive connections. Connection errors, timeouts and server errors
+# are retried with exponential backoff and full jitter before the registry is treated as unavailable.
+SCHEMA_REGISTRY_CONNECT_TIMEOUT_DEFAULT: Final[float] = 3.05
+SCHEMA_REGISTRY_READ_TIMEOUT_DEFAULT: Final[float] = 10.0
+SCHEMA_REGISTRY_MAX_RETRIES_DEFAULT: Final[int] = 3
+SCHEMA_REGISTRY_BACKOFF_BASE_DEFAULT: Final[float] = 0.1
+SCHEMA_REGISTRY_BACKOFF_MAX_DEFAULT: Final[float] = 2.0
+SCHEMA_REGISTRY_POOL_SIZE_DEFAULT: Final[int] = 10
+
+# With several schema registry endpoints, a request that hasn't been answered within the given percentile of the
+# endpoint's recent latencies is repeated on the next endpoint, and whichever answers first is used. The fixed delay is
+# used until enough latencies have been seen. Endpoints that fail are avoided for the cooldown.
+SCHEMA_REGISTRY_HEDGE_PERCENTILE_DEFAULT: Final[float] = 95.0
+SCHEMA_REGISTRY_HEDGE_DELAY_DEFAULT: Final[float] = 0.25
+SCHEMA_REGISTRY_LATENCY_WINDOW_DEFAULT: Final[int] = 100
+SCHEMA_REGISTRY_LATENCY_MIN_SAMPLES: Final[int] = 10
+SCHEMA_REGISTRY_ENDPOINT_COOLDOWN_DEFAULT: Final[float] = 30.0
+
+# How long a publisher waits for the broker to confirm a batch of messages before treating the unconfirmed ones as
+# failed and publishing them again.
+RABBITMQ_PUBLISH_CONFIRM_TIMEOUT_DEFAULT: Final[float] = 30.0
+
+# The number of messages an asyncio publisher sends without waiting for the broker to confirm them.
+RABBITMQ_PUBLISH_MAX_OUTSTANDING_CONFIRMS_DEFAULT: Final[int] = 256
+
+# A background publisher queues up to this many messages from other threads, blocking them when the queue is full, and
+# publishes up to the batch size of them at a time. While idle, it answers the broker's heartbeats at the interval.
+RABBITMQ_PUBLISH_QUEUE_SIZE_DEFAULT: Final[int] = 1000
+RABBITMQ_PUBLISH_BATCH_SIZE_DEFAULT: Final[int] = 100
+RABBITMQ_PUBLISH_KEEP_ALIVE_INTERVAL: Final[float] = 5.0
+
+# RabbitMQ blocks publishers' connections while it has a memory or disk alarm. A publisher gives up on a blocked
+# connection after the timeout. Meanwhile, it holds up to the buffer size of messages to publish once unblocked, and
+# raises a ConnectionBlockedError for any more, so the default of 0 fails fast.
+RABBITMQ_BLOCKED_CONNECTION_TIMEOUT_DEFAULT: Final[float] = 60.0
+RABBITMQ_PUBLISH_BLOCKED_BUFFER_SIZE_DEFAULT: Final[int] = 0
+
+# The number of threads used to fetch schemas and instantiate processors when prewarming a RabbitStack.
+PREWARM_MAX_WORKERS_DEFAULT: Final[int] = 8
+
 
 ###
 # Logger names
@@ -24,3 +83,5 @@ AVRO_BINARY_COMPRESSION_CODEC_NULL = "null"
 AVRO_BINARY_COMPRESSION_CODEC_DEFLATE = "deflate"
 AVRO_BINARY_COMPRESSION_CODEC_SNAPPY = "snappy"
 AVRO_BINARY_COMPRESSION_CODEC_DEFAULT = AVRO_BINARY_COMPRESSION_CODEC_NULL
+
+AVRO_BINARY_PARALLEL_DECODE_CHUNK_SIZE_DEFAULT = 1024 * 1024
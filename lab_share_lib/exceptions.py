@@ -17,3 +17,11 @@ class TransientRabbitError(Error):
             message {str} -- A message to log and possibly show to the user/caller.
         """
         self.message = message
+
+
+class ConnectionBlockedError(TransientRabbitError):
+    """
+    Raised when a message can't be published because RabbitMQ has blocked the publisher's connection, e.g. during a
+    memory or disk alarm, and the message can't be held until it is unblocked.  The message should be processed again
+    later.
+    """
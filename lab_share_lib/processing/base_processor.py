@@ -3,14 +3,14 @@ from typing import Any
 
 from lab_share_lib.processing.rabbit_message import RabbitMessage
 from lab_share_lib.rabbit.basic_publisher import BasicPublisher
-from lab_share_lib.rabbit.schema_registry import SchemaRegistry
+from lab_share_lib.rabbit.schema_registry import SchemaRegistryBase
 
 
 class BaseProcessor(ABC):
     @staticmethod
     @abstractmethod
     def instantiate(
-        schema_registry: SchemaRegistry, basic_publisher: BasicPublisher, config: Any
+        schema_registry: SchemaRegistryBase, basic_publisher: BasicPublisher, config: Any
     ) -> "BaseProcessor": ...
 
     @abstractmethod
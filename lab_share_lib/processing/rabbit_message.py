@@ -3,6 +3,7 @@ from typing import List
 
 from lab_share_lib.constants import (
     ENCODER_TYPE_BINARY,
+    ENCODER_TYPE_CONFLUENT,
     LOGGER_NAME_RABBIT_MESSAGES,
     RABBITMQ_HEADER_KEY_ENCODER_TYPE,
     RABBITMQ_HEADER_KEY_SUBJECT,
@@ -33,15 +34,24 @@ class RabbitMessage:
     def writer_schema_version(self):
         return self.headers[RABBITMQ_HEADER_KEY_VERSION]
 
+    def _order_encoders(self, possible_encoders: List[AvroEncoderBase]) -> List[AvroEncoderBase]:
+        # Encoders that recognise the magic bytes at the start of the body are tried first, so the right encoder is
+        # usually the only one tried. The rest are kept, in their original order, in case the body wasn't recognised.
+        recognised = [encoder for encoder in possible_encoders if encoder.recognises(self.encoded_body)]
+        if not recognised:
+            LOGGER.debug("No encoder recognised the message body, so each encoder will be tried in turn.")
+
+        return recognised + [encoder for encoder in possible_encoders if encoder not in recognised]
+
     def decode(self, possible_encoders: List[AvroEncoderBase], reader_schema_version: str) -> AvroEncoderBase:
         exceptions = []
-        for encoder in possible_encoders:
+        for encoder in self._order_encoders(possible_encoders):
             try:
                 LOGGER.debug(f"Attempting to decode message with encoder class '{type(encoder).__name__}'.")
                 self._decoded_list = list(
                     encoder.decode(self.encoded_body, reader_schema_version, self.writer_schema_version)
                 )
-                if encoder.encoder_type == ENCODER_TYPE_BINARY:
+                if encoder.encoder_type in (ENCODER_TYPE_BINARY, ENCODER_TYPE_CONFLUENT):
                     MESSAGE_LOGGER.info(f"Decoded binary message body:\n{self._decoded_list}")
                 return encoder
             except ValueError as ex:
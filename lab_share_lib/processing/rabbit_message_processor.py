@@ -1,20 +1,28 @@
 import logging
 from fastavro.validation import ValidationError
-from typing import Any, Dict, List, Optional, Type
+from concurrent.futures import Executor, Future
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple, Type
 
 from lab_share_lib.config_readers import get_redpanda_schema_registry, get_basic_publisher
 from lab_share_lib.constants import (
     RABBITMQ_HEADER_VALUE_ENCODER_TYPE_DEFAULT,
     RABBITMQ_HEADER_VALUE_ENCODER_TYPE_JSON,
     RABBITMQ_HEADER_VALUE_ENCODER_TYPE_BINARY,
+    RABBITMQ_HEADER_VALUE_ENCODER_TYPE_CONFLUENT,
+    VALIDATION_MODE_SAMPLED,
+    VALIDATION_MODE_TRUSTED_DECODE,
 )
+from lab_share_lib.config.rabbit_config import MessageSubjectConfig
 from lab_share_lib.exceptions import TransientRabbitError
 from lab_share_lib.processing.base_processor import BaseProcessor
 from lab_share_lib.processing.rabbit_message import RabbitMessage
+from lab_share_lib.rabbit.basic_publisher import PublisherKeepAlive
 from lab_share_lib.rabbit.avro_encoder import (
     AvroEncoderBase,
     AvroEncoderBinaryFile,
     AvroEncoderBinaryMessage,
+    AvroEncoderConfluent,
     AvroEncoderJson,
 )
 from lab_share_lib.types import Config, RabbitConfig
@@ -24,6 +32,7 @@ LOGGER = logging.getLogger(__name__)
 ENCODERS: Dict[str, List[Type[AvroEncoderBase]]] = {
     RABBITMQ_HEADER_VALUE_ENCODER_TYPE_BINARY: [AvroEncoderBinaryMessage, AvroEncoderBinaryFile],
     RABBITMQ_HEADER_VALUE_ENCODER_TYPE_JSON: [AvroEncoderJson],
+    RABBITMQ_HEADER_VALUE_ENCODER_TYPE_CONFLUENT: [AvroEncoderConfluent],
     RABBITMQ_HEADER_VALUE_ENCODER_TYPE_DEFAULT: [AvroEncoderJson],
 }
 
@@ -35,8 +44,20 @@ class RabbitMessageProcessor:
 
         self._schema_registry = get_redpanda_schema_registry(app_config)
         self._basic_publisher = get_basic_publisher(rabbit_config.publisher_details, app_config)
+        # The processors only publish while handling messages, so the publisher's connection is kept alive in between.
+        self._publisher_keep_alive = PublisherKeepAlive(self._basic_publisher)
+        self._publisher_keep_alive.start()
 
         self.__processors: Optional[Dict[str, Any]] = None
+        self._validation_counts: Dict[str, int] = {}
+
+        # Encoders are built once per encoder type and subject so any state they warm up is kept between messages.
+        self._avro_encoders: Dict[Tuple[str, str], List[AvroEncoderBase]] = {}
+        self._avro_encoders_lock = Lock()
+
+    def close(self) -> None:
+        """Stop keeping the publisher's connection alive and close it."""
+        self._publisher_keep_alive.stop()
 
     @property
     def _processors(self) -> Dict[str, BaseProcessor]:
@@ -57,21 +78,66 @@ class RabbitMessageProcessor:
 
         return [encoder(self._schema_registry, subject) for encoder in ENCODERS[encoder_type]]
 
+    def _get_avro_encoders(self, encoder_type: str, subject: str) -> List[AvroEncoderBase]:
+        key = (encoder_type, subject)
+
+        with self._avro_encoders_lock:
+            if key not in self._avro_encoders:
+                self._avro_encoders[key] = self._build_avro_encoders(encoder_type, subject)
+
+            return self._avro_encoders[key]
+
+    def prewarm(self, executor: Executor) -> List[Future]:
+        """Submit tasks to instantiate the subject processors and to build and warm the encoders for every subject, so
+        the first messages consumed don't pay for it.
+
+        Arguments:
+            executor (Executor): the executor to run the tasks with.
+
+        Returns:
+            List[Future]: the futures of the submitted tasks.
+        """
+        return [executor.submit(lambda: self._processors)] + [
+            executor.submit(self._prewarm_subject, subject) for subject in self._rabbit_config.message_subjects
+        ]
+
+    def _prewarm_subject(self, subject: str) -> None:
+        subject_config = self._rabbit_config.message_subjects[subject]
+        versions = [subject_config.reader_schema_version, *subject_config.writer_schema_versions]
+
+        for encoder_type in ENCODERS:
+            for encoder in self._get_avro_encoders(encoder_type, subject):
+                encoder.warm(versions)
+
+    def _should_validate(self, subject: str, subject_config: MessageSubjectConfig) -> bool:
+        if subject_config.validation_mode == VALIDATION_MODE_TRUSTED_DECODE:
+            return False
+
+        if subject_config.validation_mode == VALIDATION_MODE_SAMPLED:
+            message_count = self._validation_counts.get(subject, 0)
+            self._validation_counts[subject] = message_count + 1
+
+            return message_count % max(subject_config.validation_sample_rate, 1) == 0
+
+        return True
+
     def process_message(self, headers, body):
         message = RabbitMessage(headers, body)
         subject = message.subject
 
         try:
-            reader_schema_version = self._rabbit_config.message_subjects[subject].reader_schema_version
+            subject_config = self._rabbit_config.message_subjects[subject]
         except KeyError:
             LOGGER.error(
                 f"Unrecoverable error: Subject '{subject}' not configured in the 'message_subjects' dictionary."
             )
             return False
 
+        reader_schema_version = subject_config.reader_schema_version
+
         try:
             used_encoder = message.decode(
-                self._build_avro_encoders(
+                self._get_avro_encoders(
                     message.encoder_type,
                     subject,
                 ),
@@ -88,11 +154,12 @@ class RabbitMessageProcessor:
             LOGGER.error("RabbitMQ message received containing multiple AVRO encoded messages.")
             return False  # Send the message to dead letters.
 
-        try:
-            used_encoder.validate(message.message, reader_schema_version)
-        except ValidationError as ex:
-            LOGGER.error(f"Decoded message failed schema validation: {ex}")
-            return False
+        if self._should_validate(subject, subject_config):
+            try:
+                used_encoder.validate(message.message, reader_schema_version)
+            except ValidationError as ex:
+                LOGGER.error(f"Decoded message failed schema validation: {ex}")
+                return False
 
         if subject not in self._processors.keys():
             LOGGER.error(
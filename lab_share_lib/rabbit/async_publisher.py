@@ -0,0 +1,336 @@
+import asyncio
+import logging
+import os
+import ssl
+from typing import Any, Callable, Dict, Optional, Union
+
+from pika import ConnectionParameters, PlainCredentials, SSLOptions
+from pika.adapters.asyncio_connection import AsyncioConnection
+from pika.channel import Channel
+from pika.exceptions import AMQPConnectionError, ConnectionBlockedTimeout
+from pika.frame import Method
+from pika.spec import Basic
+
+from lab_share_lib.config.rabbit_server_details import RabbitServerDetails
+from lab_share_lib.constants import (
+    LOGGER_NAME_RABBIT_MESSAGES,
+    RABBITMQ_BLOCKED_CONNECTION_TIMEOUT_DEFAULT,
+    RABBITMQ_HEADER_VALUE_ENCODER_TYPE_DEFAULT,
+    RABBITMQ_PUBLISH_CONFIRM_TIMEOUT_DEFAULT,
+    RABBITMQ_PUBLISH_MAX_OUTSTANDING_CONFIRMS_DEFAULT,
+)
+from lab_share_lib.exceptions import ConnectionBlockedError, TransientRabbitError
+from lab_share_lib.processing.rabbit_message import RabbitMessage
+from lab_share_lib.rabbit.async_consumer import AsyncConsumer
+from lab_share_lib.rabbit.basic_publisher import message_properties
+from lab_share_lib.rabbit.flow_control import FlowControl, FlowControlStats
+
+LOGGER = logging.getLogger(__name__)
+MESSAGE_LOGGER = logging.getLogger(LOGGER_NAME_RABBIT_MESSAGES)
+
+OnOpen = Callable[..., None]
+
+
+class AsyncPublisher:
+    """Publishes messages to a RabbitMQ server with publisher confirms from asyncio code, without blocking the event
+    loop. Messages have the same properties and headers as those published by `BasicPublisher`.
+
+    The connection and its confirm-mode channel are opened on the first publish, or by `connect`, and kept open. Each
+    publish waits for the broker to confirm its message, while any number of publishes can run at once: up to
+    `max_outstanding_confirms` messages are sent without waiting for earlier confirms, and further publishes wait for a
+    confirm to arrive before sending theirs. If the connection or channel closes, publishes waiting for a confirm raise
+    a TransientRabbitError and the next publish opens a new connection. A publish that isn't confirmed within
+    `confirm_timeout` seconds also raises a TransientRabbitError.
+
+    While RabbitMQ has blocked the connection for a memory or disk alarm, publishing raises a ConnectionBlockedError
+    straight away. Publishes already waiting for a confirm raise one if the connection stays blocked for longer than
+    `blocked_connection_timeout` seconds.
+
+    Use the publisher from a single event loop, and close it when done, e.g. with `async with`.
+    """
+
+    def __init__(
+        self,
+        server_details: RabbitServerDetails,
+        verify_cert: bool = True,
+        max_outstanding_confirms: int = RABBITMQ_PUBLISH_MAX_OUTSTANDING_CONFIRMS_DEFAULT,
+        confirm_timeout: float = RABBITMQ_PUBLISH_CONFIRM_TIMEOUT_DEFAULT,
+        blocked_connection_timeout: Optional[float] = RABBITMQ_BLOCKED_CONNECTION_TIMEOUT_DEFAULT,
+    ):
+        if max_outstanding_confirms < 1:
+            raise ValueError("AsyncPublisher max_outstanding_confirms must be at least 1.")
+
+        self._max_outstanding_confirms = max_outstanding_confirms
+        self._confirm_timeout = confirm_timeout
+        # Messages can't be buffered as each publish waits for its confirm, so publishing while blocked fails fast.
+        self._flow_control = FlowControl(0)
+        credentials = PlainCredentials(server_details.username, server_details.password)
+        self._connection_params = ConnectionParameters(
+            host=server_details.host,
+            port=server_details.port,
+            virtual_host=server_details.vhost,
+            credentials=credentials,
+            blocked_connection_timeout=blocked_connection_timeout,  # type: ignore[arg-type]
+        )
+
+        if server_details.uses_ssl:
+            cafile = os.getenv("REQUESTS_CA_BUNDLE")
+            ssl_context = ssl.create_default_context(cafile=cafile)
+            ssl_context.check_hostname = verify_cert
+            ssl_context.verify_mode = ssl.CERT_REQUIRED if verify_cert else ssl.CERT_NONE
+            self._connection_params.ssl_options = SSLOptions(ssl_context)
+
+        self._connection: Optional[AsyncioConnection] = None
+        self._channel: Optional[Channel] = None
+        self._closed: Optional["asyncio.Future[None]"] = None
+        self._opening: Optional["asyncio.Future[Any]"] = None
+        # Created on first use so they belong to the running event loop.
+        self._connect_lock: Optional[asyncio.Lock] = None
+        self._window: Optional[asyncio.Semaphore] = None
+        self._delivery_tag = 0
+        self._pending: Dict[int, "asyncio.Future[None]"] = {}
+
+    async def __aenter__(self) -> "AsyncPublisher":
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *_: Any) -> None:
+        await self.close()
+
+    @property
+    def outstanding_confirms(self) -> int:
+        return len(self._pending)
+
+    @property
+    def flow_control_stats(self) -> FlowControlStats:
+        return self._flow_control.stats
+
+    async def connect(self) -> None:
+        """Open the connection and confirm-mode channel, if they aren't already open.
+
+        Raises:
+            AMQPError: the connection or channel could not be opened.
+        """
+        await self._open()
+
+    def _init_loop_state(self) -> None:
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+            self._window = asyncio.Semaphore(self._max_outstanding_confirms)
+
+    async def _open(self) -> Channel:
+        if self._channel is not None and self._channel.is_open:
+            return self._channel
+
+        self._init_loop_state()
+        assert self._connect_lock is not None
+
+        async with self._connect_lock:
+            if self._channel is not None and self._channel.is_open:
+                return self._channel
+
+            if self._connection is None or not self._connection.is_open:
+                self._connection = await self._open_connection()
+
+            self._channel = await self._open_channel(self._connection)
+            return self._channel
+
+    async def publish(
+        self,
+        exchange: str,
+        routing_key: str,
+        body: bytes,
+        subject: str,
+        schema_version: str,
+        encoder_type: str = RABBITMQ_HEADER_VALUE_ENCODER_TYPE_DEFAULT,
+    ) -> None:
+        """Publish a message and wait for the broker to confirm it.
+
+        Arguments:
+            exchange (str): the exchange to publish to.
+            routing_key (str): the routing key of the message.
+            body (bytes): the encoded message.
+            subject (str): the schema subject of the message.
+            schema_version (str): the version of the schema the message was encoded with.
+            encoder_type (str): how the message was encoded.
+
+        Raises:
+            ConnectionBlockedError: RabbitMQ has blocked the connection.
+            TransientRabbitError: the broker nacked the message, the connection was lost before it was confirmed or the
+                confirm didn't arrive in time.
+            AMQPError: the connection or channel could not be opened.
+        """
+        LOGGER.info(
+            f"Publishing message to exchange '{exchange}', routing key '{routing_key}', "
+            f"schema subject '{subject}', schema version '{schema_version}'."
+        )
+        MESSAGE_LOGGER.info(f"Published message body:  {body!r}")
+
+        self._init_loop_state()
+        assert self._window is not None
+
+        if self._flow_control.is_blocked:
+            self._flow_control.reject()
+
+        async with self._window:
+            channel = await self._open()
+            if self._flow_control.is_blocked:
+                self._flow_control.reject()
+
+            confirmed: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+            self._delivery_tag += 1
+            delivery_tag = self._delivery_tag
+            self._pending[delivery_tag] = confirmed
+            try:
+                channel.basic_publish(
+                    exchange=exchange,
+                    routing_key=routing_key,
+                    body=body,
+                    properties=message_properties(subject, schema_version, encoder_type),
+                )
+            except Exception:
+                self._pending.pop(delivery_tag, None)
+                raise
+
+            try:
+                await asyncio.wait_for(confirmed, self._confirm_timeout)
+            except asyncio.TimeoutError:
+                self._pending.pop(delivery_tag, None)
+                LOGGER.error("Message was NOT PUBLISHED! It was not confirmed by RabbitMQ in time.")
+                raise TransientRabbitError(
+                    f"RabbitMQ did not confirm a published message within {self._confirm_timeout} seconds."
+                )
+
+        LOGGER.info("The message was published to RabbitMQ successfully.")
+
+    async def publish_rabbit_message(self, message: RabbitMessage, exchange: str, routing_key: str) -> None:
+        await self.publish(
+            exchange=exchange,
+            routing_key=routing_key,
+            body=message.encoded_body,
+            subject=message.subject,
+            schema_version=message.writer_schema_version,
+            encoder_type=message.encoder_type,
+        )
+
+    async def close(self) -> None:
+        """Close the connection to the RabbitMQ server, if one is open. Publishes still waiting for a confirm raise a
+        TransientRabbitError.
+        """
+        connection = self._connection
+        if connection is None or connection.is_closing or connection.is_closed:
+            return
+
+        LOGGER.info("Closing publisher connection")
+        closed = self._closed = asyncio.get_running_loop().create_future()
+        connection.close()
+        await closed
+
+    async def _wait_until_open(self, start: Callable[[OnOpen], Any]) -> None:
+        """Start opening the connection or channel and wait until it opens. The opening fails if the connection or
+        channel closes first.
+        """
+        opened = self._opening = asyncio.get_running_loop().create_future()
+
+        def on_open(*_: Any) -> None:
+            if not opened.done():
+                opened.set_result(None)
+
+        try:
+            start(on_open)
+            await opened
+        finally:
+            self._opening = None
+
+    async def _open_connection(self) -> AsyncioConnection:
+        connections = []
+        LOGGER.info("Connecting to %s", self._connection_params.host)
+
+        def start(on_open: OnOpen) -> None:
+            connection = AsyncioConnection(
+                parameters=self._connection_params,
+                on_open_callback=on_open,
+                on_open_error_callback=self._on_connection_open_error,
+                on_close_callback=self._on_connection_closed,
+                custom_ioloop=asyncio.get_running_loop(),
+            )
+            connection.add_on_connection_blocked_callback(self._flow_control.on_blocked)
+            connection.add_on_connection_unblocked_callback(self._flow_control.on_unblocked)
+            connections.append(connection)
+
+        await self._wait_until_open(start)
+        return connections[0]
+
+    async def _open_channel(self, connection: AsyncioConnection) -> Channel:
+        channels = []
+
+        def start(on_open: OnOpen) -> None:
+            channel = connection.channel(on_open_callback=on_open)
+            channel.add_on_close_callback(self._on_channel_closed)
+            channels.append(channel)
+
+        await self._wait_until_open(start)
+        channel = channels[0]
+        await self._wait_until_open(
+            lambda on_select_ok: channel.confirm_delivery(ack_nack_callback=self._on_confirm, callback=on_select_ok)
+        )
+
+        # Delivery tags count the messages published on each channel from 1.
+        self._delivery_tag = 0
+        return channel
+
+    def _on_confirm(self, frame: Method) -> None:
+        method = frame.method
+        if method.multiple:
+            delivery_tags = [delivery_tag for delivery_tag in self._pending if delivery_tag <= method.delivery_tag]
+        else:
+            delivery_tags = [method.delivery_tag]
+
+        for delivery_tag in delivery_tags:
+            confirmed = self._pending.pop(delivery_tag, None)
+            if confirmed is None or confirmed.done():
+                continue
+
+            if isinstance(method, Basic.Ack):
+                confirmed.set_result(None)
+            else:
+                LOGGER.error("Message was NOT PUBLISHED! It was nacked by RabbitMQ.")
+                confirmed.set_exception(TransientRabbitError("RabbitMQ nacked a published message."))
+
+    def _fail_opening(self, error: BaseException) -> None:
+        if self._opening is not None and not self._opening.done():
+            self._opening.set_exception(error)
+
+    def _on_connection_open_error(self, _connection: AsyncioConnection, error: Union[str, Exception]) -> None:
+        error = AsyncConsumer._reap_last_connection_workflow_error(error)
+        LOGGER.error("Publisher connection open failed: %s", error)
+        self._connection = None
+        self._fail_opening(error if isinstance(error, AMQPConnectionError) else AMQPConnectionError(error))
+
+    def _fail_pending(self, reason: BaseException) -> None:
+        pending, self._pending = self._pending, {}
+        error_type = ConnectionBlockedError if isinstance(reason, ConnectionBlockedTimeout) else TransientRabbitError
+        for confirmed in pending.values():
+            if not confirmed.done():
+                confirmed.set_exception(
+                    error_type(f"Connection to RabbitMQ lost before the message was confirmed: {reason}")
+                )
+
+    def _on_channel_closed(self, channel: Channel, reason: BaseException) -> None:
+        LOGGER.warning("Publisher channel %i was closed: %s", channel, reason)
+        self._channel = None
+        self._fail_opening(reason)
+        self._fail_pending(reason)
+
+    def _on_connection_closed(self, _connection: AsyncioConnection, reason: BaseException) -> None:
+        self._connection = None
+        self._channel = None
+        # A new connection starts unblocked.
+        self._flow_control.on_unblocked()
+        self._fail_opening(reason)
+        self._fail_pending(reason)
+
+        if self._closed is not None and not self._closed.done():
+            self._closed.set_result(None)
+        else:
+            LOGGER.warning("Publisher connection closed, reconnecting on the next publish: %s", reason)
@@ -1,27 +1,151 @@
 import json
 import logging
+import os
 from abc import ABC, abstractmethod
-from io import StringIO, BytesIO
-from typing import Any, Iterable, List, NamedTuple, Optional
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from io import SEEK_CUR, SEEK_END, SEEK_SET, BytesIO, StringIO
+from typing import (
+    Any,
+    BinaryIO,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+    cast,
+)
 
-from fastavro.validation import validate
 import fastavro
 
-from lab_share_lib.rabbit.schema_registry import RESPONSE_KEY_SCHEMA, RESPONSE_KEY_VERSION
-from lab_share_lib.constants import AVRO_BINARY_COMPRESSION_CODEC_DEFAULT, EncoderType
+from lab_share_lib.rabbit.columnar import Columns, columns_from_records, records_from_columns
+from lab_share_lib.rabbit.parsed_schema_cache import PARSED_SCHEMA_CACHE, FingerprintedSchema
+from lab_share_lib.rabbit.resolution_plan import RESOLUTION_PLAN_CACHE
+from lab_share_lib.rabbit.schema_registry import RESPONSE_KEY_ID, RESPONSE_KEY_SCHEMA, RESPONSE_KEY_VERSION
+from lab_share_lib.rabbit.schema_validator import COMPILED_VALIDATOR_CACHE, compile_validator
+from lab_share_lib.constants import (
+    AVRO_BINARY_COMPRESSION_CODEC_DEFAULT,
+    AVRO_BINARY_PARALLEL_DECODE_CHUNK_SIZE_DEFAULT,
+    EncoderType,
+)
 
 LOGGER = logging.getLogger(__name__)
 
+# Message bodies can be decoded from any of these types without first being copied.
+MessageBuffer = Union[bytes, bytearray, memoryview]
+
+# The longest magic bytes of any encoding: "Obj" followed by the version byte for the Avro object container file.
+MAGIC_BYTES_MAX_LENGTH = 4
+
 
 class EncodedMessage(NamedTuple):
     body: bytes
     version: str
 
 
+class _BufferReader:
+    """A read-only file object over a memoryview. fastavro only needs `read` and `tell`, so this lets a bytearray or a
+    slice of a larger buffer be decoded without copying it into a BytesIO first.
+    """
+
+    def __init__(self, buffer: memoryview, position: int = 0):
+        self._buffer = buffer.cast("B") if buffer.format != "B" or buffer.ndim != 1 else buffer
+        self._position = position
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        start = self._position
+        end = len(self._buffer) if size is None or size < 0 else min(start + size, len(self._buffer))
+        self._position = end
+
+        return self._buffer[start:end].tobytes()
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = SEEK_SET) -> int:
+        if whence == SEEK_CUR:
+            offset += self._position
+        elif whence == SEEK_END:
+            offset += len(self._buffer)
+
+        self._position = max(0, offset)
+        return self._position
+
+    def readable(self) -> bool:
+        return True
+
+
+def _bytes_reader(message: MessageBuffer, position: int = 0) -> BinaryIO:
+    """Get a file object to read the message from, starting at `position`, without copying the message.
+    A BytesIO shares the buffer of a bytes object it is created from, so bytes (or a memoryview of a whole bytes object)
+    are read with a BytesIO. Any other buffer is read through a memoryview.
+    """
+    if isinstance(message, memoryview) and isinstance(message.obj, bytes) and message.nbytes == len(message.obj):
+        message = message.obj
+
+    if isinstance(message, bytes):
+        bytes_reader = BytesIO(message)
+        bytes_reader.seek(position)
+        return bytes_reader
+
+    return cast(BinaryIO, _BufferReader(memoryview(message), position))
+
+
+def _block_chunks(blocks: Iterable, chunk_size: int) -> Iterator[Tuple[bytes, int]]:
+    """Group the decompressed data of consecutive container blocks into chunks of at least `chunk_size` bytes.
+    Records are written back to back within a block, so the data of consecutive blocks can simply be joined.
+    """
+    chunk: List[bytes] = []
+    chunk_length = 0
+    record_count = 0
+
+    for block in blocks:
+        block_data = block.bytes_.getvalue()
+        chunk.append(block_data)
+        chunk_length += len(block_data)
+        record_count += block.num_records
+
+        if chunk_length >= chunk_size:
+            yield b"".join(chunk), record_count
+            chunk, chunk_length, record_count = [], 0, 0
+
+    if record_count:
+        yield b"".join(chunk), record_count
+
+
+# The schemas used by _decode_block_chunk in a worker process, set once per process by _init_block_decoder.
+_block_decoder_schemas: Tuple[Any, Any] = (None, None)
+
+
+def _init_block_decoder(writer_schema: Any, reader_schema: Any) -> None:
+    global _block_decoder_schemas
+    _block_decoder_schemas = (writer_schema, reader_schema)
+
+
+def _decode_block_chunk(chunk: bytes, record_count: int) -> List:
+    writer_schema, reader_schema = _block_decoder_schemas
+    bytes_reader = BytesIO(chunk)
+
+    return [fastavro.schemaless_reader(bytes_reader, writer_schema, reader_schema) for _ in range(record_count)]
+
+
 class AvroEncoderBase(ABC):
-    def __init__(self, schema_registry, subject):
+    # The bytes that messages in this encoding can start with, used to choose an encoder without trying each in turn.
+    MAGIC_BYTES: Tuple[bytes, ...] = ()
+
+    def __init__(self, schema_registry, subject, parsed_schema_cache=None):
         self._schema_registry = schema_registry
         self._subject = subject
+        self._parsed_schema_cache = PARSED_SCHEMA_CACHE if parsed_schema_cache is None else parsed_schema_cache
+
+        # Numbered schema versions never change, so their registry responses are kept for the life of the encoder. Error
+        # responses, e.g. for a version the registry doesn't have yet, are not kept so the version is fetched again.
+        self._schema_responses: Dict[str, dict] = {}
 
     @property
     @abstractmethod
@@ -31,23 +155,74 @@ class AvroEncoderBase(ABC):
     def encode(self, records: List, version: Optional[str] = None) -> EncodedMessage: ...
 
     @abstractmethod
-    def decode(self, message: bytes, reader_version: str, writer_version: str) -> Iterable: ...
+    def decode(self, message: MessageBuffer, reader_version: str, writer_version: str) -> Iterable: ...
+
+    def recognises(self, message: MessageBuffer) -> bool:
+        """Check whether a message starts with the magic bytes of this encoding. This only looks at the first few bytes,
+        so a recognised message can still fail to decode.
+
+        Arguments:
+            message (MessageBuffer): the encoded message.
+
+        Returns:
+            bool: True if the message starts with one of the encoding's magic bytes; otherwise False.
+        """
+        return bytes(memoryview(message)[:MAGIC_BYTES_MAX_LENGTH]).startswith(self.MAGIC_BYTES)
 
     def _schema_response(self, version):
         if version is None:
             return self._schema_registry.get_schema(self._subject)
-        else:
-            return self._schema_registry.get_schema(self._subject, version)
+
+        if version in self._schema_responses:
+            return self._schema_responses[version]
+
+        schema_response = self._schema_registry.get_schema(self._subject, version)
+        if str(version).isdigit() and RESPONSE_KEY_SCHEMA in schema_response:
+            self._schema_responses[version] = schema_response
+
+        return schema_response
+
+    def warm(self, versions: Iterable[str]) -> None:
+        """Resolve everything needed to encode, decode and validate with the given schema versions, so that the first
+        messages using them don't have to wait for the schema registry or for schemas to be parsed.
+
+        Arguments:
+            versions (Iterable[str]): the schema versions to prepare, e.g. the reader version and known writer versions.
+        """
+        for version in versions:
+            self._warm(self._schema_response(version))
+
+    def _warm(self, schema_response: dict) -> None:
+        self._schema(schema_response)
+        self._validator(schema_response)
 
     def _schema(self, schema_response):
+        version = schema_response.get(RESPONSE_KEY_VERSION)
+        if version is None:
+            # Without a resolved version there is nothing safe to cache the parsed schema against.
+            return self._parse_schema(schema_response)
+
+        return self._parsed_schema_cache.get(self._subject, str(version), lambda: self._parse_schema(schema_response))
+
+    @staticmethod
+    def _parse_schema(schema_response):
         schema_obj = json.loads(schema_response[RESPONSE_KEY_SCHEMA])
         return fastavro.parse_schema(schema_obj)
 
     def _schema_version(self, schema_response):
         return schema_response[RESPONSE_KEY_VERSION]
 
+    def _validator(self, schema_response):
+        version = schema_response.get(RESPONSE_KEY_VERSION)
+        if version is None:
+            return compile_validator(self._schema(schema_response))
+
+        return COMPILED_VALIDATOR_CACHE.get(
+            self._subject, str(version), lambda: compile_validator(self._schema(schema_response))
+        )
+
     def validate(self, data_obj: Any, schema_version: str) -> None:
-        validate(data_obj, self._schema(self._schema_response(schema_version)))
+        self._validator(self._schema_response(schema_version))(data_obj)
 
 
 class AvroEncoderJson(AvroEncoderBase):
@@ -55,6 +230,8 @@ class AvroEncoderJson(AvroEncoderBase):
     used in production where performance can be improved via binary encodings.
     """
 
+    MAGIC_BYTES = (b"{", b"[")
+
     @property
     def encoder_type(self) -> EncoderType:
         return "json"
@@ -70,13 +247,16 @@ class AvroEncoderJson(AvroEncoderBase):
             body=string_writer.getvalue().encode(), version=str(self._schema_version(schema_response))
         )
 
-    def decode(self, message: bytes, reader_version: str, writer_version: str) -> Iterable:
+    def decode(self, message: MessageBuffer, reader_version: str, writer_version: str) -> Iterable:
         LOGGER.debug("Decoding AVRO message.")
 
         schema_response = self._schema_response(reader_version)
-        string_reader = StringIO(message.decode())
 
-        return fastavro.json_reader(string_reader, self._schema(schema_response))
+        # fastavro reads JSON a line at a time and json.loads accepts UTF-8 bytes, so the lines don't need decoding to a
+        # string first. The JSON parser needs bytes, so only a bytes message avoids being copied.
+        bytes_reader = BytesIO(message) if isinstance(message, bytes) else BytesIO(memoryview(message).tobytes())
+
+        return fastavro.json_reader(bytes_reader, self._schema(schema_response))
 
 
 class AvroEncoder(AvroEncoderJson):
@@ -96,8 +276,10 @@ class AvroEncoderBinaryFile(AvroEncoderBase):
     content of the message which inflates the size of the encoded message vastly.
     """
 
-    def __init__(self, schema_registry, subject):
-        super().__init__(schema_registry, subject)
+    MAGIC_BYTES = (b"Obj\x01",)
+
+    def __init__(self, schema_registry, subject, parsed_schema_cache=None):
+        super().__init__(schema_registry, subject, parsed_schema_cache)
         self._compression_codec = AVRO_BINARY_COMPRESSION_CODEC_DEFAULT
 
     def set_compression_codec(self, compression_codec: str = AVRO_BINARY_COMPRESSION_CODEC_DEFAULT) -> None:
@@ -117,13 +299,110 @@ class AvroEncoderBinaryFile(AvroEncoderBase):
 
         return EncodedMessage(body=bytes_writer.getvalue(), version=str(self._schema_version(schema_response)))
 
-    def decode(self, message: bytes, reader_version: str, _writer_version: str) -> Iterable:
+    def decode(self, message: MessageBuffer, reader_version: str, _writer_version: str) -> Iterable:
         LOGGER.debug("Decoding AVRO message.")
 
         schema_response = self._schema_response(reader_version)
-        bytes_reader = BytesIO(message)
 
-        return fastavro.reader(bytes_reader, self._schema(schema_response))
+        return fastavro.reader(_bytes_reader(message), self._schema(schema_response))
+
+    def encode_columns(self, columns: Mapping[str, Any], version: Optional[str] = None) -> EncodedMessage:
+        """Encode records held in columns, such as NumPy arrays, without building a dict for each record first.
+
+        Arguments:
+            columns (Mapping[str, Any]): a sequence of values per field. Masked values and None are written as null.
+            version (Optional[str], optional): the schema version to encode with. Defaults to the latest version.
+
+        Returns:
+            EncodedMessage: the encoded message containing all the records.
+        """
+        LOGGER.debug("Encoding AVRO message from columns.")
+
+        schema_response = self._schema_response(version)
+        bytes_writer = BytesIO()
+
+        fastavro.writer(
+            bytes_writer, self._schema(schema_response), records_from_columns(columns), codec=self._compression_codec
+        )
+
+        return EncodedMessage(body=bytes_writer.getvalue(), version=str(self._schema_version(schema_response)))
+
+    def decode_columns(self, message: MessageBuffer, reader_version: str) -> Columns:
+        """Decode the records in a message into a NumPy array per field of the reader schema. Strings and other values
+        without a NumPy type are held in object arrays and fields that can be null are held in masked arrays.
+
+        Arguments:
+            message (MessageBuffer): the encoded message.
+            reader_version (str): the version of the record schema to read the records with.
+
+        Returns:
+            Columns: an array per field of the reader schema.
+        """
+        LOGGER.debug("Decoding AVRO message into columns.")
+
+        reader_schema = self._schema(self._schema_response(reader_version))
+
+        return columns_from_records(fastavro.reader(_bytes_reader(message), reader_schema), reader_schema)
+
+    def decode_blocks(self, message: MessageBuffer, reader_version: str) -> Iterator[List]:
+        """Decode the message one container block at a time so records can be processed before the whole message has
+        been decoded. Only one block of decoded records is held in memory at once.
+
+        Arguments:
+            message (MessageBuffer): the encoded message.
+            reader_version (str): the schema version to read the records with.
+
+        Returns:
+            Iterator[List]: the decoded records of each block, in the order they appear in the message.
+        """
+        LOGGER.debug("Decoding AVRO message by block.")
+
+        schema_response = self._schema_response(reader_version)
+
+        for block in fastavro.block_reader(_bytes_reader(message), self._schema(schema_response)):
+            yield list(block)
+
+    def decode_parallel(
+        self,
+        message: MessageBuffer,
+        reader_version: str,
+        max_workers: Optional[int] = None,
+        chunk_size: int = AVRO_BINARY_PARALLEL_DECODE_CHUNK_SIZE_DEFAULT,
+    ) -> Iterator[Any]:
+        """Decode the message using a pool of processes, yielding records in the order they appear in the message.
+        Blocks are split on their sync markers and decompressed in this process, then grouped into chunks of roughly
+        `chunk_size` bytes which are decoded by the worker processes. At most two chunks per worker are in flight, so
+        memory use stays bounded for very large messages. This is only worthwhile for messages of many megabytes.
+
+        Arguments:
+            message (MessageBuffer): the encoded message.
+            reader_version (str): the schema version to read the records with.
+            max_workers (Optional[int], optional): the number of worker processes. Defaults to the number of CPUs.
+            chunk_size (int, optional): the number of decompressed bytes to send to a worker at a time.
+
+        Returns:
+            Iterator[Any]: the decoded records.
+        """
+        LOGGER.debug("Decoding AVRO message in parallel.")
+
+        schema_response = self._schema_response(reader_version)
+        blocks = fastavro.block_reader(_bytes_reader(message), self._schema(schema_response))
+
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_block_decoder,
+            initargs=(blocks.writer_schema, blocks.reader_schema),
+        ) as executor:
+            max_in_flight = 2 * (max_workers or os.cpu_count() or 1)
+            in_flight: Deque[Future] = deque()
+
+            for chunk, record_count in _block_chunks(blocks, chunk_size):
+                in_flight.append(executor.submit(_decode_block_chunk, chunk, record_count))
+                if len(in_flight) >= max_in_flight:
+                    yield from in_flight.popleft().result()
+
+            while in_flight:
+                yield from in_flight.popleft().result()
 
 
 class AvroEncoderBinaryMessage(AvroEncoderBase):
@@ -132,7 +411,10 @@ class AvroEncoderBinaryMessage(AvroEncoderBase):
     message. This is suitable for sending and receiving messages via a message broker where the schema is stored in a
     schema registry. The schema used for writing is identified by a 64-bit CRC fingerprint of the schema. Note however,
     the fingerprint may be inconsistent between different Avro implementations, so it cannot be relied upon. Therefore
-    it is recommended to indicate the schema subject and version in the message metadata.
+    it is recommended to indicate the schema subject and version in the message metadata. The writer schema is found
+    by the version in the metadata, which only needs the schema registry the first time a version is seen, and the
+    fingerprint is checked against it. The fingerprint alone only finds the writer schema when the metadata has no
+    version number.
 
     Raises:
         ValueError: If the number of records is not exactly 1 while encoding.
@@ -140,21 +422,71 @@ class AvroEncoderBinaryMessage(AvroEncoderBase):
     """
 
     TWO_BYTE_MARKER = b"\xC3\x01"  # Used to identify single-object Avro encoding.
+    MAGIC_BYTES = (TWO_BYTE_MARKER,)
 
-    def __init__(self, schema_registry, subject):
-        super().__init__(schema_registry, subject)
+    def __init__(self, schema_registry, subject, parsed_schema_cache=None):
+        super().__init__(schema_registry, subject, parsed_schema_cache)
+
+    def _fingerprinted_schema(self, schema_response: dict) -> FingerprintedSchema:
+        version = schema_response.get(RESPONSE_KEY_VERSION)
+        if version is None:
+            parsed_schema = self._parse_schema(schema_response)
+            return FingerprintedSchema(self._subject, "", parsed_schema, self._fingerprint(parsed_schema))
+
+        return self._parsed_schema_cache.get_fingerprinted(
+            self._subject, str(version), lambda: self._parse_schema(schema_response), self._fingerprint
+        )
 
-    def _schema_fingerprint(self, schema_response):
-        canonical_form = fastavro.schema.to_parsing_canonical_form(self._schema(schema_response))
-        return fastavro.schema.fingerprint(canonical_form, "CRC-64-AVRO")
+    @staticmethod
+    def _fingerprint(parsed_schema: Any) -> bytes:
+        canonical_form = fastavro.schema.to_parsing_canonical_form(parsed_schema)
+        return bytes.fromhex(fastavro.schema.fingerprint(canonical_form, "CRC-64-AVRO"))
+
+    def _warm(self, schema_response: dict) -> None:
+        super()._warm(schema_response)
+        self._fingerprinted_schema(schema_response)
+
+    def _schema_fingerprint(self, schema_response: dict) -> bytes:
+        return self._fingerprinted_schema(schema_response).fingerprint
+
+    def _writer_schema(self, fingerprint: bytes, writer_version: str) -> FingerprintedSchema:
+        """Find the schema a message was written with. The version given in the message headers is looked up in the
+        parsed schema cache, and only fetched from the schema registry the first time it is seen. Versions that differ
+        only in logical types share a fingerprint, and fastavro converts values using the writer schema's logical types,
+        so the fingerprint is only used to find the schema when the headers don't give a version number.
+        """
+        writer_version = str(writer_version)
+        writer_schema = self._parsed_schema_cache.find_fingerprinted(self._subject, writer_version)
+
+        if writer_schema is None and not writer_version.isdigit():
+            writer_schema = self._parsed_schema_cache.find_by_fingerprint(fingerprint)
+            if writer_schema is not None:
+                return writer_schema
+
+        if writer_schema is None:
+            writer_schema = self._fingerprinted_schema(self._schema_response(writer_version))
+
+        if writer_schema.fingerprint != fingerprint:
+            # Fingerprints can differ between Avro implementations, so trust the headers but make the mismatch visible
+            # in case the headers are wrong.
+            LOGGER.warning(
+                f"Message fingerprint {fingerprint.hex()} does not match the fingerprint of subject "
+                f"'{self._subject}' version '{writer_version}' given in the message headers."
+            )
+
+        return writer_schema
 
     @property
     def encoder_type(self) -> EncoderType:
         return "binary"
 
+    def _header(self, schema_response: dict, fingerprinted_schema: FingerprintedSchema) -> bytes:
+        """The bytes written before each record, identifying the schema it was written with."""
+        return self.TWO_BYTE_MARKER + fingerprinted_schema.fingerprint
+
     def encode(self, records: List, version: Optional[str] = None) -> EncodedMessage:
         if records is None or len(records) != 1:
-            raise ValueError("AvroEncoderBinaryMessage only supports encoding exactly one object at a time.")
+            raise ValueError(f"{type(self).__name__} only supports encoding exactly one object at a time.")
 
         return self.encode_single_object(records[0], version)
 
@@ -162,40 +494,167 @@ class AvroEncoderBinaryMessage(AvroEncoderBase):
         LOGGER.debug("Encoding AVRO message.")
 
         schema_response = self._schema_response(version)
+        fingerprinted_schema = self._fingerprinted_schema(schema_response)
 
         bytes_writer = BytesIO()
-        bytes_writer.write(self.TWO_BYTE_MARKER)
-        bytes_writer.write(bytes.fromhex(self._schema_fingerprint(schema_response)))
-        fastavro.schemaless_writer(bytes_writer, self._schema(schema_response), record)
+        bytes_writer.write(self._header(schema_response, fingerprinted_schema))
+        fastavro.schemaless_writer(bytes_writer, fingerprinted_schema.schema, record)
 
         return EncodedMessage(body=bytes_writer.getvalue(), version=str(self._schema_version(schema_response)))
 
-    def decode(self, message: bytes, reader_version: str, writer_version: str) -> Iterable:
+    def encode_many(self, records: Iterable, version: Optional[str] = None) -> List[EncodedMessage]:
+        """Encode each record as its own single-object message. The schema and its fingerprint are resolved once for
+        the whole batch and a single buffer, holding the marker and fingerprint, is reused to write every record.
+
+        Arguments:
+            records (Iterable): the records to encode.
+            version (Optional[str], optional): the schema version to encode with. Defaults to the latest version.
+
+        Returns:
+            List[EncodedMessage]: one encoded message per record, in the same order as the records.
+        """
+        LOGGER.debug("Encoding AVRO messages.")
+
+        schema_response = self._schema_response(version)
+        fingerprinted_schema = self._fingerprinted_schema(schema_response)
+        encoded_version = str(self._schema_version(schema_response))
+
+        bytes_writer = BytesIO()
+        bytes_writer.write(self._header(schema_response, fingerprinted_schema))
+        header_length = bytes_writer.tell()
+
+        encoded_messages = []
+        for record in records:
+            bytes_writer.seek(header_length)
+            bytes_writer.truncate()
+            fastavro.schemaless_writer(bytes_writer, fingerprinted_schema.schema, record)
+            encoded_messages.append(EncodedMessage(body=bytes_writer.getvalue(), version=encoded_version))
+
+        return encoded_messages
+
+    def encode_columns(self, columns: Mapping[str, Any], version: Optional[str] = None) -> List[EncodedMessage]:
+        """Encode each record held in columns, such as NumPy arrays, as its own single-object message without building
+        a dict for each record first.
+
+        Arguments:
+            columns (Mapping[str, Any]): a sequence of values per field. Masked values and None are written as null.
+            version (Optional[str], optional): the schema version to encode with. Defaults to the latest version.
+
+        Returns:
+            List[EncodedMessage]: one encoded message per record, in column order.
+        """
+        return self.encode_many(records_from_columns(columns), version)
+
+    def decode_columns(self, messages: Iterable[MessageBuffer], reader_version: str, writer_version: str) -> Columns:
+        """Decode a batch of single-object messages into a NumPy array per field of the reader schema. Strings and other
+        values without a NumPy type are held in object arrays and fields that can be null are held in masked arrays.
+
+        Arguments:
+            messages (Iterable[MessageBuffer]): the encoded messages.
+            reader_version (str): the version of the record schema to read the records with.
+            writer_version (str): the schema version the messages were written with, from the message headers.
+
+        Returns:
+            Columns: an array per field of the reader schema, with one value per message.
         """
-        1. Reads the writer and reader schemas.
-        2. Decodes the messages by providing fastavro the reader and writer schemas.
-        3. Returns the messages decoded via fastavro.
+        LOGGER.debug("Decoding AVRO messages into columns.")
+
+        reader_schema = self._schema(self._schema_response(reader_version))
+        records = (record for message in messages for record in self.decode(message, reader_version, writer_version))
+
+        return columns_from_records(records, reader_schema)
+
+    def decode(self, message: MessageBuffer, reader_version: str, writer_version: str) -> Iterable:
+        """
+        1. Checks the message marker and finds the writer schema from the fingerprint that follows it.
+        2. Reads the reader schema and gets the cached plan for resolving the writer schema against it.
+        3. Decodes the messages by providing fastavro the schemas from the plan and completing the record if needed.
+        4. Returns the messages decoded via fastavro.
         """
 
         LOGGER.debug("Decoding AVRO message.")
 
-        reader_schema_response = self._schema_response(reader_version)
-        writer_schema_response = self._schema_response(writer_version)
-        bytes_reader = BytesIO(message)
+        message_view = memoryview(message)
 
-        marker = bytes_reader.read(2)
-        if marker != self.TWO_BYTE_MARKER:
+        if message_view[:2] != self.TWO_BYTE_MARKER:
             raise ValueError("Message does not appear to be a single-object Avro encoding.")
 
-        # Skip the schema fingerprint as our schema registry doesn't support looking up by fingerprint.
-        bytes_reader.seek(10)
+        writer_schema = self._writer_schema(message_view[2:10].tobytes(), writer_version)
+        reader_schema = self._fingerprinted_schema(self._schema_response(reader_version))
+        plan = RESOLUTION_PLAN_CACHE.get(writer_schema, reader_schema)
 
         # There's something wrong with mypy linting for the number of arguments on this method!
-        return [
-            fastavro.schemaless_reader(
-                bytes_reader, self._schema(writer_schema_response), self._schema(reader_schema_response)
+        datum = fastavro.schemaless_reader(_bytes_reader(message, 10), plan.writer_schema, plan.reader_schema)
+
+        return [datum if plan.reader_schema is not None else plan.complete(datum)]
+
+
+class AvroEncoderConfluent(AvroEncoderBinaryMessage):
+    """An encoder for single Avro records framed with the Confluent wire format, as used by Kafka and Redpanda tooling.
+    Each message starts with a zero magic byte and the 4-byte big-endian ID the schema registry gave the writer schema,
+    followed by the binary encoded record. Unlike a fingerprint, the ID is assigned by the registry so it identifies the
+    writer schema reliably, and the version in the message metadata isn't needed to find it.
+
+    Raises:
+        ValueError: If the number of records is not exactly 1 while encoding.
+        ValueError: If the schema registry response for the writer schema has no schema ID while encoding.
+        ValueError: If the message binary does not start with the magic byte and a schema ID.
+    """
+
+    MAGIC_BYTE = b"\x00"
+    MAGIC_BYTES = (MAGIC_BYTE,)
+    HEADER_LENGTH = 5  # The magic byte followed by a 4-byte schema ID.
+
+    # The parsed schema cache keys schemas by subject and version, so schemas found by ID are stored under this subject
+    # with the ID as their version.
+    SCHEMA_ID_SUBJECT = "schemas/ids"
+
+    @property
+    def encoder_type(self) -> EncoderType:
+        return "confluent"
+
+    def _header(self, schema_response: dict, fingerprinted_schema: FingerprintedSchema) -> bytes:
+        schema_id = schema_response.get(RESPONSE_KEY_ID)
+        if schema_id is None:
+            raise ValueError(
+                f"The schema registry response for subject '{self._subject}' has no schema ID to write in the message."
             )
-        ]
+
+        return self.MAGIC_BYTE + int(schema_id).to_bytes(self.HEADER_LENGTH - 1, "big")
+
+    def _writer_schema_by_id(self, schema_id: int) -> FingerprintedSchema:
+        return self._parsed_schema_cache.get_fingerprinted(
+            self.SCHEMA_ID_SUBJECT,
+            str(schema_id),
+            lambda: self._parse_schema(self._schema_registry.get_schema_by_id(schema_id)),
+            self._fingerprint,
+        )
+
+    def decode(self, message: MessageBuffer, reader_version: str, writer_version: str) -> Iterable:
+        """
+        1. Checks the magic byte and gets the writer schema by the schema ID that follows it.
+        2. Reads the reader schema and gets the cached plan for resolving the writer schema against it.
+        3. Decodes the message by providing fastavro the schemas from the plan and completing the record if needed.
+        4. Returns the message decoded via fastavro.
+        """
+
+        LOGGER.debug("Decoding AVRO message.")
+
+        header = bytes(memoryview(message)[: self.HEADER_LENGTH])
+
+        if len(header) < self.HEADER_LENGTH or not header.startswith(self.MAGIC_BYTE):
+            raise ValueError("Message does not appear to be a Confluent wire format Avro encoding.")
+
+        schema_id = int.from_bytes(header[1:], "big")
+        writer_schema = self._writer_schema_by_id(schema_id)
+        reader_schema = self._fingerprinted_schema(self._schema_response(reader_version))
+        plan = RESOLUTION_PLAN_CACHE.get(writer_schema, reader_schema)
+
+        datum = fastavro.schemaless_reader(
+            _bytes_reader(message, self.HEADER_LENGTH), plan.writer_schema, plan.reader_schema
+        )
+
+        return [datum if plan.reader_schema is not None else plan.complete(datum)]
 
 
 class AvroEncoderBinary(AvroEncoderBinaryFile):
@@ -0,0 +1,237 @@
+import logging
+from concurrent.futures import Future
+from queue import Empty, Full, Queue
+from threading import Thread
+from typing import List, NamedTuple, Optional, Tuple
+
+from lab_share_lib.config.rabbit_server_details import RabbitServerDetails
+from lab_share_lib.constants import (
+    RABBITMQ_BLOCKED_CONNECTION_TIMEOUT_DEFAULT,
+    RABBITMQ_HEADER_VALUE_ENCODER_TYPE_DEFAULT,
+    RABBITMQ_PUBLISH_BLOCKED_BUFFER_SIZE_DEFAULT,
+    RABBITMQ_PUBLISH_BATCH_SIZE_DEFAULT,
+    RABBITMQ_PUBLISH_KEEP_ALIVE_INTERVAL,
+    RABBITMQ_PUBLISH_QUEUE_SIZE_DEFAULT,
+)
+from lab_share_lib.exceptions import ConnectionBlockedError, TransientRabbitError
+from lab_share_lib.processing.rabbit_message import RabbitMessage
+from lab_share_lib.rabbit.basic_publisher import BasicPublisher, OutgoingMessage, PublishResult
+
+LOGGER = logging.getLogger(__name__)
+
+
+class _Request(NamedTuple):
+    message: OutgoingMessage
+    future: "Future[PublishResult]"
+
+
+class BackgroundPublisher(Thread):
+    """A RabbitMQ publisher that runs in a background thread, so any thread can publish without waiting for the broker
+    and without a connection of its own.
+
+    Messages are queued and each publish returns a future that resolves to the message's PublishResult once the broker
+    has confirmed it, or fails with a TransientRabbitError if it was not published. The thread publishes whatever has
+    been queued as a batch of up to `max_batch_size` messages, retrying messages that aren't confirmed as
+    `BasicPublisher.publish_batch` does. The queue holds up to `max_queue_size` messages: when it is full, publishing
+    blocks until there is room, or raises a TransientRabbitError after `put_timeout` seconds if one is given.
+
+    While RabbitMQ has blocked the connection, the thread holds up to `blocked_buffer_size` messages to publish once it
+    is unblocked, and fails the futures of any more with a ConnectionBlockedError. A batch that is blocked part way
+    through gives up after `blocked_connection_timeout` seconds.
+
+    Start the thread before publishing, and call `stop` to publish the queued messages and close the connection.
+    """
+
+    def __init__(
+        self,
+        server_details: RabbitServerDetails,
+        publish_retry_delay: int,
+        publish_max_retries: int,
+        verify_cert: bool = True,
+        max_queue_size: int = RABBITMQ_PUBLISH_QUEUE_SIZE_DEFAULT,
+        max_batch_size: int = RABBITMQ_PUBLISH_BATCH_SIZE_DEFAULT,
+        put_timeout: Optional[float] = None,
+        blocked_connection_timeout: Optional[float] = RABBITMQ_BLOCKED_CONNECTION_TIMEOUT_DEFAULT,
+        blocked_buffer_size: int = RABBITMQ_PUBLISH_BLOCKED_BUFFER_SIZE_DEFAULT,
+    ):
+        super().__init__()
+        self.name = type(self).__name__
+        self.daemon = True
+        self._publisher = BasicPublisher(
+            server_details,
+            publish_retry_delay,
+            publish_max_retries,
+            verify_cert,
+            blocked_connection_timeout=blocked_connection_timeout,
+        )
+        self._blocked_buffer_size = blocked_buffer_size
+        self._held: List[_Request] = []  # Messages that weren't published because the connection was blocked.
+        self._queue: "Queue[Optional[_Request]]" = Queue(maxsize=max_queue_size)
+        self._max_batch_size = max_batch_size
+        self._put_timeout = put_timeout
+        self._running = False
+        self._stopping = False
+
+    @property
+    def is_healthy(self) -> bool:
+        return self._running
+
+    @property
+    def queue_size(self) -> int:
+        return self._queue.qsize()
+
+    def publish_message(
+        self,
+        exchange: str,
+        routing_key: str,
+        body: bytes,
+        subject: str,
+        schema_version: str,
+        encoder_type: str = RABBITMQ_HEADER_VALUE_ENCODER_TYPE_DEFAULT,
+    ) -> "Future[PublishResult]":
+        """Queue a message to be published.
+
+        Arguments:
+            exchange (str): the exchange to publish to.
+            routing_key (str): the routing key of the message.
+            body (bytes): the encoded message.
+            subject (str): the schema subject of the message.
+            schema_version (str): the version of the schema the message was encoded with.
+            encoder_type (str): how the message was encoded.
+
+        Returns:
+            Future[PublishResult]: resolves once the broker has confirmed the message.
+
+        Raises:
+            TransientRabbitError: the queue stayed full for the put timeout.
+            RuntimeError: the publisher has been stopped.
+        """
+        if self._stopping:
+            raise RuntimeError("Cannot publish with a BackgroundPublisher that has been stopped.")
+
+        future: "Future[PublishResult]" = Future()
+        message = OutgoingMessage(exchange, routing_key, body, subject, schema_version, encoder_type)
+        try:
+            self._queue.put(_Request(message, future), timeout=self._put_timeout)
+        except Full:
+            raise TransientRabbitError(f"Publish queue stayed full for {self._put_timeout} seconds.")
+
+        return future
+
+    def publish_rabbit_message(
+        self, message: RabbitMessage, exchange: str, routing_key: str
+    ) -> "Future[PublishResult]":
+        return self.publish_message(
+            exchange=exchange,
+            routing_key=routing_key,
+            body=message.encoded_body,
+            subject=message.subject,
+            schema_version=message.writer_schema_version,
+            encoder_type=message.encoder_type,
+        )
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop taking messages, publish those already queued and close the connection.
+
+        Arguments:
+            timeout (Optional[float]): the longest time to wait for the queued messages to be published.
+        """
+        self._stopping = True
+        self._queue.put(None)
+        self.join(timeout)
+
+    def run(self) -> None:
+        self._running = True
+        try:
+            stopped = False
+            while not stopped:
+                batch, stopped = self._next_batch()
+                # Held messages go first, to keep messages in order.
+                held, self._held = self._held, []
+                self._publish(held + batch)
+        finally:
+            self._running = False
+            self._publisher.close()
+            self._fail_held()
+            self._fail_queued()
+
+    def _next_batch(self) -> Tuple[List[_Request], bool]:
+        """Wait for the next queued messages. Returns them, and whether the publisher was stopped after queueing them.
+        Messages are queued ahead of the stop marker, so none are left behind once it has been seen.
+        """
+        while True:
+            try:
+                request = self._queue.get(timeout=RABBITMQ_PUBLISH_KEEP_ALIVE_INTERVAL)
+                break
+            except Empty:
+                self._publisher.keep_alive()
+                if self._held:
+                    # Try the held messages again, in case the connection has been unblocked.
+                    return [], False
+
+        batch: List[_Request] = []
+        while request is not None:
+            # Futures cancelled while queued are dropped rather than published.
+            if request.future.set_running_or_notify_cancel():
+                batch.append(request)
+
+            if len(batch) == self._max_batch_size:
+                return batch, False
+
+            try:
+                request = self._queue.get_nowait()
+            except Empty:
+                return batch, False
+
+        return batch, True
+
+    def _fail_held(self) -> None:
+        held, self._held = self._held, []
+        for request in held:
+            request.future.set_exception(
+                ConnectionBlockedError("BackgroundPublisher was stopped while RabbitMQ had blocked the connection.")
+            )
+
+    def _fail_queued(self) -> None:
+        # Only messages queued while stopping, which lost the race with the stop marker, can still be queued.
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except Empty:
+                return
+
+            if request is not None and request.future.set_running_or_notify_cancel():
+                request.future.set_exception(RuntimeError("BackgroundPublisher was stopped before publishing."))
+
+    def _hold(self, request: _Request) -> None:
+        if len(self._held) < self._blocked_buffer_size:
+            self._held.append(request)
+        else:
+            request.future.set_exception(
+                ConnectionBlockedError(
+                    f"RabbitMQ has blocked the connection and {len(self._held)} messages are already held."
+                )
+            )
+
+    def _publish(self, batch: List[_Request]) -> None:
+        if not batch:
+            return
+
+        try:
+            results = self._publisher.publish_batch([request.message for request in batch])
+        except Exception as ex:
+            LOGGER.exception("Unexpected error publishing a batch of messages.")
+            for request in batch:
+                request.future.set_exception(ex)
+            return
+
+        for request, result in zip(batch, results):
+            if result.published:
+                request.future.set_result(result)
+            elif result.attempts == 0:
+                # No attempt is made while the connection is blocked.
+                self._hold(request)
+            else:
+                request.future.set_exception(
+                    TransientRabbitError(f"Message was not published after {result.attempts} attempts.")
+                )
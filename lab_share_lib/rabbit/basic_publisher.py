@@ -1,11 +1,24 @@
 import logging
+import math
 import os
 import ssl
 import time
+from threading import Event, RLock, Thread
+from functools import lru_cache
+from typing import TYPE_CHECKING, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
 
 from pika import BasicProperties, BlockingConnection, ConnectionParameters, PlainCredentials, SSLOptions
-from pika.exceptions import UnroutableError
-from pika.spec import PERSISTENT_DELIVERY_MODE
+from pika.adapters.blocking_connection import BlockingChannel
+from pika.exceptions import (
+    AMQPConnectionError,
+    AMQPError,
+    ChannelClosed,
+    ChannelWrongStateError,
+    ConnectionBlockedTimeout,
+    UnroutableError,
+)
+from pika.frame import Method
+from pika.spec import PERSISTENT_DELIVERY_MODE, Basic
 from lab_share_lib.processing.rabbit_message import RabbitMessage
 
 
@@ -15,29 +28,152 @@ from lab_share_lib.constants import (
     RABBITMQ_HEADER_KEY_SUBJECT,
     RABBITMQ_HEADER_KEY_VERSION,
     RABBITMQ_HEADER_VALUE_ENCODER_TYPE_DEFAULT,
+    RABBITMQ_BLOCKED_CONNECTION_TIMEOUT_DEFAULT,
+    RABBITMQ_PUBLISH_BLOCKED_BUFFER_SIZE_DEFAULT,
+    RABBITMQ_PUBLISH_CONFIRM_TIMEOUT_DEFAULT,
+    RABBITMQ_PUBLISH_KEEP_ALIVE_INTERVAL,
 )
 from lab_share_lib.config.rabbit_server_details import RabbitServerDetails
+from lab_share_lib.exceptions import ConnectionBlockedError
+from lab_share_lib.rabbit.flow_control import FlowControl, FlowControlStats
+
+if TYPE_CHECKING:
+    from lab_share_lib.rabbit.publish_outbox import PublishOutbox
 
 LOGGER = logging.getLogger(__name__)
 MESSAGE_LOGGER = logging.getLogger(LOGGER_NAME_RABBIT_MESSAGES)
 
+# Errors meaning the connection or channel has gone and a new one is needed to publish.
+RECONNECT_ERRORS = (AMQPConnectionError, ChannelClosed, ChannelWrongStateError)
+
+
+@lru_cache(maxsize=1024)
+def message_properties(subject: str, schema_version: str, encoder_type: str) -> BasicProperties:
+    """The properties of a published message, with headers naming its schema and encoding. Properties are only read when
+    a message is published, so one instance is shared by every message with the same headers.
+
+    Arguments:
+        subject (str): the schema subject of the message.
+        schema_version (str): the version of the schema the message was encoded with.
+        encoder_type (str): how the message was encoded.
+
+    Returns:
+        BasicProperties: persistent delivery properties with the message's headers.
+    """
+    return BasicProperties(
+        delivery_mode=PERSISTENT_DELIVERY_MODE,
+        headers={
+            RABBITMQ_HEADER_KEY_SUBJECT: subject,
+            RABBITMQ_HEADER_KEY_VERSION: schema_version,
+            RABBITMQ_HEADER_KEY_ENCODER_TYPE: encoder_type,
+        },
+    )
+
+
+class OutgoingMessage(NamedTuple):
+    """A message to publish with `BasicPublisher.publish_batch`."""
+
+    exchange: str
+    routing_key: str
+    body: bytes
+    subject: str
+    schema_version: str
+    encoder_type: str = RABBITMQ_HEADER_VALUE_ENCODER_TYPE_DEFAULT
+
+
+class PublishResult(NamedTuple):
+    message: OutgoingMessage
+    published: bool
+    attempts: int
+    # Whether a message that wasn't published was saved to the publisher's outbox to be published later.
+    saved: bool = False
+
+
+class _Confirms:
+    """Tracks the publisher confirms outstanding on a channel. Delivery tags count the messages published on the channel
+    from 1, and the broker may confirm every message up to a tag at once.
+    """
+
+    def __init__(self, on_settled: Callable[[], None]):
+        self._on_settled = on_settled
+        self._next_delivery_tag = 1
+        self.outstanding: Dict[int, int] = {}  # Delivery tag to the index of the message in its batch.
+        self.confirmed: Dict[int, bool] = {}  # Index of the message in its batch to whether it was acked.
+
+    def start_batch(self) -> None:
+        # Confirms still outstanding from an earlier batch have timed out and those messages were already reported.
+        self.outstanding = {}
+        self.confirmed = {}
+
+    def published(self, index: int) -> None:
+        self.outstanding[self._next_delivery_tag] = index
+        self._next_delivery_tag += 1
+
+    def on_confirm(self, frame: Method) -> None:
+        method = frame.method
+        if method.multiple:
+            delivery_tags = [delivery_tag for delivery_tag in self.outstanding if delivery_tag <= method.delivery_tag]
+        else:
+            delivery_tags = [method.delivery_tag]
+
+        for delivery_tag in delivery_tags:
+            index = self.outstanding.pop(delivery_tag, None)
+            if index is not None:
+                self.confirmed[index] = isinstance(method, Basic.Ack)
+
+        if not self.outstanding:
+            self._on_settled()
+
 
 class BasicPublisher:
+    """Publishes messages to a RabbitMQ server with publisher confirms.
+
+    The connection and its confirm-mode channel are opened on the first publish and kept open for later ones, so
+    messages don't each pay for a connection handshake. If the connection or channel is found closed, or is lost while
+    publishing, a new one is opened and the message is published on it instead. Call `close` when done publishing.
+
+    Given an outbox, `publish_message` and `publish_batch` make a single attempt and save messages that can't be
+    published to the outbox instead of retrying, so callers never wait between attempts. Messages in the outbox are
+    published in order from a background thread, and later messages are saved behind them until the outbox is empty.
+
+    While RabbitMQ has blocked the connection for a memory or disk alarm, messages aren't published. Up to
+    `blocked_buffer_size` messages are buffered in memory and published once the connection is unblocked, or saved to
+    the outbox if there is one, and publishing any more raises a ConnectionBlockedError straight away. A publish that
+    is blocked part way through gives up after `blocked_connection_timeout` seconds with a ConnectionBlockedError.
+
+    A publisher is thread-safe: publishes from different threads share its connection and are made one at a time. An
+    idle connection is only kept alive by calling `keep_alive`, which a PublisherKeepAlive thread does every few
+    seconds.
+    """
+
     def __init__(
         self,
         server_details: RabbitServerDetails,
         publish_retry_delay: int,
         publish_max_retries: int,
         verify_cert: bool = True,
+        confirm_timeout: float = RABBITMQ_PUBLISH_CONFIRM_TIMEOUT_DEFAULT,
+        outbox: Optional["PublishOutbox"] = None,
+        blocked_connection_timeout: Optional[float] = RABBITMQ_BLOCKED_CONNECTION_TIMEOUT_DEFAULT,
+        blocked_buffer_size: int = RABBITMQ_PUBLISH_BLOCKED_BUFFER_SIZE_DEFAULT,
     ):
         self._publish_retry_delay = publish_retry_delay
         self._publish_max_retries = publish_max_retries
+        self._connection: Optional[BlockingConnection] = None
+        self._channel: Optional[BlockingChannel] = None
+        self._batch_channel: Optional[BlockingChannel] = None
+        self._batch_confirms: Optional[_Confirms] = None
+        self._confirm_timeout = confirm_timeout
+        self._flow_control = FlowControl(blocked_buffer_size)
+        # Reentrant, because publishing and keeping alive release buffered messages with publish_batch.
+        self._lock = RLock()
         credentials = PlainCredentials(server_details.username, server_details.password)
         self._connection_params = ConnectionParameters(
             host=server_details.host,
             port=server_details.port,
             virtual_host=server_details.vhost,
             credentials=credentials,
+            blocked_connection_timeout=blocked_connection_timeout,  # type: ignore[arg-type]
         )
 
         if server_details.uses_ssl:
@@ -46,6 +182,17 @@ class BasicPublisher:
             self.configure_verify_cert(ssl_context, verify_cert=verify_cert)
             self._connection_params.ssl_options = SSLOptions(ssl_context)
 
+        self._outbox = outbox
+        if outbox is not None:
+            # The drainer runs in its own thread, so it needs its own publisher, which leaves retries to the drainer.
+            drainer_publisher = BasicPublisher(server_details, publish_retry_delay, 1, verify_cert, confirm_timeout)
+            outbox.start_draining(drainer_publisher, publish_retry_delay)
+
+    @property
+    def flow_control_stats(self) -> FlowControlStats:
+        with self._lock:
+            return self._flow_control.stats
+
     def configure_verify_cert(self, ssl_context: ssl.SSLContext, verify_cert: bool = True) -> None:
         verify_mode = ssl.CERT_REQUIRED if verify_cert else ssl.CERT_NONE
         ssl_context.check_hostname = verify_cert
@@ -70,27 +217,319 @@ class BasicPublisher:
         schema_version,
         encoder_type=RABBITMQ_HEADER_VALUE_ENCODER_TYPE_DEFAULT,
     ):
+        with self._lock:
+            LOGGER.info(
+                f"Publishing message to exchange '{exchange}', routing key '{routing_key}', "
+                f"schema subject '{subject}', schema version '{schema_version}'."
+            )
+            message = OutgoingMessage(exchange, routing_key, body, subject, schema_version, encoder_type)
+            if self._is_blocked():
+                self._defer(message)
+                return
+
+            self._release_buffered()
+            MESSAGE_LOGGER.info(f"Published message body:  {body}")
+            properties = message_properties(subject, schema_version, encoder_type)
+
+            def publish(channel: BlockingChannel) -> None:
+                channel.basic_publish(exchange=exchange, routing_key=routing_key, body=body, properties=properties)
+
+            if self._outbox is not None:
+                self._publish_or_save(self._outbox, message, publish)
+            else:
+                self._do_publish_with_retry(lambda: self._with_channel(publish))
+
+    def publish_batch(self, messages: Sequence[OutgoingMessage]) -> List[PublishResult]:
+        """Publish messages back to back and then wait for the broker to confirm them all, rather than waiting for each
+        confirm in turn as `publish_message` does. Messages that are nacked, or not confirmed within the confirm
+        timeout, are published again, up to the publisher's maximum number of attempts, without repeating the messages
+        that were confirmed.
+
+        Arguments:
+            messages (Sequence[OutgoingMessage]): the messages to publish.
+
+        Given an outbox, a single attempt is made and the messages that aren't confirmed are saved to the outbox, in
+        order. While the outbox holds messages, or the connection is blocked, the whole batch is saved behind them.
+
+        Returns:
+            List[PublishResult]: whether each message was published and the number of attempts made, in the order of
+            the messages given. While the connection is blocked, no attempts are made.
+        """
+        with self._lock:
+            if self._outbox is not None:
+                return self._publish_batch_or_save(self._outbox, messages)
+
+            if self._is_blocked():
+                LOGGER.warning(
+                    f"RabbitMQ has blocked the connection, so a batch of {len(messages)} messages was not published."
+                )
+                return [PublishResult(message=message, published=False, attempts=0) for message in messages]
+
+            published = [False] * len(messages)
+            attempts = [0] * len(messages)
+            remaining = list(range(len(messages)))
+            LOGGER.info(f"Publishing a batch of {len(messages)} messages.")
+
+            while remaining:
+                for index in remaining:
+                    attempts[index] += 1
+
+                confirmed = self._publish_and_confirm([(index, messages[index]) for index in remaining])
+                remaining = [index for index in remaining if not confirmed.get(index, False)]
+                for index in confirmed:
+                    published[index] = confirmed[index]
+
+                if not remaining:
+                    LOGGER.info(f"The batch of {len(messages)} messages was published to RabbitMQ successfully.")
+                    break
+
+                if attempts[remaining[0]] >= self._publish_max_retries:
+                    LOGGER.error(
+                        "Maximum number of retries exceeded for a batch being published to RabbitMQ. "
+                        f"{len(remaining)} of {len(messages)} messages were NOT PUBLISHED!"
+                    )
+                    break
+
+                LOGGER.warning(f"{len(remaining)} of {len(messages)} batch messages were not confirmed, retrying them.")
+                time.sleep(self._publish_retry_delay)
+
+            return [
+                PublishResult(message=message, published=published[index], attempts=attempts[index])
+                for index, message in enumerate(messages)
+            ]
+
+    def publish_fanout(self, message: RabbitMessage, destinations: Sequence[Tuple[str, str]]) -> List[PublishResult]:
+        """Publish the same message to several exchanges and routing keys, e.g. to an audit exchange as well as the
+        message's downstream consumers. The encoded body and its properties are shared by every destination, which are
+        published to on one channel before waiting for their confirms together, as `publish_batch` does.
+
+        Arguments:
+            message (RabbitMessage): the message to publish.
+            destinations (Sequence[Tuple[str, str]]): the exchange and routing key of each destination.
+
+        Returns:
+            List[PublishResult]: whether the message was published to each destination and the number of attempts
+            made, in the order of the destinations given.
+        """
+        subject = message.subject
+        schema_version = message.writer_schema_version
+        encoder_type = message.encoder_type
         LOGGER.info(
-            f"Publishing message to exchange '{exchange}', routing key '{routing_key}', "
-            f"schema subject '{subject}', schema version '{schema_version}'."
-        )
-        MESSAGE_LOGGER.info(f"Published message body:  {body}")
-        properties = BasicProperties(
-            delivery_mode=PERSISTENT_DELIVERY_MODE,
-            headers={
-                RABBITMQ_HEADER_KEY_SUBJECT: subject,
-                RABBITMQ_HEADER_KEY_VERSION: schema_version,
-                RABBITMQ_HEADER_KEY_ENCODER_TYPE: encoder_type,
-            },
+            f"Publishing message with schema subject '{subject}', schema version '{schema_version}' to "
+            f"{len(destinations)} destinations."
         )
 
-        connection = BlockingConnection(self._connection_params)
-        channel = connection.channel()
-        channel.confirm_delivery()  # Force exceptions when Rabbit cannot deliver the message
-        self._do_publish_with_retry(
-            lambda: channel.basic_publish(exchange=exchange, routing_key=routing_key, body=body, properties=properties)
+        return self.publish_batch(
+            [
+                OutgoingMessage(exchange, routing_key, message.encoded_body, subject, schema_version, encoder_type)
+                for exchange, routing_key in destinations
+            ]
         )
-        connection.close()
+
+    def keep_alive(self) -> None:
+        """Answer heartbeats and other events on the connection, if one is open, so the broker doesn't close it while
+        nothing is being published. Call this every few seconds while the publisher is idle. Messages buffered while the
+        connection was blocked are published once it is unblocked.
+        """
+        with self._lock:
+            self._process_events()
+            self._release_buffered()
+
+    def close(self) -> None:
+        """Close the connection to the RabbitMQ server, if one is open. Publishing again opens a new connection."""
+        with self._lock:
+            connection = self._connection
+            self._connection = None
+            self._channel = None
+            self._batch_channel = None
+            self._batch_confirms = None
+            # A new connection starts unblocked.
+            self._flow_control.on_unblocked()
+
+            if connection is not None and connection.is_open:
+                try:
+                    connection.close()
+                except AMQPConnectionError as ex:
+                    LOGGER.warning(f"Error closing connection to RabbitMQ: {ex}")
+
+    def _process_events(self) -> None:
+        if self._connection is None or not self._connection.is_open:
+            return
+
+        try:
+            self._connection.process_data_events(time_limit=0)
+        except RECONNECT_ERRORS as ex:
+            LOGGER.warning(f"Lost idle connection to RabbitMQ ({ex!r}), reconnecting on the next publish.")
+            self.close()
+
+    def _is_blocked(self) -> bool:
+        if self._flow_control.is_blocked:
+            # Picks up a connection.unblocked sent since the connection was last used.
+            self._process_events()
+
+        return self._flow_control.is_blocked
+
+    def _defer(self, message: OutgoingMessage) -> None:
+        if self._outbox is not None:
+            LOGGER.warning("RabbitMQ has blocked the connection, saving the message to the publish outbox.")
+            self._outbox.append(message)
+        else:
+            self._flow_control.buffer(message)
+            LOGGER.warning(
+                "RabbitMQ has blocked the connection, buffering the message until it is unblocked "
+                f"({self._flow_control.buffered} buffered)."
+            )
+
+    def _release_buffered(self) -> None:
+        if not self._flow_control.buffered or self._is_blocked():
+            return
+
+        messages = self._flow_control.release()
+        LOGGER.info(f"Publishing {len(messages)} messages buffered while the connection was blocked.")
+        self.publish_batch(messages)
+
+    def _open_connection(self) -> BlockingConnection:
+        if self._connection is None or not self._connection.is_open:
+            LOGGER.debug("Opening a connection to RabbitMQ for publishing.")
+            self._connection = BlockingConnection(self._connection_params)
+            # pika's stubs leave out the connection passed to the callback.
+            self._connection.add_on_connection_blocked_callback(self._flow_control.on_blocked)  # type: ignore[arg-type]
+            self._connection.add_on_connection_unblocked_callback(self._flow_control.on_unblocked)
+
+        return self._connection
+
+    def _open_channel(self) -> BlockingChannel:
+        if self._channel is not None and self._channel.is_open:
+            return self._channel
+
+        self._channel = self._open_connection().channel()
+        self._channel.confirm_delivery()  # Force exceptions when Rabbit cannot deliver the message
+
+        return self._channel
+
+    def _open_batch_channel(self) -> Tuple[BlockingConnection, BlockingChannel, _Confirms]:
+        connection = self._open_connection()
+        if self._batch_channel is None or not self._batch_channel.is_open or self._batch_confirms is None:
+            self._batch_channel = connection.channel()
+            # Waking the connection once every confirm is in ends the wait in _wait_for_confirms straight away.
+            self._batch_confirms = _Confirms(lambda: connection.add_callback_threadsafe(lambda: None))
+            # A blocking channel in confirm mode waits for each message's confirm as it is published, so batches enable
+            # confirms on the underlying channel instead and count them as they arrive.
+            impl = self._batch_channel._impl  # type: ignore[attr-defined]
+            impl.confirm_delivery(ack_nack_callback=self._batch_confirms.on_confirm)
+
+        return connection, self._batch_channel, self._batch_confirms
+
+    def _publish_and_confirm(self, batch: Sequence[Tuple[int, OutgoingMessage]]) -> Dict[int, bool]:
+        """Publish messages on the batch channel and wait for their confirms. Returns whether each message was acked,
+        by its index, and leaves out messages that weren't confirmed in time.
+        """
+        confirms: Optional[_Confirms] = None
+        try:
+            connection, channel, confirms = self._open_batch_channel()
+            confirms.start_batch()
+
+            for index, message in batch:
+                MESSAGE_LOGGER.info(f"Published message body:  {message.body!r}")
+                channel.basic_publish(
+                    exchange=message.exchange,
+                    routing_key=message.routing_key,
+                    body=message.body,
+                    properties=message_properties(message.subject, message.schema_version, message.encoder_type),
+                )
+                confirms.published(index)
+
+            self._wait_for_confirms(connection, confirms)
+        except RECONNECT_ERRORS as ex:
+            LOGGER.warning(f"Lost connection to RabbitMQ while publishing a batch ({ex!r}).")
+            self.close()
+
+        return dict(confirms.confirmed) if confirms is not None else {}
+
+    def _wait_for_confirms(self, connection: BlockingConnection, confirms: _Confirms) -> None:
+        deadline = time.monotonic() + self._confirm_timeout
+        while confirms.outstanding:
+            time_limit = deadline - time.monotonic()
+            if time_limit <= 0:
+                LOGGER.warning(f"Timed out waiting for RabbitMQ to confirm {len(confirms.outstanding)} messages.")
+                return
+
+            # Returns as soon as the last confirm arrives, so whole seconds only bound the wait.
+            connection.process_data_events(time_limit=math.ceil(time_limit))
+
+    def _with_channel(self, action: Callable[[BlockingChannel], None]) -> None:
+        """Run an action on the open channel, opening a new connection and running it again if the connection or
+        channel turns out to have been lost, e.g. to a missed heartbeat while idle or a broker restart.
+        """
+        try:
+            action(self._open_channel())
+        except ConnectionBlockedTimeout as ex:
+            # Reconnecting won't help until the broker's alarm clears.
+            self.close()
+            raise ConnectionBlockedError(f"RabbitMQ blocked the connection for too long while publishing ({ex!r}).")
+        except RECONNECT_ERRORS as ex:
+            LOGGER.warning(f"Lost connection to RabbitMQ ({ex!r}), reconnecting.")
+            self.close()
+            action(self._open_channel())
+
+    def _publish_or_save(
+        self, outbox: "PublishOutbox", message: OutgoingMessage, publish: Callable[[BlockingChannel], None]
+    ) -> None:
+        if len(outbox) > 0:
+            # Published after the messages already waiting, to keep messages in order.
+            LOGGER.info(f"Saving the message to the publish outbox behind {len(outbox)} waiting messages.")
+            outbox.append(message)
+            return
+
+        try:
+            self._with_channel(publish)
+        except (AMQPError, ConnectionBlockedError) as ex:
+            LOGGER.warning(f"Message could not be published ({ex!r}), saving it to the publish outbox to retry later.")
+            outbox.append(message)
+            return
+
+        LOGGER.info("The message was published to RabbitMQ successfully.")
+
+    def _publish_batch_or_save(
+        self, outbox: "PublishOutbox", messages: Sequence[OutgoingMessage]
+    ) -> List[PublishResult]:
+        if len(outbox) > 0 or self._is_blocked():
+            # Published after the messages already waiting, to keep messages in order.
+            LOGGER.info(
+                f"Saving a batch of {len(messages)} messages to the publish outbox behind {len(outbox)} waiting."
+            )
+            for message in messages:
+                outbox.append(message)
+
+            return [PublishResult(message=message, published=False, attempts=0, saved=True) for message in messages]
+
+        LOGGER.info(f"Publishing a batch of {len(messages)} messages.")
+        try:
+            confirmed = self._publish_and_confirm(list(enumerate(messages)))
+        except (AMQPError, ConnectionBlockedError) as ex:
+            LOGGER.warning(f"Batch could not be published ({ex!r}).")
+            confirmed = {}
+
+        unpublished = [message for index, message in enumerate(messages) if not confirmed.get(index, False)]
+        if unpublished:
+            LOGGER.warning(
+                f"{len(unpublished)} of {len(messages)} batch messages were not confirmed, saving them to the publish "
+                "outbox to retry later."
+            )
+            for message in unpublished:
+                outbox.append(message)
+        else:
+            LOGGER.info(f"The batch of {len(messages)} messages was published to RabbitMQ successfully.")
+
+        return [
+            PublishResult(
+                message=message,
+                published=confirmed.get(index, False),
+                attempts=1,
+                saved=not confirmed.get(index, False),
+            )
+            for index, message in enumerate(messages)
+        ]
 
     def _do_publish_with_retry(self, publish_method):
         retry_count = 0
@@ -115,3 +554,33 @@ class BasicPublisher:
             LOGGER.error(f"Publish of message to RabbitMQ required {retry_count} retries.")
 
         LOGGER.info("The message was published to RabbitMQ successfully.")
+
+
+class PublisherKeepAlive(Thread):
+    """Calls `keep_alive` on a BasicPublisher from a background thread every `interval` seconds, so its connection
+    answers the broker's heartbeats and publishes buffered messages while the threads publishing with it are idle. Call
+    `stop` to stop the thread and close the publisher's connection.
+    """
+
+    def __init__(self, publisher: BasicPublisher, interval: float = RABBITMQ_PUBLISH_KEEP_ALIVE_INTERVAL):
+        super().__init__()
+        self.name = type(self).__name__
+        self.daemon = True
+        self._publisher = publisher
+        self._interval = interval
+        self._stopping = Event()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stopping.set()
+        if self.is_alive():
+            self.join(timeout)
+
+    def run(self) -> None:
+        try:
+            while not self._stopping.wait(self._interval):
+                try:
+                    self._publisher.keep_alive()
+                except Exception:
+                    LOGGER.exception("Unexpected error keeping the RabbitMQ publisher's connection alive.")
+        finally:
+            self._publisher.close()
@@ -0,0 +1,143 @@
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, NamedTuple, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None  # type: ignore
+
+# Columns of records keyed by field name. Decoded columns are NumPy arrays, while columns to encode can be NumPy
+# arrays, masked arrays or any other sequence.
+Columns = Dict[str, Any]
+
+_PRIMITIVE_DTYPES = {
+    "boolean": "bool",
+    "int": "int32",
+    "long": "int64",
+    "float": "float32",
+    "double": "float64",
+}
+
+
+class ColumnType(NamedTuple):
+    dtype: Any
+    nullable: bool
+
+
+def _numpy() -> Any:
+    if np is None:
+        raise ImportError("NumPy is required for columnar encoding and decoding. Install lab-share-lib[columnar].")
+
+    return np
+
+
+def _column_type(field_type: Any) -> ColumnType:
+    if isinstance(field_type, list):
+        branches = [branch for branch in field_type if branch != "null"]
+        nullable = len(branches) < len(field_type)
+        if len(branches) == 1:
+            return ColumnType(_column_type(branches[0]).dtype, nullable)
+
+        return ColumnType(object, nullable)
+
+    # Strings, bytes, enums, logical types and complex types are kept as Python objects.
+    if isinstance(field_type, str) and field_type in _PRIMITIVE_DTYPES:
+        return ColumnType(np.dtype(_PRIMITIVE_DTYPES[field_type]), False)
+
+    return ColumnType(object, False)
+
+
+def column_types(parsed_schema: Any) -> Dict[str, ColumnType]:
+    """Work out the NumPy type of the column for each field of a record schema. Fields that can be null are given
+    masked arrays, with the mask set where the value is null.
+
+    Arguments:
+        parsed_schema (Any): a record schema, as parsed by fastavro.parse_schema.
+
+    Returns:
+        Dict[str, ColumnType]: the dtype of each field's column and whether the column is nullable, in field order.
+    """
+    _numpy()
+
+    if not isinstance(parsed_schema, dict) or parsed_schema.get("type") != "record":
+        raise ValueError("Columnar encoding and decoding is only possible for record schemas.")
+
+    return {field["name"]: _column_type(field["type"]) for field in parsed_schema["fields"]}
+
+
+def _object_array(values: Tuple) -> Any:
+    # Filling an empty array stops NumPy from turning values that are lists into extra dimensions.
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+
+    return array
+
+
+def _to_array(values: Tuple, column_type: ColumnType) -> Any:
+    if not column_type.nullable:
+        return _object_array(values) if column_type.dtype is object else np.array(values, dtype=column_type.dtype)
+
+    mask = np.fromiter((value is None for value in values), dtype=bool, count=len(values))
+    if column_type.dtype is object:
+        data = _object_array(values)
+    elif mask.any():
+        fill_value = column_type.dtype.type(0)
+        data = np.array([fill_value if value is None else value for value in values], dtype=column_type.dtype)
+    else:
+        data = np.array(values, dtype=column_type.dtype)
+
+    return np.ma.MaskedArray(data, mask=mask)
+
+
+def _field_values(field_names: List[str]) -> Callable[[Any], Tuple]:
+    if len(field_names) == 1:
+        field_name = field_names[0]
+        return lambda record: (record[field_name],)
+
+    return itemgetter(*field_names)
+
+
+def columns_from_records(records: Iterable[Any], parsed_schema: Any) -> Columns:
+    """Gather records into a NumPy array per field. Each record only needs to exist while its values are taken from it,
+    so records decoded lazily are never all held in memory as dicts at once.
+
+    Arguments:
+        records (Iterable[Any]): the records, matching the schema.
+        parsed_schema (Any): the record schema, as parsed by fastavro.parse_schema.
+
+    Returns:
+        Columns: an array per field of the schema, in field order.
+    """
+    types = column_types(parsed_schema)
+    field_names = list(types)
+    field_values = _field_values(field_names)
+
+    rows = [field_values(record) for record in records]
+    values_by_field = list(zip(*rows)) if rows else [()] * len(field_names)
+
+    return {name: _to_array(values, types[name]) for name, values in zip(field_names, values_by_field)}
+
+
+def records_from_columns(columns: Mapping[str, Any]) -> Iterator[dict]:
+    """Iterate over the records held in columns, for encoders to write one at a time. The same dict is updated and
+    yielded for every record, so each record must be written before the next is requested. Masked values and None are
+    written as null.
+
+    Arguments:
+        columns (Mapping[str, Any]): a sequence of values per field. Fields with defaults can be left out.
+
+    Returns:
+        Iterator[dict]: a view of each record in turn.
+    """
+    field_names = list(columns)
+    values_by_field = [column.tolist() if hasattr(column, "tolist") else list(column) for column in columns.values()]
+
+    if len({len(values) for values in values_by_field}) > 1:
+        raise ValueError("All columns must have the same number of values.")
+
+    record: dict = {}
+    for values in zip(*values_by_field):
+        for field_name, value in zip(field_names, values):
+            record[field_name] = value
+
+        yield record
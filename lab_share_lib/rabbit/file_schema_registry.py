@@ -0,0 +1,75 @@
+import logging
+import os
+from typing import Dict
+
+from lab_share_lib.rabbit.schema_registry import RESPONSE_KEY_SCHEMA, RESPONSE_KEY_VERSION, SchemaRegistryBase
+
+LOGGER = logging.getLogger(__name__)
+
+SCHEMA_FILE_EXTENSION = ".avsc"
+LATEST_VERSION = "latest"
+
+# Error codes returned by the Redpanda schema registry, used for the same lookups here.
+ERROR_CODE_SUBJECT_NOT_FOUND = 40401
+ERROR_CODE_VERSION_NOT_FOUND = 40402
+ERROR_CODE_SCHEMA_NOT_FOUND = 40403
+
+
+class FileSchemaRegistry(SchemaRegistryBase):
+    """A schema registry serving schemas from files in a local directory, for use without a Redpanda schema registry,
+    such as offline or in benchmarks. The directory holds a directory per subject with a file per schema version, e.g.
+    `<directory>/create-plate-map/7.avsc`, and `latest` is the highest version present.
+
+    Every schema is read into memory when the registry is created, so lookups never touch the disk or the network.
+    Responses have the same keys as the Redpanda schema registry's, apart from the schema ID, which only a registry can
+    assign. Missing subjects and versions return the same errors as the Redpanda schema registry.
+    """
+
+    def __init__(self, directory: str):
+        self._directory = directory
+        self._responses: Dict[str, Dict[int, dict]] = self._load(directory)
+
+    @staticmethod
+    def _load(directory: str) -> Dict[str, Dict[int, dict]]:
+        responses: Dict[str, Dict[int, dict]] = {}
+
+        for subject in sorted(os.listdir(directory)):
+            subject_dir = os.path.join(directory, subject)
+            if not os.path.isdir(subject_dir):
+                continue
+
+            for file_name in os.listdir(subject_dir):
+                version, extension = os.path.splitext(file_name)
+                if extension != SCHEMA_FILE_EXTENSION or not version.isdigit():
+                    continue
+
+                with open(os.path.join(subject_dir, file_name), encoding="utf-8") as schema_file:
+                    responses.setdefault(subject, {})[int(version)] = {
+                        "subject": subject,
+                        RESPONSE_KEY_VERSION: int(version),
+                        RESPONSE_KEY_SCHEMA: schema_file.read(),
+                    }
+
+        LOGGER.info(
+            f"Loaded {sum(len(versions) for versions in responses.values())} schemas for {len(responses)} subjects "
+            f"from {directory}."
+        )
+
+        return responses
+
+    def get_schema(self, subject: str, version: str = LATEST_VERSION) -> dict:
+        versions = self._responses.get(subject)
+        if not versions:
+            return {"error_code": ERROR_CODE_SUBJECT_NOT_FOUND, "message": f"Subject '{subject}' not found."}
+
+        if str(version) == LATEST_VERSION:
+            return versions[max(versions)]
+
+        response = versions.get(int(version)) if str(version).isdigit() else None
+        if response is None:
+            return {"error_code": ERROR_CODE_VERSION_NOT_FOUND, "message": f"Version {version} not found."}
+
+        return response
+
+    def get_schema_by_id(self, schema_id: int) -> dict:
+        return {"error_code": ERROR_CODE_SCHEMA_NOT_FOUND, "message": f"Schema {schema_id} not found."}
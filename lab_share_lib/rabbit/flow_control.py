@@ -0,0 +1,116 @@
+import logging
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Any, Callable, Deque, List, NamedTuple, Optional
+
+from pika.frame import Method
+
+from lab_share_lib.exceptions import ConnectionBlockedError
+
+if TYPE_CHECKING:
+    from lab_share_lib.rabbit.basic_publisher import OutgoingMessage
+
+LOGGER = logging.getLogger(__name__)
+
+
+class FlowControlStats(NamedTuple):
+    blocked: bool
+    times_blocked: int
+    blocked_seconds: float
+    buffered: int
+    buffer_size: int
+    rejected: int
+
+
+class FlowControl:
+    """Tracks whether RabbitMQ has blocked a publisher's connection, and buffers messages published while it is blocked.
+
+    RabbitMQ blocks connections that publish while it has a memory or disk alarm, and stops reading from them until the
+    alarm clears. Rather than waiting inside a publish, a publisher buffers up to `buffer_size` messages to publish once
+    the connection is unblocked, and rejects any more with a ConnectionBlockedError, so callers can defer their work.
+    """
+
+    def __init__(self, buffer_size: int, clock: Callable[[], float] = time.monotonic):
+        self._buffer_size = buffer_size
+        self._clock = clock
+        self._buffered: Deque["OutgoingMessage"] = deque()
+        self._blocked_since: Optional[float] = None
+        self._times_blocked = 0
+        self._blocked_seconds = 0.0
+        self._rejected = 0
+
+    @property
+    def is_blocked(self) -> bool:
+        return self._blocked_since is not None
+
+    @property
+    def buffered(self) -> int:
+        return len(self._buffered)
+
+    def on_blocked(self, _connection: Any, frame: Method) -> None:
+        if self._blocked_since is not None:
+            return
+
+        LOGGER.warning(f"RabbitMQ blocked the publisher's connection: {getattr(frame.method, 'reason', '')}")
+        self._blocked_since = self._clock()
+        self._times_blocked += 1
+
+    def on_unblocked(self, _connection: Any = None, _frame: Optional[Method] = None) -> None:
+        """Record that the connection is no longer blocked. Also called when the connection closes, as a new connection
+        starts unblocked.
+        """
+        if self._blocked_since is None:
+            return
+
+        blocked_for = self._clock() - self._blocked_since
+        LOGGER.info(f"RabbitMQ unblocked the publisher's connection after {blocked_for:.1f} seconds.")
+        self._blocked_seconds += blocked_for
+        self._blocked_since = None
+
+    def buffer(self, message: "OutgoingMessage") -> None:
+        """Buffer a message until the connection is unblocked.
+
+        Arguments:
+            message (OutgoingMessage): the message to publish once unblocked.
+
+        Raises:
+            ConnectionBlockedError: the buffer is full.
+        """
+        if len(self._buffered) >= self._buffer_size:
+            self.reject(f"{len(self._buffered)} messages are already buffered")
+
+        self._buffered.append(message)
+
+    def reject(self, reason: str = "the message can't be buffered") -> None:
+        """Reject a message published while the connection is blocked.
+
+        Arguments:
+            reason (str): why the message can't wait for the connection to be unblocked.
+
+        Raises:
+            ConnectionBlockedError: always.
+        """
+        self._rejected += 1
+        raise ConnectionBlockedError(f"RabbitMQ has blocked the publisher's connection and {reason}.")
+
+    def release(self) -> List["OutgoingMessage"]:
+        """Take the buffered messages, oldest first, to be published."""
+        released = list(self._buffered)
+        self._buffered.clear()
+
+        return released
+
+    @property
+    def stats(self) -> FlowControlStats:
+        blocked_seconds = self._blocked_seconds
+        if self._blocked_since is not None:
+            blocked_seconds += self._clock() - self._blocked_since
+
+        return FlowControlStats(
+            blocked=self.is_blocked,
+            times_blocked=self._times_blocked,
+            blocked_seconds=blocked_seconds,
+            buffered=len(self._buffered),
+            buffer_size=self._buffer_size,
+            rejected=self._rejected,
+        )
@@ -0,0 +1,183 @@
+import logging
+import math
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from threading import Lock
+from typing import Callable, Deque, Dict, List, NamedTuple, Optional, Sequence
+
+from lab_share_lib.constants import (
+    SCHEMA_REGISTRY_ENDPOINT_COOLDOWN_DEFAULT,
+    SCHEMA_REGISTRY_HEDGE_DELAY_DEFAULT,
+    SCHEMA_REGISTRY_HEDGE_PERCENTILE_DEFAULT,
+    SCHEMA_REGISTRY_LATENCY_MIN_SAMPLES,
+    SCHEMA_REGISTRY_LATENCY_WINDOW_DEFAULT,
+)
+from lab_share_lib.rabbit.registry_session import RegistrySession
+from lab_share_lib.rabbit.schema_cache import FetchResult
+
+LOGGER = logging.getLogger(__name__)
+
+
+class EndpointStats(NamedTuple):
+    base_uri: str
+    requests: int
+    failures: int
+    median_latency: Optional[float]
+    hedge_delay: float
+    healthy: bool
+
+
+class _Endpoint:
+    __slots__ = ("base_uri", "index", "latencies", "requests", "failures", "unhealthy_until")
+
+    def __init__(self, base_uri: str, index: int, latency_window: int):
+        self.base_uri = base_uri
+        self.index = index
+        self.latencies: Deque[float] = deque(maxlen=latency_window)
+        self.requests = 0
+        self.failures = 0
+        self.unhealthy_until = 0.0
+
+
+def _percentile(samples: Sequence[float], percentile: float) -> float:
+    ordered = sorted(samples)
+    rank = math.ceil(percentile / 100 * len(ordered))
+
+    return ordered[min(max(rank, 1), len(ordered)) - 1]
+
+
+class HedgedFetcher:
+    """Fetches JSON from whichever of several replicas of a schema registry answers first.
+
+    Each request goes to the preferred endpoint: the healthy endpoint with the lowest median latency, or the first
+    endpoint given until latencies are known. If it hasn't answered within `hedge_percentile` of that endpoint's recent
+    latencies, the request is repeated on the next endpoint, and so on, and the first answer is used. An endpoint that
+    fails is tried again straight away on the next endpoint, and is only used as a last resort for `failure_cooldown`
+    seconds. Requests that lose the race are left to finish in the background so their latency is still recorded.
+    """
+
+    def __init__(
+        self,
+        base_uris: Sequence[str],
+        session: RegistrySession,
+        hedge_percentile: float = SCHEMA_REGISTRY_HEDGE_PERCENTILE_DEFAULT,
+        hedge_delay: float = SCHEMA_REGISTRY_HEDGE_DELAY_DEFAULT,
+        latency_window: int = SCHEMA_REGISTRY_LATENCY_WINDOW_DEFAULT,
+        failure_cooldown: float = SCHEMA_REGISTRY_ENDPOINT_COOLDOWN_DEFAULT,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if len(base_uris) < 2:
+            raise ValueError("HedgedFetcher needs at least two base URIs.")
+
+        if not 0 < hedge_percentile <= 100:
+            raise ValueError("HedgedFetcher hedge_percentile must be greater than 0 and at most 100.")
+
+        self._endpoints = [_Endpoint(base_uri, index, latency_window) for index, base_uri in enumerate(base_uris)]
+        self._session = session
+        self._hedge_percentile = hedge_percentile
+        self._default_hedge_delay = hedge_delay
+        self._failure_cooldown = failure_cooldown
+        self._clock = clock
+        self._lock = Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=2 * len(base_uris) + 2, thread_name_prefix="SchemaRegistryHedge"
+        )
+
+    def _hedge_delay(self, endpoint: _Endpoint) -> float:
+        if len(endpoint.latencies) < SCHEMA_REGISTRY_LATENCY_MIN_SAMPLES:
+            return self._default_hedge_delay
+
+        return _percentile(endpoint.latencies, self._hedge_percentile)
+
+    def _ordered_endpoints(self) -> List[_Endpoint]:
+        now = self._clock()
+        with self._lock:
+            return sorted(
+                self._endpoints,
+                key=lambda endpoint: (
+                    endpoint.unhealthy_until > now,
+                    _percentile(endpoint.latencies, 50) if endpoint.latencies else math.inf,
+                    endpoint.index,
+                ),
+            )
+
+    def _timed_fetch(self, endpoint: _Endpoint, path: str, verify: bool) -> FetchResult:
+        started_at = self._clock()
+        try:
+            result = self._session.fetch_json(f"{endpoint.base_uri}/{path}", verify)
+        except Exception:
+            with self._lock:
+                endpoint.requests += 1
+                endpoint.failures += 1
+                endpoint.unhealthy_until = self._clock() + self._failure_cooldown
+            raise
+
+        with self._lock:
+            endpoint.requests += 1
+            endpoint.latencies.append(self._clock() - started_at)
+            endpoint.unhealthy_until = 0.0
+
+        return result
+
+    def fetch_json(self, path: str, verify: bool) -> FetchResult:
+        """Get the JSON body of a response from the first endpoint to answer.
+
+        Arguments:
+            path (str): the path to get, relative to the base URIs.
+            verify (bool): whether to verify the registry's TLS certificate.
+
+        Returns:
+            FetchResult: the body of the first response and whether it was successful.
+
+        Raises:
+            TransientRabbitError: every endpoint failed.
+        """
+        endpoints = self._ordered_endpoints()
+        hedge_delay = self._hedge_delay(endpoints[0])
+        pending: Dict["Future[FetchResult]", _Endpoint] = {}
+        last_error: Optional[BaseException] = None
+
+        for attempt, endpoint in enumerate(endpoints):
+            if attempt > 0 and pending:
+                LOGGER.debug(f"Sending a hedged request for {path} to {endpoint.base_uri}.")
+            pending[self._executor.submit(self._timed_fetch, endpoint, path, verify)] = endpoint
+
+            is_last = attempt == len(endpoints) - 1
+            while pending:
+                done, _ = wait(pending, timeout=None if is_last else hedge_delay, return_when=FIRST_COMPLETED)
+                if not done:
+                    break  # No answer in time, so hedge on the next endpoint.
+
+                for future in done:
+                    failed_endpoint = pending.pop(future)
+                    if future.exception() is None:
+                        return future.result()
+
+                    last_error = future.exception()
+                    LOGGER.warning(f"Schema registry {failed_endpoint.base_uri} failed to get {path}: {last_error}")
+
+                if not is_last:
+                    break  # Fail over to the next endpoint straight away.
+
+        assert last_error is not None
+        raise last_error
+
+    @property
+    def stats(self) -> List[EndpointStats]:
+        now = self._clock()
+        with self._lock:
+            return [
+                EndpointStats(
+                    base_uri=endpoint.base_uri,
+                    requests=endpoint.requests,
+                    failures=endpoint.failures,
+                    median_latency=_percentile(endpoint.latencies, 50) if endpoint.latencies else None,
+                    hedge_delay=self._hedge_delay(endpoint),
+                    healthy=endpoint.unhealthy_until <= now,
+                )
+                for endpoint in self._endpoints
+            ]
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
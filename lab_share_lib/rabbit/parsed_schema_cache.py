@@ -0,0 +1,183 @@
+import logging
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MAX_SIZE = 256
+
+
+class CacheStats(NamedTuple):
+    hits: int
+    misses: int
+    size: int
+    max_size: int
+
+
+class FingerprintedSchema(NamedTuple):
+    subject: str
+    version: str
+    schema: Any
+    fingerprint: bytes
+
+
+class ParsedSchemaCache:
+    """A thread-safe cache of parsed Avro schemas keyed by schema subject and resolved schema version.
+    Decoding the JSON of a schema registry response and parsing it with fastavro is costly to repeat for every message,
+    while the schema for a numbered version never changes. The cache holds at most `max_size` schemas and evicts the
+    least recently used schema when it is full.
+
+    Schemas can also be stored with their fingerprint, in which case they are indexed so that the schema used to write
+    a single-object encoded message can be found from the fingerprint in the message alone. Parsing Canonical Form
+    leaves out logical types and other attributes, so different versions can share a fingerprint, and only the most
+    recently stored of them is found by it.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE):
+        if max_size < 1:
+            raise ValueError("ParsedSchemaCache max_size must be at least 1.")
+
+        self._max_size = max_size
+        self._entries: "OrderedDict[Tuple[str, str], Any]" = OrderedDict()
+        self._fingerprinted: Dict[Tuple[str, str], FingerprintedSchema] = {}
+        self._fingerprint_index: Dict[bytes, Tuple[str, str]] = {}
+        self._lock = Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, subject: str, version: str, parse: Callable[[], Any]) -> Any:
+        """Get the parsed schema for a subject and version, calling `parse` to create it when it isn't cached.
+
+        Arguments:
+            subject (str): the schema subject.
+            version (str): the resolved schema version, e.g. "7" and not "latest".
+            parse (Callable[[], Any]): a function returning the parsed schema for the subject and version.
+
+        Returns:
+            Any: the parsed schema.
+        """
+        key = (subject, version)
+
+        with self._lock:
+            if key in self._entries:
+                self._hits += 1
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+            self._misses += 1
+
+        # Parse outside of the lock so other threads aren't held up. Two threads missing on the same key at once will
+        # both parse the schema, but they produce equivalent results so the last one stored wins.
+        parsed_schema = parse()
+
+        with self._lock:
+            self._store(key, parsed_schema)
+
+        return parsed_schema
+
+    def get_fingerprinted(
+        self, subject: str, version: str, parse: Callable[[], Any], fingerprint: Callable[[Any], bytes]
+    ) -> FingerprintedSchema:
+        """Get the parsed schema and its fingerprint for a subject and version, indexing the schema by fingerprint.
+        The fingerprint is only calculated the first time the schema is requested this way.
+
+        Arguments:
+            subject (str): the schema subject.
+            version (str): the resolved schema version, e.g. "7" and not "latest".
+            parse (Callable[[], Any]): a function returning the parsed schema for the subject and version.
+            fingerprint (Callable[[Any], bytes]): a function returning the fingerprint of a parsed schema.
+
+        Returns:
+            FingerprintedSchema: the subject, version, parsed schema and fingerprint.
+        """
+        key = (subject, version)
+
+        with self._lock:
+            if key in self._fingerprinted:
+                self._hits += 1
+                self._entries.move_to_end(key)
+                return self._fingerprinted[key]
+
+        parsed_schema = self.get(subject, version, parse)
+        fingerprinted_schema = FingerprintedSchema(subject, version, parsed_schema, fingerprint(parsed_schema))
+
+        with self._lock:
+            if key not in self._entries:
+                self._store(key, parsed_schema)  # Evicted while the fingerprint was being calculated.
+
+            self._fingerprinted[key] = fingerprinted_schema
+            self._fingerprint_index[fingerprinted_schema.fingerprint] = key
+
+        return fingerprinted_schema
+
+    def find_fingerprinted(self, subject: str, version: str) -> Optional[FingerprintedSchema]:
+        """Find a schema previously stored with `get_fingerprinted` by its subject and version, without parsing it.
+
+        Arguments:
+            subject (str): the schema subject.
+            version (str): the resolved schema version.
+
+        Returns:
+            Optional[FingerprintedSchema]: the schema, or None if it isn't cached with its fingerprint.
+        """
+        key = (subject, version)
+
+        with self._lock:
+            fingerprinted_schema = self._fingerprinted.get(key)
+            if fingerprinted_schema is None:
+                self._misses += 1
+                return None
+
+            self._hits += 1
+            self._entries.move_to_end(key)
+            return fingerprinted_schema
+
+    def find_by_fingerprint(self, fingerprint: bytes) -> Optional[FingerprintedSchema]:
+        """Find a schema previously stored with `get_fingerprinted` by its fingerprint.
+
+        Arguments:
+            fingerprint (bytes): the fingerprint of the schema.
+
+        Returns:
+            Optional[FingerprintedSchema]: the matching schema, or None if no cached schema has that fingerprint.
+        """
+        with self._lock:
+            key = self._fingerprint_index.get(fingerprint)
+            if key is None:
+                self._misses += 1
+                return None
+
+            self._hits += 1
+            self._entries.move_to_end(key)
+            return self._fingerprinted[key]
+
+    def _store(self, key: Tuple[str, str], parsed_schema: Any) -> None:
+        self._entries[key] = parsed_schema
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_size:
+            evicted_key, _ = self._entries.popitem(last=False)
+            evicted_fingerprinted = self._fingerprinted.pop(evicted_key, None)
+            if (
+                evicted_fingerprinted is not None
+                and self._fingerprint_index.get(evicted_fingerprinted.fingerprint) == evicted_key
+            ):
+                del self._fingerprint_index[evicted_fingerprinted.fingerprint]
+            LOGGER.debug(f"Evicted parsed schema for subject '{evicted_key[0]}' version '{evicted_key[1]}'.")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._fingerprinted.clear()
+            self._fingerprint_index.clear()
+            self._hits = 0
+            self._misses = 0
+
+    @property
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(hits=self._hits, misses=self._misses, size=len(self._entries), max_size=self._max_size)
+
+
+# The cache shared by all encoders unless they are given a cache of their own.
+PARSED_SCHEMA_CACHE = ParsedSchemaCache()
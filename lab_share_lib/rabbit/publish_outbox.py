@@ -0,0 +1,237 @@
+import logging
+import os
+import sqlite3
+from threading import Event, Lock, Thread
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import quote
+
+from lab_share_lib.config.rabbit_server_details import RabbitServerDetails
+from lab_share_lib.constants import RABBITMQ_PUBLISH_BATCH_SIZE_DEFAULT, RABBITMQ_PUBLISH_KEEP_ALIVE_INTERVAL
+from lab_share_lib.rabbit.basic_publisher import OutgoingMessage
+
+if TYPE_CHECKING:
+    from lab_share_lib.rabbit.basic_publisher import BasicPublisher
+
+LOGGER = logging.getLogger(__name__)
+
+OUTBOX_FILE_EXTENSION = ".sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    exchange TEXT NOT NULL,
+    routing_key TEXT NOT NULL,
+    body BLOB NOT NULL,
+    subject TEXT NOT NULL,
+    schema_version TEXT NOT NULL,
+    encoder_type TEXT NOT NULL
+)
+"""
+
+
+class PublishOutbox:
+    """Messages that couldn't be published yet, kept in order in a SQLite database so they survive a restart.
+
+    Messages are taken from the front of the outbox by an OutboxDrainer, which publishes them once the broker accepts
+    messages again and removes them when they are confirmed. The outbox is thread-safe.
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+        self._lock = Lock()
+        self._not_empty = Event()
+        self._drainer: Optional["OutboxDrainer"] = None
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Statements commit straight away, and WAL with full sync makes each append durable once it returns.
+        self._connection = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=FULL")
+        self._connection.execute(_SCHEMA)
+        self._size = int(self._connection.execute("SELECT COUNT(*) FROM messages").fetchone()[0])
+        if self._size:
+            LOGGER.warning(f"Publish outbox {path} holds {self._size} messages waiting to be published.")
+            self._not_empty.set()
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, message: OutgoingMessage) -> None:
+        """Add a message to the end of the outbox.
+
+        Arguments:
+            message (OutgoingMessage): the message to publish later.
+        """
+        with self._lock:
+            self._connection.execute(
+                "INSERT INTO messages (exchange, routing_key, body, subject, schema_version, encoder_type) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    message.exchange,
+                    message.routing_key,
+                    message.body,
+                    message.subject,
+                    str(message.schema_version),
+                    message.encoder_type,
+                ),
+            )
+            self._size += 1
+            self._not_empty.set()
+
+    def peek(self, limit: int) -> List[Tuple[int, OutgoingMessage]]:
+        """Get messages from the front of the outbox without removing them.
+
+        Arguments:
+            limit (int): the most messages to get.
+
+        Returns:
+            List[Tuple[int, OutgoingMessage]]: the ID of each message in the outbox, with the message, oldest first.
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT id, exchange, routing_key, body, subject, schema_version, encoder_type FROM messages "
+                "ORDER BY id LIMIT ?",
+                (limit,),
+            ).fetchall()
+            if not rows:
+                # Clear a wake up from `wake`, so waiting for messages waits again.
+                self._not_empty.clear()
+
+        return [(row[0], OutgoingMessage(row[1], row[2], bytes(row[3]), row[4], row[5], row[6])) for row in rows]
+
+    def remove(self, message_ids: Sequence[int]) -> None:
+        """Remove published messages from the outbox.
+
+        Arguments:
+            message_ids (Sequence[int]): the IDs of the messages, as returned by `peek`.
+        """
+        if not message_ids:
+            return
+
+        with self._lock:
+            cursor = self._connection.executemany("DELETE FROM messages WHERE id = ?", [(id,) for id in message_ids])
+            self._size -= cursor.rowcount
+            if self._size <= 0:
+                self._size = 0
+                self._not_empty.clear()
+
+    def wait(self, timeout: float) -> bool:
+        """Wait for the outbox to hold messages. Returns whether it may hold some, or was woken up."""
+        return self._not_empty.wait(timeout)
+
+    def wake(self) -> None:
+        """Wake up a thread waiting for messages, e.g. so it notices it has been stopped."""
+        self._not_empty.set()
+
+    def start_draining(self, publisher: "BasicPublisher", retry_delay: float) -> None:
+        """Start a drainer publishing the outbox's messages with the publisher, if one isn't running already.
+
+        Arguments:
+            publisher (BasicPublisher): a publisher for the drainer's thread only, which should make a single attempt
+                at publishing each batch as the drainer retries failed messages itself.
+            retry_delay (float): the time to wait before publishing again after messages fail to be published.
+        """
+        with self._lock:
+            if self._drainer is not None and self._drainer.is_alive():
+                return
+
+            self._drainer = OutboxDrainer(self, publisher, retry_delay)
+            self._drainer.start()
+
+    def close(self) -> None:
+        drainer = self._drainer
+        if drainer is not None:
+            drainer.stop()
+
+        with self._lock:
+            self._connection.close()
+
+
+class OutboxDrainer(Thread):
+    """Publishes the messages in a PublishOutbox from a background thread, oldest first, in batches of up to
+    `batch_size`. Confirmed messages are removed from the outbox. When messages fail to be published, the drainer waits
+    for `retry_delay` seconds before publishing them again, so the publishers saving messages to the outbox never wait.
+    """
+
+    def __init__(
+        self,
+        outbox: PublishOutbox,
+        publisher: "BasicPublisher",
+        retry_delay: float,
+        batch_size: int = RABBITMQ_PUBLISH_BATCH_SIZE_DEFAULT,
+    ):
+        super().__init__()
+        self.name = type(self).__name__
+        self.daemon = True
+        self._outbox = outbox
+        self._publisher = publisher
+        self._retry_delay = retry_delay
+        self._batch_size = batch_size
+        self._stopping = Event()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stopping.set()
+        self._outbox.wake()
+        if self.is_alive():
+            self.join(timeout)
+
+    def run(self) -> None:
+        try:
+            while not self._stopping.is_set():
+                if not self._outbox.wait(RABBITMQ_PUBLISH_KEEP_ALIVE_INTERVAL):
+                    self._publisher.keep_alive()
+                elif not self._stopping.is_set() and not self.drain_once():
+                    self._stopping.wait(self._retry_delay)
+        finally:
+            self._publisher.close()
+
+    def drain_once(self) -> bool:
+        """Publish a batch of messages from the front of the outbox. Returns whether they were all published."""
+        entries = self._outbox.peek(self._batch_size)
+        if not entries:
+            return True
+
+        try:
+            results = self._publisher.publish_batch([message for _, message in entries])
+        except Exception:
+            LOGGER.exception("Unexpected error publishing messages from the publish outbox.")
+            return False
+
+        self._outbox.remove([message_id for (message_id, _), result in zip(entries, results) if result.published])
+        published = sum(result.published for result in results)
+        LOGGER.info(f"Published {published} of {len(entries)} messages from the publish outbox.")
+
+        return published == len(entries)
+
+
+_OUTBOXES: Dict[str, PublishOutbox] = {}
+_OUTBOXES_LOCK = Lock()
+
+
+def get_publish_outbox(directory: str, server_details: RabbitServerDetails) -> PublishOutbox:
+    """Get the outbox for messages to a RabbitMQ server, kept in a database file in the directory named after the
+    server. Publishers to the same server share one outbox, and so one drainer, per process.
+
+    Arguments:
+        directory (str): the directory to keep outbox databases in.
+        server_details (RabbitServerDetails): the server the messages are published to.
+
+    Returns:
+        PublishOutbox: the outbox.
+    """
+    file_name = quote(f"{server_details.host}_{server_details.port}_{server_details.vhost}", safe="") or "outbox"
+    path = os.path.abspath(os.path.join(directory, file_name + OUTBOX_FILE_EXTENSION))
+
+    with _OUTBOXES_LOCK:
+        outbox = _OUTBOXES.get(path)
+        if outbox is None:
+            outbox = _OUTBOXES[path] = PublishOutbox(path)
+
+        return outbox
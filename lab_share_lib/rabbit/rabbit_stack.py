@@ -1,14 +1,23 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List
+
 from lab_share_lib.config_readers import get_config
+from lab_share_lib.constants import PREWARM_MAX_WORKERS_DEFAULT
 from lab_share_lib.processing.rabbit_message_processor import RabbitMessageProcessor
 from lab_share_lib.rabbit.background_consumer import BackgroundConsumer
 from lab_share_lib.types import RabbitConfig
 
+LOGGER = logging.getLogger(__name__)
+
 
 class RabbitStack:
     def __init__(self, settings_module=""):
         self._config, _ = get_config(settings_module)
         self.__background_consumers = []
+        self.__message_processors = []
+        self._prewarmed = False
 
     @property
     def _background_consumers(self) -> List[BackgroundConsumer]:
@@ -16,22 +25,68 @@ class RabbitStack:
 
             def create_consumer(rabbit_config: RabbitConfig) -> BackgroundConsumer:
                 message_processor = RabbitMessageProcessor(rabbit_config, self._config)
+                self.__message_processors.append(message_processor)
 
                 return BackgroundConsumer(
                     rabbit_config.consumer_details, rabbit_config.consumed_queue, message_processor.process_message
                 )
 
+            self.__message_processors = []
             self.__background_consumers = [
                 create_consumer(rabbit_config) for rabbit_config in self._config.RABBITMQ_SERVERS
             ]
 
         return self.__background_consumers
 
+    @property
+    def _message_processors(self) -> List[RabbitMessageProcessor]:
+        self._background_consumers
+
+        return self.__message_processors
+
     @property
     def is_healthy(self):
         return all([consumer.is_healthy for consumer in self._background_consumers])
 
-    def bring_stack_up(self):
+    def prewarm(self, max_workers: int = PREWARM_MAX_WORKERS_DEFAULT) -> float:
+        """Fetch the reader schema and known writer schema versions of every subject for all the RabbitMQ servers in
+        parallel, instantiate the subject processors and build the encoders, so that the first messages consumed after
+        starting up are processed as quickly as the rest. Anything that fails is left to happen when the first message
+        needs it, so a failure here doesn't stop the stack coming up.
+
+        Arguments:
+            max_workers (int, optional): the number of threads to prewarm with. Defaults to PREWARM_MAX_WORKERS_DEFAULT.
+
+        Returns:
+            float: how long prewarming took, in seconds.
+        """
+        started_at = time.perf_counter()
+        failures = 0
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="RabbitStackPrewarm") as executor:
+            futures = [
+                future
+                for message_processor in self._message_processors
+                for future in message_processor.prewarm(executor)
+            ]
+
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as ex:
+                    failures += 1
+                    LOGGER.warning(f"Prewarm task failed, so it will be done when the first message needs it: {ex}")
+
+        self._prewarmed = True
+        duration = time.perf_counter() - started_at
+        LOGGER.info(f"Prewarmed RabbitStack in {duration:.3f} seconds ({len(futures)} tasks, {failures} failed).")
+
+        return duration
+
+    def bring_stack_up(self, prewarm: bool = False) -> None:
+        if prewarm and not self._prewarmed:
+            self.prewarm()
+
         for consumer in self._background_consumers:
             if consumer.is_healthy:
                 continue
@@ -0,0 +1,114 @@
+import logging
+import random
+import time
+from typing import Callable
+
+from requests import RequestException, Response, Session
+from requests.adapters import HTTPAdapter
+
+from lab_share_lib.constants import (
+    SCHEMA_REGISTRY_BACKOFF_BASE_DEFAULT,
+    SCHEMA_REGISTRY_BACKOFF_MAX_DEFAULT,
+    SCHEMA_REGISTRY_CONNECT_TIMEOUT_DEFAULT,
+    SCHEMA_REGISTRY_MAX_RETRIES_DEFAULT,
+    SCHEMA_REGISTRY_POOL_SIZE_DEFAULT,
+    SCHEMA_REGISTRY_READ_TIMEOUT_DEFAULT,
+)
+from lab_share_lib.exceptions import TransientRabbitError
+from lab_share_lib.rabbit.schema_cache import FetchResult
+
+LOGGER = logging.getLogger(__name__)
+
+# Too Many Requests, which is worth retrying like a server error.
+HTTP_STATUS_TOO_MANY_REQUESTS = 429
+
+
+class _RetryableResponse(Exception):
+    def __init__(self, response: Response):
+        super().__init__(f"HTTP {response.status_code}")
+        self.response = response
+
+
+class RegistrySession:
+    """Fetches JSON from the schema registry over a pool of keep-alive connections.
+
+    Requests that fail to connect, time out, or get a server error or 429 response are retried up to `max_retries`
+    times, waiting for a random time of up to `backoff_base * 2 ** attempt` seconds (capped at `backoff_max`) between
+    attempts. Other responses, including client errors such as a missing schema, are returned straight away.
+    """
+
+    def __init__(
+        self,
+        connect_timeout: float = SCHEMA_REGISTRY_CONNECT_TIMEOUT_DEFAULT,
+        read_timeout: float = SCHEMA_REGISTRY_READ_TIMEOUT_DEFAULT,
+        max_retries: int = SCHEMA_REGISTRY_MAX_RETRIES_DEFAULT,
+        backoff_base: float = SCHEMA_REGISTRY_BACKOFF_BASE_DEFAULT,
+        backoff_max: float = SCHEMA_REGISTRY_BACKOFF_MAX_DEFAULT,
+        pool_size: int = SCHEMA_REGISTRY_POOL_SIZE_DEFAULT,
+        sleep: Callable[[float], None] = time.sleep,
+        jitter: Callable[[], float] = random.random,
+    ):
+        if max_retries < 0:
+            raise ValueError("RegistrySession max_retries cannot be negative.")
+
+        self._timeout = (connect_timeout, read_timeout)
+        self._max_retries = max_retries
+        self._backoff_base = backoff_base
+        self._backoff_max = backoff_max
+        self._sleep = sleep
+        self._jitter = jitter
+
+        self._session = Session()
+        # Retries are handled here rather than by urllib3 so that server errors are retried with jitter as well.
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    def backoff(self, attempt: int) -> float:
+        """The time to wait before retrying a request that has failed `attempt + 1` times.
+
+        Arguments:
+            attempt (int): the zero-based number of the attempt that failed.
+
+        Returns:
+            float: the time to wait in seconds.
+        """
+        return self._jitter() * min(self._backoff_max, self._backoff_base * 2.0**attempt)
+
+    def fetch_json(self, url: str, verify: bool) -> FetchResult:
+        """Get the JSON body of a response from the schema registry, retrying transient failures.
+
+        Arguments:
+            url (str): the URL to get.
+            verify (bool): whether to verify the registry's TLS certificate.
+
+        Returns:
+            FetchResult: the body of the response and whether it was successful.
+
+        Raises:
+            TransientRabbitError: the registry still failed once retries ran out, or returned a body that isn't JSON.
+        """
+        for attempt in range(self._max_retries + 1):
+            try:
+                response = self._session.get(url, verify=verify, timeout=self._timeout)
+                if response.status_code >= 500 or response.status_code == HTTP_STATUS_TOO_MANY_REQUESTS:
+                    raise _RetryableResponse(response)
+            except (RequestException, _RetryableResponse) as ex:
+                if attempt == self._max_retries:
+                    LOGGER.error(f"Giving up on schema registry request to {url} after {attempt + 1} attempts: {ex}")
+                    break
+
+                delay = self.backoff(attempt)
+                LOGGER.warning(f"Schema registry request to {url} failed ({ex}), retrying in {delay:.3f} seconds.")
+                self._sleep(delay)
+                continue
+
+            try:
+                return FetchResult(body=(dict)(response.json()), ok=response.ok)
+            except Exception:
+                break
+
+        raise TransientRabbitError(f"Unable to connect to schema registry at {url}")
+
+    def close(self) -> None:
+        self._session.close()
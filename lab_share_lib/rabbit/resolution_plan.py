@@ -0,0 +1,172 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, NamedTuple, Optional, Tuple
+
+from lab_share_lib.rabbit.parsed_schema_cache import CacheStats, FingerprintedSchema
+
+DEFAULT_MAX_SIZE = 256
+
+
+class ResolutionPlan(NamedTuple):
+    """How to read data written with one schema using another.
+
+    When `reader_schema` is None, fastavro reads the data with the writer schema alone and `complete` turns the result
+    into the record the reader schema describes by dropping `ignored_fields` and adding `defaults`. Otherwise fastavro
+    has to resolve the writer schema against the reader schema for every record.
+    """
+
+    writer_schema: Any
+    reader_schema: Optional[Any]
+    defaults: Tuple[Tuple[str, Any], ...] = ()
+    ignored_fields: Tuple[str, ...] = ()
+
+    def complete(self, datum: Any) -> Any:
+        """Complete a datum read with the writer schema alone so it matches the reader schema.
+
+        Arguments:
+            datum (Any): the datum read by fastavro using this plan's schemas.
+
+        Returns:
+            Any: the datum, as it would have been read by resolving the writer schema against the reader schema.
+        """
+        for name in self.ignored_fields:
+            del datum[name]
+
+        # Like fastavro, defaults are added after the fields that were written and are shared between records.
+        for name, default in self.defaults:
+            datum[name] = default
+
+        return datum
+
+
+def _is_record(schema: Any) -> bool:
+    return isinstance(schema, dict) and schema.get("type") == "record"
+
+
+def _share_named_schemas(writer_schema: dict, reader_schema: dict) -> bool:
+    # Named types that only one schema defines are only used by fields that only that schema has.
+    writer_named_schemas = writer_schema.get("__named_schemas", {})
+    reader_named_schemas = reader_schema.get("__named_schemas", {})
+
+    return all(
+        writer_named_schemas[name] == reader_named_schemas[name]
+        for name in writer_named_schemas.keys() & reader_named_schemas.keys()
+        if name != writer_schema["name"]
+    )
+
+
+def plan_resolution(writer_schema: FingerprintedSchema, reader_schema: FingerprintedSchema) -> ResolutionPlan:
+    """Work out how to read data written with one schema using another.
+
+    Identical schemas don't need resolving at all. Schemas with the same fingerprint aren't necessarily identical, as
+    Parsing Canonical Form leaves out logical types, which fastavro uses to convert values. The most common evolution
+    of a record, adding fields with defaults and removing fields, doesn't need fastavro to resolve each record either:
+    the fields both schemas share can be read with the writer schema as long as their types are identical. Anything
+    else, including changes that fastavro would reject, is left for fastavro to resolve.
+
+    Arguments:
+        writer_schema (FingerprintedSchema): the schema the data was written with.
+        reader_schema (FingerprintedSchema): the schema the data should be read as.
+
+    Returns:
+        ResolutionPlan: the plan for reading data written with the writer schema as the reader schema.
+    """
+    writer, reader = writer_schema.schema, reader_schema.schema
+
+    if writer == reader:
+        return ResolutionPlan(writer, None)
+
+    if (
+        not _is_record(writer)
+        or not _is_record(reader)
+        or writer["name"] != reader["name"]
+        or not _share_named_schemas(writer, reader)
+    ):
+        return ResolutionPlan(writer, reader)
+
+    writer_fields = {field["name"]: field for field in writer["fields"]}
+    defaults = []
+
+    for field in reader["fields"]:
+        writer_field = writer_fields.get(field["name"])
+
+        if writer_field is None:
+            if "default" not in field or any(alias in writer_fields for alias in field.get("aliases", [])):
+                return ResolutionPlan(writer, reader)
+
+            defaults.append((field["name"], field["default"]))
+        elif writer_field["type"] != field["type"]:
+            return ResolutionPlan(writer, reader)
+
+    reader_field_names = {field["name"] for field in reader["fields"]}
+    ignored_fields = tuple(name for name in writer_fields if name not in reader_field_names)
+
+    return ResolutionPlan(writer, None, tuple(defaults), ignored_fields)
+
+
+class ResolutionPlanCache:
+    """A thread-safe cache of resolution plans keyed by the subject, version and fingerprint of the writer and reader
+    schemas. Versions that differ only in logical types share a fingerprint, so the fingerprint alone can't be the key.
+    fastavro works out how to resolve a writer schema against a reader schema for every record it reads, while most
+    messages are decoded with one of a handful of pairs of schema versions. The cache holds at most `max_size` plans and
+    evicts the least recently used plan when it is full.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE):
+        if max_size < 1:
+            raise ValueError("ResolutionPlanCache max_size must be at least 1.")
+
+        self._max_size = max_size
+        self._plans: "OrderedDict[Tuple[str, str, bytes, str, str, bytes], ResolutionPlan]" = OrderedDict()
+        self._lock = Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, writer_schema: FingerprintedSchema, reader_schema: FingerprintedSchema) -> ResolutionPlan:
+        """Get the plan for reading data written with one schema using another, creating it when it isn't cached.
+
+        Arguments:
+            writer_schema (FingerprintedSchema): the schema the data was written with.
+            reader_schema (FingerprintedSchema): the schema the data should be read as.
+
+        Returns:
+            ResolutionPlan: the plan for the pair of schemas.
+        """
+        key = (
+            writer_schema.subject,
+            writer_schema.version,
+            writer_schema.fingerprint,
+            reader_schema.subject,
+            reader_schema.version,
+            reader_schema.fingerprint,
+        )
+
+        with self._lock:
+            if key in self._plans:
+                self._hits += 1
+                self._plans.move_to_end(key)
+                return self._plans[key]
+
+            self._misses += 1
+
+            plan = plan_resolution(writer_schema, reader_schema)
+            self._plans[key] = plan
+            while len(self._plans) > self._max_size:
+                self._plans.popitem(last=False)
+
+            return plan
+
+    def clear(self) -> None:
+        with self._lock:
+            self._plans.clear()
+            self._hits = 0
+            self._misses = 0
+
+    @property
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(hits=self._hits, misses=self._misses, size=len(self._plans), max_size=self._max_size)
+
+
+# The cache shared by all single-object encoders.
+RESOLUTION_PLAN_CACHE = ResolutionPlanCache()
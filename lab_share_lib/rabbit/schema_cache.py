@@ -0,0 +1,272 @@
+import logging
+import math
+import time
+from collections import OrderedDict
+from threading import Event, Lock, Thread
+from typing import Callable, Dict, Hashable, NamedTuple, Optional, Tuple, cast
+
+from lab_share_lib.constants import (
+    SCHEMA_CACHE_ALIAS_TTL_DEFAULT,
+    SCHEMA_CACHE_MAX_SIZE_DEFAULT,
+    SCHEMA_CACHE_NEGATIVE_TTL_DEFAULT,
+)
+
+LOGGER = logging.getLogger(__name__)
+
+
+class FetchResult(NamedTuple):
+    """A response fetched from the schema registry. Responses that aren't `ok`, such as for a subject or version that
+    doesn't exist, are returned to callers like any other but are only cached for the negative TTL.
+    """
+
+    body: dict
+    ok: bool
+
+
+class SchemaCacheStats(NamedTuple):
+    hits: int
+    misses: int
+    stale_hits: int
+    negative_hits: int
+    coalesced: int
+    refreshes: int
+    refresh_failures: int
+    evictions: int
+    size: int
+    max_size: int
+
+
+class _Entry:
+    __slots__ = ("result", "error", "expires_at", "refreshing")
+
+    def __init__(self, result: Optional[FetchResult], error: Optional[Exception], expires_at: float):
+        self.result = result
+        self.error = error
+        self.expires_at = expires_at
+        self.refreshing = False
+
+    @property
+    def is_negative(self) -> bool:
+        return self.result is None or not self.result.ok
+
+
+class _Flight:
+    """A fetch in progress, shared by every caller that misses on the same key while it runs."""
+
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = Event()
+        self.result: Optional[FetchResult] = None
+        self.error: Optional[BaseException] = None
+
+
+Fetch = Callable[[], FetchResult]
+
+
+class SchemaCache:
+    """A thread-safe, bounded cache of schema registry responses.
+
+    Responses for immutable resources, such as numbered schema versions, are kept until they are evicted to make room.
+    Responses for aliases that move, such as the `latest` version, expire after `alias_ttl` seconds. An expired alias
+    is still returned straight away while it is refreshed in the background, so callers never wait for a refresh and
+    keep the last good response if the refresh fails. Errors and unsuccessful responses are cached for `negative_ttl`
+    seconds so a missing schema or unreachable registry isn't asked again for every message.
+
+    Callers that miss on a key while another caller is already fetching it wait for that fetch and share its response
+    or error, so a burst of misses for one schema, such as every consumer starting at once, makes a single request.
+
+    The cache holds at most `max_size` responses and evicts the least recently used response when it is full.
+    """
+
+    def __init__(
+        self,
+        max_size: int = SCHEMA_CACHE_MAX_SIZE_DEFAULT,
+        alias_ttl: float = SCHEMA_CACHE_ALIAS_TTL_DEFAULT,
+        negative_ttl: float = SCHEMA_CACHE_NEGATIVE_TTL_DEFAULT,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if max_size < 1:
+            raise ValueError("SchemaCache max_size must be at least 1.")
+
+        self._max_size = max_size
+        self._alias_ttl = alias_ttl
+        self._negative_ttl = negative_ttl
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._in_flight: Dict[Hashable, _Flight] = {}
+        self._lock = Lock()
+        self._hits = 0
+        self._misses = 0
+        self._stale_hits = 0
+        self._negative_hits = 0
+        self._coalesced = 0
+        self._refreshes = 0
+        self._refresh_failures = 0
+        self._evictions = 0
+
+    def get(self, key: Hashable, fetch: Fetch, immutable: bool) -> dict:
+        """Get a response from the cache, calling `fetch` to get it from the schema registry when it isn't cached.
+
+        Arguments:
+            key (Hashable): identifies the response, e.g. the URL it is fetched from.
+            fetch (Fetch): a function fetching the response from the schema registry.
+            immutable (bool): whether the response can never change, e.g. for a numbered schema version.
+
+        Returns:
+            dict: the body of the response.
+
+        Raises:
+            Exception: the error raised by `fetch`, which may have been cached from a recent call.
+        """
+        stale_entry: Optional[_Entry] = None
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None:
+                self._entries.move_to_end(key)
+                if self._clock() < entry.expires_at:
+                    return self._cached_body(entry)
+
+                if entry.result is not None and entry.result.ok:
+                    stale_entry = entry
+
+            if stale_entry is not None:
+                self._stale_hits += 1
+                start_refresh = not stale_entry.refreshing
+                stale_entry.refreshing = True
+            else:
+                flight, leader = self._join_flight(key)
+
+        if stale_entry is not None:
+            # Refreshes are started outside of the lock, as they take it again to store the fresh response.
+            if start_refresh:
+                self._start_refresh(key, fetch, immutable)
+            return cast(FetchResult, stale_entry.result).body
+
+        if not leader:
+            return self._wait_for(flight)
+
+        return self._fetch(key, fetch, immutable, flight)
+
+    def _cached_body(self, entry: _Entry) -> dict:
+        if entry.error is not None:
+            self._negative_hits += 1
+            raise entry.error.with_traceback(None)
+
+        if entry.is_negative:
+            self._negative_hits += 1
+        else:
+            self._hits += 1
+
+        return cast(FetchResult, entry.result).body
+
+    def _join_flight(self, key: Hashable) -> Tuple[_Flight, bool]:
+        """Join the fetch in progress for a key, or start one. Returns the flight and whether this caller leads it."""
+        flight = self._in_flight.get(key)
+        if flight is not None:
+            self._coalesced += 1
+            return flight, False
+
+        self._misses += 1
+        flight = self._in_flight[key] = _Flight()
+        return flight, True
+
+    def _fetch(self, key: Hashable, fetch: Fetch, immutable: bool, flight: _Flight) -> dict:
+        # Fetch outside of the lock so other keys can be read in the meantime.
+        try:
+            result = flight.result = fetch()
+        except BaseException as ex:
+            flight.error = ex
+            if isinstance(ex, Exception):
+                self._store(key, _Entry(None, ex, self._clock() + self._negative_ttl))
+            raise
+        else:
+            self._store(key, self._new_entry(result, immutable))
+            return result.body
+        finally:
+            # The response is stored before the flight ends, so callers arriving afterwards find it in the cache.
+            with self._lock:
+                del self._in_flight[key]
+            flight.done.set()
+
+    @staticmethod
+    def _wait_for(flight: _Flight) -> dict:
+        flight.done.wait()
+
+        if flight.error is not None:
+            raise flight.error.with_traceback(None)
+
+        return cast(FetchResult, flight.result).body
+
+    def _new_entry(self, result: FetchResult, immutable: bool) -> _Entry:
+        if not result.ok:
+            ttl = self._negative_ttl
+        elif immutable:
+            ttl = math.inf
+        else:
+            ttl = self._alias_ttl
+
+        return _Entry(result, None, self._clock() + ttl)
+
+    def _start_refresh(self, key: Hashable, fetch: Fetch, immutable: bool) -> None:
+        Thread(target=self._refresh, args=(key, fetch, immutable), name="SchemaCacheRefresh", daemon=True).start()
+
+    def _refresh(self, key: Hashable, fetch: Fetch, immutable: bool) -> None:
+        try:
+            result = fetch()
+        except Exception as ex:
+            LOGGER.warning(f"Failed to refresh cached schema registry response for {key}: {ex}")
+            with self._lock:
+                self._refresh_failures += 1
+                entry = self._entries.get(key)
+                if entry is not None:
+                    # Keep serving the last good response and try again once the negative TTL has passed.
+                    entry.refreshing = False
+                    entry.expires_at = self._clock() + self._negative_ttl
+            return
+
+        with self._lock:
+            self._refreshes += 1
+
+        self._store(key, self._new_entry(result, immutable))
+
+    def _store(self, key: Hashable, entry: _Entry) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._hits = 0
+            self._misses = 0
+            self._stale_hits = 0
+            self._negative_hits = 0
+            self._coalesced = 0
+            self._refreshes = 0
+            self._refresh_failures = 0
+            self._evictions = 0
+
+    @property
+    def stats(self) -> SchemaCacheStats:
+        with self._lock:
+            return SchemaCacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                stale_hits=self._stale_hits,
+                negative_hits=self._negative_hits,
+                coalesced=self._coalesced,
+                refreshes=self._refreshes,
+                refresh_failures=self._refresh_failures,
+                evictions=self._evictions,
+                size=len(self._entries),
+                max_size=self._max_size,
+            )
+
+
+# The cache shared by all schema registries in the process.
+SCHEMA_CACHE = SchemaCache()
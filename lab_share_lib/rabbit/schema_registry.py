@@ -1,31 +1,149 @@
 import logging
-from functools import lru_cache
-
-from requests import get
+import re
+from abc import ABC, abstractmethod
+from typing import List, Optional, Sequence, Union
 
+from lab_share_lib.constants import SCHEMA_REGISTRY_HEDGE_PERCENTILE_DEFAULT
 from lab_share_lib.exceptions import TransientRabbitError
+from lab_share_lib.rabbit.hedged_fetcher import EndpointStats, HedgedFetcher
+from lab_share_lib.rabbit.registry_session import RegistrySession
+from lab_share_lib.rabbit.schema_cache import SCHEMA_CACHE, FetchResult, SchemaCacheStats
+from lab_share_lib.rabbit.schema_snapshot import SchemaSnapshot
 
 RESPONSE_KEY_VERSION = "version"
 RESPONSE_KEY_SCHEMA = "schema"
+RESPONSE_KEY_ID = "id"
 
 LOGGER = logging.getLogger(__name__)
 
+# URLs of responses that never change, such as numbered schema versions and schema IDs, as opposed to aliases such as
+# "latest".
+IMMUTABLE_URL_PATTERN = re.compile(r"(/versions/\d+|/schemas/ids/\d+)$")
+
+
+def is_immutable_url(url: str) -> bool:
+    return IMMUTABLE_URL_PATTERN.search(url) is not None
+
+
+def get_json_from_url(url: str, verify: bool, session: RegistrySession) -> dict:
+    return SCHEMA_CACHE.get((url, verify), lambda: session.fetch_json(url, verify), immutable=is_immutable_url(url))
+
+
+class SchemaRegistryBase(ABC):
+    """The lookups the encoders and processors make on a schema registry. Responses are the JSON bodies the Redpanda
+    schema registry gives, including its error responses.
+    """
 
-@lru_cache
-def get_json_from_url(url: str, verify: bool) -> dict:
-    try:
-        return (dict)(get(url, verify=verify).json())
-    except Exception:
-        raise TransientRabbitError(f"Unable to connect to schema registry at {url}")
+    @abstractmethod
+    def get_schema(self, subject: str, version: str = "latest") -> dict: ...
 
+    @abstractmethod
+    def get_schema_by_id(self, schema_id: int) -> dict: ...
 
-class SchemaRegistry:
-    def __init__(self, base_uri: str, verify: bool = True):
-        self._base_uri = base_uri
+
+class SchemaRegistry(SchemaRegistryBase):
+    def __init__(
+        self,
+        base_uri: Union[str, Sequence[str]],
+        verify: bool = True,
+        session: Optional[RegistrySession] = None,
+        snapshot_dir: Optional[str] = None,
+        hedge_percentile: float = SCHEMA_REGISTRY_HEDGE_PERCENTILE_DEFAULT,
+    ):
+        """A client for a Redpanda schema registry.
+
+        Arguments:
+            base_uri (Union[str, Sequence[str]]): the base URI of the registry, or the base URIs of several replicas of
+                it. Requests to replicas are hedged: a request not answered within `hedge_percentile` of the preferred
+                replica's recent latencies is repeated on the next replica, and the first answer is used.
+            verify (bool, optional): whether to verify the registry's TLS certificate. Defaults to True.
+            session (Optional[RegistrySession], optional): the session to make requests with. Defaults to a new session.
+            snapshot_dir (Optional[str], optional): a directory to save fetched schemas in. Numbered versions are then
+                loaded from the directory rather than the registry, and the last `latest` response saved is used while
+                the registry can't be reached. Defaults to None, which doesn't save schemas.
+            hedge_percentile (float, optional): the latency percentile after which requests to replicas are hedged.
+        """
+        base_uris = [base_uri] if isinstance(base_uri, str) else list(base_uri)
+        if not base_uris:
+            raise ValueError("SchemaRegistry needs at least one base URI.")
+
+        # Responses are cached under the first base URI, as every replica gives the same responses.
+        self._base_uri = base_uris[0]
         self._verify = verify
+        self._session = session if session is not None else RegistrySession()
+        self._snapshot = SchemaSnapshot(snapshot_dir) if snapshot_dir else None
+        self._hedged_fetcher = (
+            HedgedFetcher(base_uris, self._session, hedge_percentile=hedge_percentile) if len(base_uris) > 1 else None
+        )
+
+    @property
+    def cache_stats(self) -> SchemaCacheStats:
+        return SCHEMA_CACHE.stats
+
+    @property
+    def endpoint_stats(self) -> List[EndpointStats]:
+        """The request counts and latencies of each replica, when the registry has several base URIs."""
+        return self._hedged_fetcher.stats if self._hedged_fetcher is not None else []
 
     def get_schema(self, subject: str, version: str = "latest") -> dict:
-        schema_url = f"{self._base_uri}/subjects/{subject}/versions/{version}"
-        LOGGER.debug(f"Getting schema from registry at {schema_url}.")
+        return self._get_json(f"subjects/{subject}/versions/{version}")
+
+    def get_schema_by_id(self, schema_id: int) -> dict:
+        """Get a schema by the ID the registry gave it, which is unique across all subjects. The response only contains
+        the schema, not its subject or version.
+
+        Arguments:
+            schema_id (int): the schema ID.
+
+        Returns:
+            dict: the response from the registry.
+        """
+        return self._get_json(f"schemas/ids/{schema_id}")
+
+    def _get_json(self, path: str) -> dict:
+        url = f"{self._base_uri}/{path}"
+        LOGGER.debug(f"Getting schema from registry at {url}.")
+
+        if self._snapshot is None and self._hedged_fetcher is None:
+            return get_json_from_url(url, self._verify, self._session)
+
+        fetch = self._fetch_with_snapshot if self._snapshot is not None else self._fetch_from_registry
+
+        return SCHEMA_CACHE.get((url, self._verify), lambda: fetch(path, url), immutable=is_immutable_url(url))
+
+    def _fetch_from_registry(self, path: str, url: str) -> FetchResult:
+        if self._hedged_fetcher is not None:
+            return self._hedged_fetcher.fetch_json(path, self._verify)
+
+        return self._session.fetch_json(url, self._verify)
+
+    def _fetch_with_snapshot(self, path: str, url: str) -> FetchResult:
+        assert self._snapshot is not None
+
+        immutable = is_immutable_url(url)
+        if immutable:
+            saved = self._snapshot.load(path)
+            if saved is not None:
+                return FetchResult(body=saved, ok=True)
+
+        try:
+            result = self._fetch_from_registry(path, url)
+        except TransientRabbitError:
+            saved = None if immutable else self._snapshot.load(path)
+            if saved is None:
+                raise
+
+            LOGGER.warning(f"Using the saved response for {path} as the schema registry can't be reached.")
+            return FetchResult(body=saved, ok=True)
+
+        if result.ok:
+            self._snapshot.save(path, result.body)
+
+        return result
+
+    def close(self) -> None:
+        """Close the registry's pooled connections."""
+        if self._hedged_fetcher is not None:
+            self._hedged_fetcher.close()
 
-        return get_json_from_url(schema_url, self._verify)
+        self._session.close()
@@ -0,0 +1,79 @@
+import json
+import logging
+import os
+import tempfile
+from typing import Optional
+from urllib.parse import quote
+
+LOGGER = logging.getLogger(__name__)
+
+SNAPSHOT_FILE_EXTENSION = ".json"
+
+
+def _file_name(segment: str) -> str:
+    # Dots are quoted too for "." and "..", so a subject name can't point outside of the snapshot directory.
+    return quote(segment, safe="") if segment not in (".", "..") else segment.replace(".", "%2E")
+
+
+class SchemaSnapshot:
+    """Schema registry responses saved in a local directory, so schemas fetched by one process are available to the
+    next without asking the registry again, and while the registry can't be reached.
+
+    Responses are stored by their path relative to the registry's base URI, e.g. the response for
+    `subjects/create-plate-map/versions/7` is saved to `<directory>/subjects/create-plate-map/versions/7.json`.
+    Files are written to a temporary file and renamed into place, so processes sharing a directory never read a partial
+    file.
+    """
+
+    def __init__(self, directory: str):
+        self._directory = directory
+
+    @property
+    def directory(self) -> str:
+        return self._directory
+
+    def file_path(self, path: str) -> str:
+        segments = [_file_name(segment) for segment in path.strip("/").split("/")]
+        return os.path.join(self._directory, *segments) + SNAPSHOT_FILE_EXTENSION
+
+    def load(self, path: str) -> Optional[dict]:
+        """Load a saved response.
+
+        Arguments:
+            path (str): the path of the response relative to the registry's base URI.
+
+        Returns:
+            Optional[dict]: the saved response, or None if it hasn't been saved or can't be read.
+        """
+        file_path = self.file_path(path)
+        try:
+            with open(file_path, encoding="utf-8") as snapshot_file:
+                return dict(json.load(snapshot_file))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as ex:
+            LOGGER.warning(f"Ignoring unreadable schema snapshot {file_path}: {ex}")
+            return None
+
+    def save(self, path: str, response: dict) -> None:
+        """Save a response, replacing any response saved for the same path. Failing to save is logged rather than
+        raised, as the snapshot is only an optimisation.
+
+        Arguments:
+            path (str): the path of the response relative to the registry's base URI.
+            response (dict): the response to save.
+        """
+        file_path = self.file_path(path)
+        directory = os.path.dirname(file_path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            file_descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            try:
+                with os.fdopen(file_descriptor, "w", encoding="utf-8") as snapshot_file:
+                    json.dump(response, snapshot_file)
+                os.replace(temporary_path, file_path)
+            except BaseException:
+                os.unlink(temporary_path)
+                raise
+        except (OSError, TypeError, ValueError) as ex:
+            LOGGER.warning(f"Unable to save schema snapshot {file_path}: {ex}")
@@ -0,0 +1,211 @@
+import datetime
+from typing import Any, Callable, Dict, List
+from uuid import UUID
+
+from fastavro.validation import validate
+from fastavro.write import LOGICAL_WRITERS
+
+from lab_share_lib.rabbit.parsed_schema_cache import ParsedSchemaCache
+
+Predicate = Callable[[Any], bool]
+Validator = Callable[[Any], None]
+
+INT_MIN_VALUE = -(1 << 31)
+INT_MAX_VALUE = (1 << 31) - 1
+LONG_MIN_VALUE = -(1 << 63)
+LONG_MAX_VALUE = (1 << 63) - 1
+
+_NO_VALUE = object()
+
+
+def _never(_datum: Any) -> bool:
+    return False
+
+
+_PRIMITIVE_PREDICATES: Dict[str, Predicate] = {
+    "null": lambda datum: datum is None,
+    "boolean": lambda datum: type(datum) is bool,
+    "int": lambda datum: type(datum) is int and INT_MIN_VALUE <= datum <= INT_MAX_VALUE,
+    "long": lambda datum: type(datum) is int and LONG_MIN_VALUE <= datum <= LONG_MAX_VALUE,
+    "float": lambda datum: type(datum) is float or type(datum) is int,
+    "double": lambda datum: type(datum) is float or type(datum) is int,
+    "string": lambda datum: type(datum) is str,
+    "bytes": lambda datum: type(datum) is bytes or type(datum) is bytearray,
+}
+
+# Data of the common logical types that fastavro's logical writers always convert to a valid value of the underlying
+# type, keyed in the same way as LOGICAL_WRITERS. Naive datetimes are converted with the local time zone, which can fail
+# for extreme dates, so they are left to the writers.
+_LOGICAL_PREDICATES: Dict[str, Predicate] = {
+    "long-timestamp-millis": lambda datum: type(datum) is datetime.datetime and datum.tzinfo is not None,
+    "long-timestamp-micros": lambda datum: type(datum) is datetime.datetime and datum.tzinfo is not None,
+    "long-local-timestamp-millis": lambda datum: type(datum) is datetime.datetime,
+    "long-local-timestamp-micros": lambda datum: type(datum) is datetime.datetime,
+    "int-date": lambda datum: type(datum) is datetime.date or type(datum) is datetime.datetime,
+    "int-time-millis": lambda datum: type(datum) is datetime.time,
+    "long-time-micros": lambda datum: type(datum) is datetime.time,
+    "string-uuid": lambda datum: type(datum) is str or type(datum) is UUID,
+}
+
+
+class _PredicateCompiler:
+    """Compiles a parsed Avro schema into a tree of predicates, each checking a datum against one part of the schema.
+    The predicates are deliberately conservative: they only return True when fastavro would certainly accept the datum.
+    Anything unusual, such as tuple notation for unions or the types of numbers that aren't built-in, makes them return
+    False so that fastavro can make the final decision.
+    """
+
+    def __init__(self, parsed_schema: Any):
+        self._named_schemas = parsed_schema.get("__named_schemas", {}) if isinstance(parsed_schema, dict) else {}
+        self._named_predicates: Dict[str, Predicate] = {}
+
+    def compile(self, schema: Any) -> Predicate:
+        if isinstance(schema, list):
+            return self._compile_union(schema)
+
+        if isinstance(schema, str):
+            if schema in _PRIMITIVE_PREDICATES:
+                return _PRIMITIVE_PREDICATES[schema]
+
+            return self._compile_named_reference(schema)
+
+        if not isinstance(schema, dict):
+            return _never
+
+        if "logicalType" in schema:
+            return self._compile_logical_type(schema)
+
+        schema_type = schema.get("type")
+        if schema_type in _PRIMITIVE_PREDICATES:
+            return _PRIMITIVE_PREDICATES[schema_type]
+        if schema_type == "record":
+            return self._compile_named(schema, self._compile_record)
+        if schema_type == "enum":
+            return self._compile_named(schema, self._compile_enum)
+        if schema_type == "fixed":
+            return self._compile_named(schema, self._compile_fixed)
+        if schema_type == "array":
+            return self._compile_array(schema)
+        if schema_type == "map":
+            return self._compile_map(schema)
+
+        return self.compile(schema_type) if isinstance(schema_type, (str, list)) else _never
+
+    def _compile_named(self, schema: dict, compile_definition: Callable[[dict], Predicate]) -> Predicate:
+        name = schema.get("name")
+        if name is None:
+            return compile_definition(schema)
+
+        if name not in self._named_predicates:
+            # Register a forwarding predicate before compiling the definition so recursive schemas terminate.
+            definition: List[Predicate] = []
+            self._named_predicates[name] = lambda datum: definition[0](datum)
+            definition.append(compile_definition(schema))
+
+        return self._named_predicates[name]
+
+    def _compile_named_reference(self, name: str) -> Predicate:
+        if name in self._named_predicates:
+            return self._named_predicates[name]
+
+        if name in self._named_schemas:
+            return self.compile(self._named_schemas[name])
+
+        return _never
+
+    def _compile_record(self, schema: dict) -> Predicate:
+        fields = [
+            (field["name"], field.get("default", None), self.compile(field["type"])) for field in schema["fields"]
+        ]
+
+        def is_valid_record(datum: Any) -> bool:
+            if type(datum) is not dict or "-type" in datum:
+                return False
+
+            for name, default, is_valid in fields:
+                value = datum.get(name, _NO_VALUE)
+                if not is_valid(default if value is _NO_VALUE else value):
+                    return False
+
+            return True
+
+        return is_valid_record
+
+    def _compile_enum(self, schema: dict) -> Predicate:
+        symbols = frozenset(schema["symbols"])
+
+        return lambda datum: type(datum) is str and datum in symbols
+
+    def _compile_fixed(self, schema: dict) -> Predicate:
+        size = schema["size"]
+
+        return lambda datum: type(datum) is bytes and len(datum) == size
+
+    def _compile_array(self, schema: dict) -> Predicate:
+        is_valid_item = self.compile(schema["items"])
+
+        return lambda datum: type(datum) is list and all(is_valid_item(item) for item in datum)
+
+    def _compile_map(self, schema: dict) -> Predicate:
+        is_valid_value = self.compile(schema["values"])
+
+        return lambda datum: type(datum) is dict and all(
+            type(key) is str and is_valid_value(value) for key, value in datum.items()
+        )
+
+    def _compile_union(self, schemas: list) -> Predicate:
+        branches = [self.compile(schema) for schema in schemas]
+
+        return lambda datum: type(datum) is not tuple and any(is_valid(datum) for is_valid in branches)
+
+    def _compile_logical_type(self, schema: dict) -> Predicate:
+        # fastavro converts the datum with the logical type's writer before validating it against the underlying type,
+        # so the predicates do the same, after checking for the common data that always converts to a valid value.
+        logical_type = f"{schema['type']}-{schema['logicalType']}"
+        underlying_schema = {key: value for key, value in schema.items() if key != "logicalType"}
+        is_valid_underlying = (
+            self._compile_fixed(underlying_schema) if schema["type"] == "fixed" else self.compile(underlying_schema)
+        )
+
+        prepare = LOGICAL_WRITERS.get(logical_type)
+        if prepare is None:
+            # fastavro ignores logical types it doesn't know.
+            return is_valid_underlying
+
+        is_valid_logical_datum = _LOGICAL_PREDICATES.get(logical_type, _never)
+
+        def is_valid_logical_type(datum: Any) -> bool:
+            if is_valid_logical_datum(datum):
+                return True
+
+            try:
+                return is_valid_underlying(prepare(datum, schema))
+            except Exception:
+                return False
+
+        return is_valid_logical_type
+
+
+def compile_validator(parsed_schema: Any) -> Validator:
+    """Compile a validator for a parsed Avro schema. The validator checks data with predicates compiled from the schema,
+    which avoids the work fastavro repeats on every call, most notably building error details for every union branch
+    that doesn't match. When the predicates can't confirm the data is valid, fastavro validates it instead, so the
+    result and any ValidationError raised are the same as calling fastavro's validate directly.
+
+    Arguments:
+        parsed_schema (Any): the schema, as parsed by fastavro.parse_schema.
+
+    Returns:
+        Validator: a function that raises fastavro's ValidationError if the data given to it is invalid.
+    """
+    is_valid = _PredicateCompiler(parsed_schema).compile(parsed_schema)
+
+    def validator(datum: Any) -> None:
+        if not is_valid(datum):
+            validate(datum, parsed_schema)
+
+    return validator
+
+
+# Compiled validators keyed by schema subject and resolved version, in the same way as parsed schemas.
+COMPILED_VALIDATOR_CACHE = ParsedSchemaCache()
@@ -1,5 +1,5 @@
 from types import ModuleType
-from typing import List
+from typing import List, Optional, Union
 
 from lab_share_lib.config.rabbit_config import RabbitConfig
 
@@ -11,6 +11,12 @@ class Config(ModuleType):
     RABBITMQ_SERVERS: List[RabbitConfig]
     RABBITMQ_PUBLISH_RETRY_DELAY: int
     RABBITMQ_PUBLISH_RETRIES: int
+    RABBITMQ_PUBLISH_OUTBOX_PATH: Optional[str]
+    RABBITMQ_BLOCKED_CONNECTION_TIMEOUT: Optional[float]
+    RABBITMQ_PUBLISH_BLOCKED_BUFFER_SIZE: Optional[int]
 
     # RedPanda
-    REDPANDA_BASE_URI: str
+    REDPANDA_BASE_URI: Union[str, List[str]]
+    REDPANDA_SCHEMA_SNAPSHOT_DIR: Optional[str]
+    REDPANDA_SCHEMA_FILES_DIR: Optional[str]
+    REDPANDA_HEDGE_PERCENTILE: Optional[float]
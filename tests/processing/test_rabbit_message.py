@@ -1,5 +1,5 @@
 import logging
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 import pytest
 
@@ -10,6 +10,7 @@ from lab_share_lib.constants import (
     RABBITMQ_HEADER_KEY_VERSION,
 )
 from lab_share_lib.processing.rabbit_message import RabbitMessage
+from lab_share_lib.rabbit.avro_encoder import AvroEncoderBinaryFile, AvroEncoderBinaryMessage
 
 HEADERS = {
     RABBITMQ_HEADER_KEY_SUBJECT: "a-subject",
@@ -41,6 +42,15 @@ def error_decoder():
     return decoder
 
 
+@pytest.fixture
+def unrecognising_decoder():
+    decoder = MagicMock()
+    decoder.decode.return_value = DECODED_LIST
+    decoder.recognises.return_value = False
+
+    return decoder
+
+
 def test_subject_extracts_the_header_correctly(subject):
     assert subject.subject == HEADERS[RABBITMQ_HEADER_KEY_SUBJECT]
 
@@ -76,6 +86,47 @@ def test_decode_successfully_decodes_if_second_decoder_works(subject, error_deco
     assert subject._decoded_list == DECODED_LIST
 
 
+def test_decode_tries_decoders_that_recognise_the_body_first(subject, unrecognising_decoder, valid_decoder):
+    used_decoder = subject.decode([unrecognising_decoder, valid_decoder], "1")
+
+    assert used_decoder is valid_decoder
+    valid_decoder.recognises.assert_called_once_with(ENCODED_BODY)
+    unrecognising_decoder.decode.assert_not_called()
+
+
+def test_decode_falls_back_to_decoders_that_do_not_recognise_the_body(subject, unrecognising_decoder, error_decoder):
+    used_decoder = subject.decode([unrecognising_decoder, error_decoder], "1")
+
+    assert used_decoder is unrecognising_decoder
+    error_decoder.decode.assert_called_once_with(ENCODED_BODY, "1", HEADERS[RABBITMQ_HEADER_KEY_VERSION])
+
+
+def test_decode_tries_decoders_in_order_when_none_recognise_the_body(subject, unrecognising_decoder):
+    other_decoder = MagicMock()
+    other_decoder.recognises.return_value = False
+    other_decoder.decode.side_effect = ValueError("Invalid")
+
+    used_decoder = subject.decode([other_decoder, unrecognising_decoder], "1")
+
+    assert used_decoder is unrecognising_decoder
+    other_decoder.decode.assert_called_once()
+
+
+def test_decode_only_uses_the_encoder_for_a_file_encoded_body():
+    schema_registry = MagicMock()
+    schema_registry.get_schema.return_value = {"schema": '"string"', "version": 1}
+    message_encoder = AvroEncoderBinaryMessage(schema_registry, "a-subject")
+    file_encoder = AvroEncoderBinaryFile(schema_registry, "a-subject")
+    subject = RabbitMessage(HEADERS, file_encoder.encode(["A record"]).body)
+
+    with patch.object(message_encoder, "decode") as message_decode:
+        used_decoder = subject.decode([message_encoder, file_encoder], "1")
+
+    assert used_decoder is file_encoder
+    assert subject.message == "A record"
+    message_decode.assert_not_called()
+
+
 def test_decode_raises_value_error_if_all_decoders_fail(subject, error_decoder):
     with pytest.raises(ValueError, match="Failed to decode message with any encoder.") as ex:
         subject.decode([error_decoder], "1")
@@ -91,9 +142,10 @@ def test_decode_does_not_log_json_decoded_body(subject, valid_decoder, caplog):
     assert "Decoded binary message body:\n['Decoded body']" not in caplog.text
 
 
-def test_decode_logs_binary_decoded_body(subject, valid_decoder, caplog):
+@pytest.mark.parametrize("encoder_type", ["binary", "confluent"])
+def test_decode_logs_binary_decoded_body(subject, valid_decoder, caplog, encoder_type):
     caplog.set_level(logging.INFO)
-    valid_decoder.encoder_type = "binary"
+    valid_decoder.encoder_type = encoder_type
     subject.decode([valid_decoder], "1")
 
     assert "Decoded binary message body:\n['Decoded body']" in caplog.text
@@ -1,4 +1,5 @@
-from unittest.mock import MagicMock, Mock, patch
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, Mock, call, patch
 
 import pytest
 
@@ -10,13 +11,15 @@ from lab_share_lib.constants import (
     RABBITMQ_HEADER_KEY_VERSION,
 )
 from lab_share_lib.exceptions import TransientRabbitError
-from lab_share_lib.processing.rabbit_message_processor import RabbitMessageProcessor
+from lab_share_lib.processing.rabbit_message_processor import ENCODERS, RabbitMessageProcessor
 from lab_share_lib.constants import (
     RABBITMQ_HEADER_VALUE_ENCODER_TYPE_DEFAULT,
     RABBITMQ_HEADER_KEY_ENCODER_TYPE,
     RABBITMQ_HEADER_VALUE_ENCODER_TYPE_JSON,
     RABBITMQ_HEADER_VALUE_ENCODER_TYPE_BINARY,
+    RABBITMQ_HEADER_VALUE_ENCODER_TYPE_CONFLUENT,
 )
+from lab_share_lib.rabbit.avro_encoder import AvroEncoderConfluent
 from tests.constants import RABBITMQ_SUBJECT_CREATE_PLATE, RABBITMQ_SUBJECT_UPDATE_SAMPLE
 
 HEADERS = {
@@ -68,6 +71,12 @@ def basic_publisher():
         yield basic_publisher.return_value
 
 
+@pytest.fixture(autouse=True)
+def publisher_keep_alive():
+    with patch("lab_share_lib.processing.rabbit_message_processor.PublisherKeepAlive") as publisher_keep_alive:
+        yield publisher_keep_alive
+
+
 @pytest.fixture
 def subject(config):
     return RabbitMessageProcessor(config.RABBITMQ_SERVERS[0], config)
@@ -80,6 +89,17 @@ def test_constructor_stored_passed_values(subject, schema_registry, basic_publis
     assert subject._app_config == config
 
 
+def test_constructor_keeps_the_publisher_alive(subject, basic_publisher, publisher_keep_alive):
+    publisher_keep_alive.assert_called_once_with(basic_publisher)
+    publisher_keep_alive.return_value.start.assert_called_once()
+
+
+def test_close_stops_keeping_the_publisher_alive(subject, publisher_keep_alive):
+    subject.close()
+
+    publisher_keep_alive.return_value.stop.assert_called_once()
+
+
 def test_processors_are_populated_correctly(subject, create_plate_processor, update_sample_processor):
     assert list(subject._processors.keys()) == [RABBITMQ_SUBJECT_CREATE_PLATE, RABBITMQ_SUBJECT_UPDATE_SAMPLE]
     assert subject._processors[RABBITMQ_SUBJECT_CREATE_PLATE] == create_plate_processor.return_value
@@ -121,6 +141,84 @@ def test_process_message_decodes_the_message_with_binary_encoding(subject, rabbi
     rabbit_message_binary.return_value.decode.assert_called_once_with(build_avro_encoders.return_value, "1")
 
 
+def test_process_message_reuses_encoders_for_an_encoder_type_and_subject(subject, rabbit_message, build_avro_encoders):
+    subject.process_message(HEADERS, MESSAGE_BODY)
+    subject.process_message(HEADERS, MESSAGE_BODY)
+
+    build_avro_encoders.assert_called_once()
+    assert rabbit_message.return_value.decode.call_args_list == [call(build_avro_encoders.return_value, "1")] * 2
+
+
+def test_get_avro_encoders_builds_encoders_for_each_encoder_type_and_subject(subject):
+    json_encoders = subject._get_avro_encoders(RABBITMQ_HEADER_VALUE_ENCODER_TYPE_JSON, RABBITMQ_SUBJECT_CREATE_PLATE)
+    binary_encoders = subject._get_avro_encoders(
+        RABBITMQ_HEADER_VALUE_ENCODER_TYPE_BINARY, RABBITMQ_SUBJECT_CREATE_PLATE
+    )
+    other_subject_encoders = subject._get_avro_encoders(
+        RABBITMQ_HEADER_VALUE_ENCODER_TYPE_JSON, RABBITMQ_SUBJECT_UPDATE_SAMPLE
+    )
+
+    assert len({id(json_encoders), id(binary_encoders), id(other_subject_encoders)}) == 3
+    assert other_subject_encoders[0]._subject == RABBITMQ_SUBJECT_UPDATE_SAMPLE
+    assert (
+        subject._get_avro_encoders(RABBITMQ_HEADER_VALUE_ENCODER_TYPE_JSON, RABBITMQ_SUBJECT_CREATE_PLATE)
+        is json_encoders
+    )
+
+
+def test_get_avro_encoders_builds_the_confluent_encoder(subject):
+    encoders = subject._get_avro_encoders(RABBITMQ_HEADER_VALUE_ENCODER_TYPE_CONFLUENT, RABBITMQ_SUBJECT_CREATE_PLATE)
+
+    assert [type(encoder) for encoder in encoders] == [AvroEncoderConfluent]
+
+
+def test_get_avro_encoders_builds_encoders_once_across_threads(subject):
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        encoders = list(
+            executor.map(
+                lambda _: subject._get_avro_encoders(
+                    RABBITMQ_HEADER_VALUE_ENCODER_TYPE_BINARY, RABBITMQ_SUBJECT_CREATE_PLATE
+                ),
+                range(32),
+            )
+        )
+
+    assert all(encoder_list is encoders[0] for encoder_list in encoders)
+
+
+def test_get_avro_encoders_raises_for_unknown_encoder_types(subject):
+    with pytest.raises(Exception, match="not recognised"):
+        subject._get_avro_encoders("unknown", RABBITMQ_SUBJECT_CREATE_PLATE)
+
+
+def test_prewarm_instantiates_the_processors(
+    subject, create_plate_processor, update_sample_processor, build_avro_encoders
+):
+    with ThreadPoolExecutor() as executor:
+        for future in subject.prewarm(executor):
+            future.result()
+
+    create_plate_processor.instantiate.assert_called_once()
+    update_sample_processor.instantiate.assert_called_once()
+
+
+def test_prewarm_warms_the_encoders_for_every_subject_and_encoder_type(subject, config, build_avro_encoders):
+    config.RABBITMQ_SERVERS[0].message_subjects[RABBITMQ_SUBJECT_CREATE_PLATE].writer_schema_versions = ["2", "3"]
+
+    with ThreadPoolExecutor() as executor:
+        for future in subject.prewarm(executor):
+            future.result()
+
+    assert {call.args for call in build_avro_encoders.call_args_list} == {
+        (encoder_type, subject_name)
+        for encoder_type in ENCODERS
+        for subject_name in [RABBITMQ_SUBJECT_CREATE_PLATE, RABBITMQ_SUBJECT_UPDATE_SAMPLE]
+    }
+    for encoder in build_avro_encoders.return_value:
+        encoder.warm.assert_any_call(["1", "2", "3"])
+        encoder.warm.assert_any_call(["1"])
+
+
 def test_process_message_handles_exception_during_decode(subject, rabbit_message, caplog):
     rabbit_message.return_value.decode.side_effect = KeyError()
     result = subject.process_message(HEADERS, MESSAGE_BODY)
@@ -182,6 +280,52 @@ def test_process_message_logs_error_when_validate_raises_validation_error(subjec
     assert any(str(validation_error) in log.message and log.levelno == ERROR for log in caplog.records)
 
 
+def test_process_message_validates_every_message_by_default(subject, rabbit_message):
+    encoder = rabbit_message.return_value.decode.return_value
+
+    for _ in range(3):
+        subject.process_message(HEADERS, MESSAGE_BODY)
+
+    assert encoder.validate.call_count == 3
+
+
+def test_process_message_skips_validation_for_trusted_decode_subjects(subject, rabbit_message, config):
+    config.RABBITMQ_SERVERS[0].message_subjects[RABBITMQ_SUBJECT_CREATE_PLATE].validation_mode = "trusted-decode"
+    encoder = rabbit_message.return_value.decode.return_value
+
+    subject.process_message(HEADERS, MESSAGE_BODY)
+
+    encoder.validate.assert_not_called()
+
+
+@pytest.mark.parametrize("sample_rate, expected_validations", [(1, 10), (3, 4), (10, 1), (0, 10)])
+def test_process_message_validates_one_in_n_messages_for_sampled_subjects(
+    subject, rabbit_message, config, sample_rate, expected_validations
+):
+    subject_config = config.RABBITMQ_SERVERS[0].message_subjects[RABBITMQ_SUBJECT_CREATE_PLATE]
+    subject_config.validation_mode = "sampled"
+    subject_config.validation_sample_rate = sample_rate
+    encoder = rabbit_message.return_value.decode.return_value
+
+    for _ in range(10):
+        subject.process_message(HEADERS, MESSAGE_BODY)
+
+    assert encoder.validate.call_count == expected_validations
+
+
+def test_process_message_samples_each_subject_separately(subject, rabbit_message, config):
+    for subject_config in config.RABBITMQ_SERVERS[0].message_subjects.values():
+        subject_config.validation_mode = "sampled"
+        subject_config.validation_sample_rate = 2
+    encoder = rabbit_message.return_value.decode.return_value
+
+    subject.process_message(HEADERS, MESSAGE_BODY)
+    rabbit_message.return_value.subject = RABBITMQ_SUBJECT_UPDATE_SAMPLE
+    subject.process_message(HEADERS, MESSAGE_BODY)
+
+    assert encoder.validate.call_count == 2  # The first message of each subject is validated
+
+
 def test_process_message_rejects_rabbit_message_with_unrecognised_subject(subject, rabbit_message, caplog):
     wrong_subject = "random-subject"
     rabbit_message.return_value.subject = wrong_subject
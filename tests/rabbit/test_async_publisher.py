@@ -0,0 +1,403 @@
+import asyncio
+from unittest.mock import MagicMock, patch
+
+import pytest
+from pika.exceptions import (
+    AMQPConnectionError,
+    ChannelClosedByBroker,
+    ConnectionBlockedTimeout,
+    ConnectionClosedByBroker,
+)
+from pika.frame import Method
+from pika.spec import PERSISTENT_DELIVERY_MODE, Basic, Confirm, Connection
+
+from lab_share_lib.config.rabbit_server_details import RabbitServerDetails
+from lab_share_lib.constants import (
+    RABBITMQ_HEADER_KEY_ENCODER_TYPE,
+    RABBITMQ_HEADER_KEY_SUBJECT,
+    RABBITMQ_HEADER_KEY_VERSION,
+)
+from lab_share_lib.exceptions import ConnectionBlockedError, TransientRabbitError
+from lab_share_lib.processing.rabbit_message import RabbitMessage
+from lab_share_lib.rabbit.async_publisher import AsyncPublisher
+
+DEFAULT_SERVER_DETAILS = RabbitServerDetails(
+    uses_ssl=False, host="host", port=5672, username="username", password="password", vhost="vhost"
+)
+
+
+class Broker:
+    """Stands in for AsyncioConnection, opening connections and channels on the next turn of the event loop and
+    recording what is published so tests can confirm it.
+    """
+
+    def __init__(self):
+        self.connections: list = []
+        self.channels: list = []
+        self.published: list = []
+        self.open_error = None
+
+    def __call__(self, parameters, on_open_callback, on_open_error_callback, on_close_callback, custom_ioloop):
+        connection = MagicMock()
+        connection.is_open = self.open_error is None
+        connection.is_closing = False
+        connection.is_closed = False
+        connection.channel.side_effect = lambda on_open_callback: self._open_channel(on_open_callback)
+
+        def close():
+            connection.is_open = False
+            connection.is_closed = True
+            custom_ioloop.call_soon(on_close_callback, connection, ConnectionClosedByBroker(200, "Normal shutdown"))
+
+        connection.close.side_effect = close
+        connection.on_close = on_close_callback
+        self.connections.append(connection)
+
+        if self.open_error is None:
+            custom_ioloop.call_soon(on_open_callback, connection)
+        else:
+            custom_ioloop.call_soon(on_open_error_callback, connection, self.open_error)
+
+        return connection
+
+    def _open_channel(self, on_open_callback):
+        channel = MagicMock()
+        channel.is_open = True
+
+        def confirm_delivery(ack_nack_callback, callback):
+            channel.on_confirm = ack_nack_callback
+            asyncio.get_running_loop().call_soon(callback, Method(1, Confirm.SelectOk()))
+
+        channel.confirm_delivery.side_effect = confirm_delivery
+        channel.add_on_close_callback.side_effect = lambda callback: setattr(channel, "on_close", callback)
+        channel.basic_publish.side_effect = lambda **kwargs: self.published.append((channel, kwargs))
+        self.channels.append(channel)
+        asyncio.get_running_loop().call_soon(on_open_callback, channel)
+
+        return channel
+
+    def ack(self, delivery_tag, multiple=False, channel_index=-1):
+        self.channels[channel_index].on_confirm(Method(1, Basic.Ack(delivery_tag=delivery_tag, multiple=multiple)))
+
+    def nack(self, delivery_tag, channel_index=-1):
+        self.channels[channel_index].on_confirm(Method(1, Basic.Nack(delivery_tag=delivery_tag)))
+
+    def close_channel(self):
+        channel = self.channels[-1]
+        channel.is_open = False
+        channel.on_close(channel, ChannelClosedByBroker(406, "Precondition failed"))
+
+    def close_connection(self, reason=None):
+        connection = self.connections[-1]
+        connection.is_open = False
+        connection.on_close(connection, reason or ConnectionClosedByBroker(320, "Shutdown"))
+
+    def block(self):
+        connection = self.connections[-1]
+        on_blocked = connection.add_on_connection_blocked_callback.call_args.args[0]
+        on_blocked(connection, Method(0, Connection.Blocked(reason="low on memory")))
+
+    def unblock(self):
+        connection = self.connections[-1]
+        on_unblocked = connection.add_on_connection_unblocked_callback.call_args.args[0]
+        on_unblocked(connection, Method(0, Connection.Unblocked()))
+
+
+@pytest.fixture(autouse=True)
+def logger():
+    with patch("lab_share_lib.rabbit.async_publisher.LOGGER") as logger:
+        yield logger
+
+
+@pytest.fixture(autouse=True)
+def message_logger():
+    with patch("lab_share_lib.rabbit.async_publisher.MESSAGE_LOGGER") as message_logger:
+        yield message_logger
+
+
+@pytest.fixture
+def broker():
+    broker = Broker()
+    with patch("lab_share_lib.rabbit.async_publisher.AsyncioConnection", side_effect=broker):
+        yield broker
+
+
+@pytest.fixture
+def subject(broker):
+    return AsyncPublisher(DEFAULT_SERVER_DETAILS)
+
+
+async def settle():
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+def publish(subject, body=b"body", subject_name="subject", version="1"):
+    return asyncio.ensure_future(subject.publish("exchange", "routing_key", body, subject_name, version, "binary"))
+
+
+@pytest.mark.parametrize("uses_ssl", [True, False])
+def test_constructor_creates_correct_connection_parameters(uses_ssl):
+    server_details = RabbitServerDetails(
+        uses_ssl=uses_ssl, host="host", port=5672, username="username", password="password", vhost="vhost"
+    )
+
+    subject = AsyncPublisher(server_details)
+
+    assert (subject._connection_params.ssl_options is not None) is uses_ssl
+    assert subject._connection_params.host == "host"
+    assert subject._connection_params.port == 5672
+    assert subject._connection_params.virtual_host == "vhost"
+
+
+def test_constructor_rejects_an_empty_window():
+    with pytest.raises(ValueError, match="at least 1"):
+        AsyncPublisher(DEFAULT_SERVER_DETAILS, max_outstanding_confirms=0)
+
+
+def test_publish_waits_for_the_message_to_be_confirmed(subject, broker, logger):
+    async def test():
+        task = publish(subject)
+        await settle()
+        assert not task.done()
+
+        broker.ack(1)
+        await task
+
+    asyncio.run(test())
+
+    channel, kwargs = broker.published[0]
+    channel.confirm_delivery.assert_called_once()
+    assert kwargs["exchange"] == "exchange"
+    assert kwargs["routing_key"] == "routing_key"
+    assert kwargs["body"] == b"body"
+    assert kwargs["properties"].delivery_mode == PERSISTENT_DELIVERY_MODE
+    assert kwargs["properties"].headers == {
+        RABBITMQ_HEADER_KEY_SUBJECT: "subject",
+        RABBITMQ_HEADER_KEY_VERSION: "1",
+        RABBITMQ_HEADER_KEY_ENCODER_TYPE: "binary",
+    }
+    assert "successfully" in logger.info.call_args.args[0]
+
+
+def test_publish_reuses_the_connection_and_channel(subject, broker):
+    async def test():
+        for delivery_tag in (1, 2):
+            task = publish(subject)
+            await settle()
+            broker.ack(delivery_tag)
+            await task
+
+    asyncio.run(test())
+
+    assert len(broker.connections) == 1
+    assert len(broker.channels) == 1
+    assert len(broker.published) == 2
+
+
+def test_publish_sends_up_to_the_window_of_messages_before_confirms_arrive(broker):
+    subject = AsyncPublisher(DEFAULT_SERVER_DETAILS, max_outstanding_confirms=2)
+
+    async def test():
+        tasks = [publish(subject, body=f"body {index}".encode()) for index in range(3)]
+        await settle()
+        assert len(broker.published) == 2
+        assert subject.outstanding_confirms == 2
+
+        broker.ack(1)
+        await settle()
+        assert len(broker.published) == 3
+
+        broker.ack(3, multiple=True)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(test())
+
+    assert [kwargs["body"] for _, kwargs in broker.published] == [b"body 0", b"body 1", b"body 2"]
+    assert subject.outstanding_confirms == 0
+
+
+def test_publish_resolves_every_message_confirmed_at_once(subject, broker):
+    async def test():
+        tasks = [publish(subject) for _ in range(5)]
+        await settle()
+
+        broker.ack(4, multiple=True)
+        await settle()
+        assert [task.done() for task in tasks] == [True, True, True, True, False]
+
+        broker.ack(5)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(test())
+
+
+def test_publish_raises_when_the_message_is_nacked(subject, broker):
+    async def test():
+        tasks = [publish(subject, body=b"nacked"), publish(subject, body=b"acked")]
+        await settle()
+        broker.nack(1)
+        broker.ack(2)
+
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    nacked, acked = asyncio.run(test())
+
+    assert isinstance(nacked, TransientRabbitError)
+    assert acked is None
+
+
+def test_publish_raises_when_the_channel_closes_before_the_confirm(subject, broker):
+    async def test():
+        task = publish(subject)
+        await settle()
+        broker.close_channel()
+
+        with pytest.raises(TransientRabbitError, match="Precondition failed"):
+            await task
+
+        # The next publish opens a new channel, where delivery tags start again.
+        task = publish(subject)
+        await settle()
+        broker.ack(1)
+        await task
+
+    asyncio.run(test())
+
+    assert len(broker.connections) == 1
+    assert len(broker.channels) == 2
+
+
+def test_publish_reconnects_after_the_connection_closes(subject, broker, logger):
+    async def test():
+        task = publish(subject)
+        await settle()
+        broker.close_connection()
+
+        with pytest.raises(TransientRabbitError):
+            await task
+
+        task = publish(subject)
+        await settle()
+        broker.ack(1)
+        await task
+
+    asyncio.run(test())
+
+    assert len(broker.connections) == 2
+    logger.warning.assert_called_once()
+
+
+def test_publish_raises_when_the_connection_cannot_be_opened(subject, broker):
+    broker.open_error = AMQPConnectionError("Refused")
+
+    async def test():
+        await subject.publish("exchange", "routing_key", b"body", "subject", "1")
+
+    with pytest.raises(AMQPConnectionError):
+        asyncio.run(test())
+
+    assert broker.published == []
+
+
+def test_publish_rabbit_message_publishes_with_the_message_headers(subject, broker):
+    message = RabbitMessage(
+        encoded_body=b"body",
+        headers={
+            RABBITMQ_HEADER_KEY_ENCODER_TYPE: "json",
+            RABBITMQ_HEADER_KEY_VERSION: "3",
+            RABBITMQ_HEADER_KEY_SUBJECT: "test-subject",
+        },
+    )
+
+    async def test():
+        task = asyncio.ensure_future(subject.publish_rabbit_message(message, "exchange", "routing_key"))
+        await settle()
+        broker.ack(1)
+        await task
+
+    asyncio.run(test())
+
+    _, kwargs = broker.published[0]
+    assert kwargs["body"] == b"body"
+    assert kwargs["properties"].headers == {
+        RABBITMQ_HEADER_KEY_SUBJECT: "test-subject",
+        RABBITMQ_HEADER_KEY_VERSION: "3",
+        RABBITMQ_HEADER_KEY_ENCODER_TYPE: "json",
+    }
+
+
+def test_close_closes_the_connection(subject, broker):
+    async def test():
+        async with subject:
+            assert len(broker.connections) == 1
+
+    asyncio.run(test())
+
+    broker.connections[0].close.assert_called_once()
+
+
+def test_close_without_a_connection_does_nothing(subject, broker):
+    asyncio.run(subject.close())
+
+    assert broker.connections == []
+
+
+def test_constructor_sets_the_blocked_connection_timeout():
+    subject = AsyncPublisher(DEFAULT_SERVER_DETAILS, blocked_connection_timeout=12.5)
+
+    assert subject._connection_params.blocked_connection_timeout == 12.5
+
+
+def test_publish_raises_while_the_connection_is_blocked(subject, broker):
+    async def test():
+        await subject.connect()
+        broker.block()
+
+        with pytest.raises(ConnectionBlockedError):
+            await publish(subject)
+
+        broker.unblock()
+        task = publish(subject)
+        await settle()
+        broker.ack(1)
+        await task
+
+    asyncio.run(test())
+
+    assert len(broker.published) == 1
+    stats = subject.flow_control_stats
+    assert not stats.blocked
+    assert stats.times_blocked == 1
+    assert stats.rejected == 1
+
+
+def test_publish_raises_when_the_connection_stays_blocked_for_too_long(subject, broker):
+    async def test():
+        task = publish(subject)
+        await settle()
+        broker.block()
+        broker.close_connection(ConnectionBlockedTimeout())
+
+        with pytest.raises(ConnectionBlockedError):
+            await task
+
+    asyncio.run(test())
+
+    assert not subject.flow_control_stats.blocked
+
+
+def test_publish_raises_when_the_confirm_does_not_arrive_in_time(broker, logger):
+    subject = AsyncPublisher(DEFAULT_SERVER_DETAILS, confirm_timeout=0.01)
+
+    async def test():
+        with pytest.raises(TransientRabbitError, match="did not confirm"):
+            await publish(subject)
+
+        # A late confirm for the message is ignored.
+        broker.ack(1)
+
+    asyncio.run(test())
+
+    assert subject.outstanding_confirms == 0
+    assert "NOT PUBLISHED" in logger.error.call_args.args[0]
@@ -1,16 +1,25 @@
 import json
+from datetime import datetime, timezone
+from io import SEEK_CUR, SEEK_END, SEEK_SET, BytesIO
 from unittest.mock import ANY, MagicMock, Mock, patch
 
 import pytest
+from fastavro.validation import ValidationError
 
 from lab_share_lib.rabbit.avro_encoder import (
+    _BufferReader,
+    _bytes_reader,
     AvroEncoder,
     AvroEncoderJson,
     AvroEncoderBinary,
     AvroEncoderBinaryFile,
     AvroEncoderBinaryMessage,
+    AvroEncoderConfluent,
 )
-from lab_share_lib.rabbit.schema_registry import RESPONSE_KEY_SCHEMA, RESPONSE_KEY_VERSION
+from lab_share_lib.rabbit.parsed_schema_cache import PARSED_SCHEMA_CACHE, ParsedSchemaCache
+from lab_share_lib.rabbit.resolution_plan import RESOLUTION_PLAN_CACHE
+from lab_share_lib.rabbit.schema_registry import RESPONSE_KEY_ID, RESPONSE_KEY_SCHEMA, RESPONSE_KEY_VERSION
+from lab_share_lib.rabbit.schema_validator import COMPILED_VALIDATOR_CACHE
 
 SUBJECT = "create-plate-map"
 SCHEMA_DICT = {"name": "sampleName", "type": "string"}
@@ -18,6 +27,17 @@ SCHEMA_RESPONSE = {RESPONSE_KEY_SCHEMA: json.dumps(SCHEMA_DICT), RESPONSE_KEY_VE
 MESSAGE_BODY = "The written message."
 
 
+@pytest.fixture(autouse=True)
+def clear_parsed_schema_cache():
+    PARSED_SCHEMA_CACHE.clear()
+    COMPILED_VALIDATOR_CACHE.clear()
+    RESOLUTION_PLAN_CACHE.clear()
+    yield
+    PARSED_SCHEMA_CACHE.clear()
+    COMPILED_VALIDATOR_CACHE.clear()
+    RESOLUTION_PLAN_CACHE.clear()
+
+
 @pytest.fixture
 def logger():
     with patch("lab_share_lib.rabbit.avro_encoder.LOGGER") as logger:
@@ -59,10 +79,16 @@ def binary_message_subject(schema_registry):
     return AvroEncoderBinaryMessage(schema_registry, SUBJECT)
 
 
+@pytest.fixture
+def confluent_subject(schema_registry):
+    return AvroEncoderConfluent(schema_registry, SUBJECT)
+
+
 ENCODER_NAMES = [
     "json_subject",
     "binary_file_subject",
     "binary_message_subject",
+    "confluent_subject",
 ]
 
 
@@ -86,6 +112,53 @@ class TestCommonAvroEncoderFunctionality:
 
         assert response == SCHEMA_RESPONSE
 
+    @pytest.mark.parametrize("encoder_name", ENCODER_NAMES)
+    def test_schema_response_keeps_numbered_versions(self, encoder_name, schema_registry, request):
+        subject = request.getfixturevalue(encoder_name)
+
+        responses = [subject._schema_response("5") for _ in range(3)]
+
+        assert responses == [SCHEMA_RESPONSE] * 3
+        schema_registry.get_schema.assert_called_once_with(SUBJECT, "5")
+
+    @pytest.mark.parametrize("encoder_name", ENCODER_NAMES)
+    def test_schema_response_fetches_a_version_again_after_an_error_response(
+        self, encoder_name, schema_registry, request
+    ):
+        subject = request.getfixturevalue(encoder_name)
+        error_response = {"error_code": 40402, "message": "Version not found."}
+        schema_registry.get_schema.side_effect = [error_response, SCHEMA_RESPONSE, SCHEMA_RESPONSE]
+
+        responses = [subject._schema_response("5") for _ in range(3)]
+
+        assert responses == [error_response, SCHEMA_RESPONSE, SCHEMA_RESPONSE]
+        assert schema_registry.get_schema.call_count == 2
+
+    @pytest.mark.parametrize("encoder_name", ENCODER_NAMES)
+    @pytest.mark.parametrize("schema_version", [None, "latest"])
+    def test_schema_response_fetches_unnumbered_versions_every_time(
+        self, encoder_name, schema_registry, schema_version, request
+    ):
+        subject = request.getfixturevalue(encoder_name)
+
+        subject._schema_response(schema_version)
+        subject._schema_response(schema_version)
+
+        assert schema_registry.get_schema.call_count == 2
+
+    @pytest.mark.parametrize("encoder_name", ENCODER_NAMES)
+    def test_warm_prepares_the_schema_and_validator_for_each_version(self, encoder_name, schema_registry, request):
+        subject = request.getfixturevalue(encoder_name)
+
+        subject.warm(["5", "6"])
+
+        assert PARSED_SCHEMA_CACHE.stats.size == 1  # Both versions resolve to version 7
+        assert COMPILED_VALIDATOR_CACHE.stats.size == 1
+        assert schema_registry.get_schema.call_count == 2
+
+        subject.validate(MESSAGE_BODY, "5")
+        assert schema_registry.get_schema.call_count == 2
+
     @pytest.mark.parametrize("encoder_name", ENCODER_NAMES)
     def test_schema_parses_the_returned_schema(self, encoder_name, fastavro, request):
         subject = request.getfixturevalue(encoder_name)
@@ -97,20 +170,129 @@ class TestCommonAvroEncoderFunctionality:
         fastavro.parse_schema.assert_called_once_with(SCHEMA_DICT)
         assert parsed_schema == avro_schema
 
+    @pytest.mark.parametrize("encoder_name", ENCODER_NAMES)
+    def test_schema_caches_the_parsed_schema(self, encoder_name, fastavro, request):
+        subject = request.getfixturevalue(encoder_name)
+
+        first_schema = subject._schema(SCHEMA_RESPONSE)
+        second_schema = subject._schema(SCHEMA_RESPONSE)
+
+        fastavro.parse_schema.assert_called_once_with(SCHEMA_DICT)
+        assert first_schema is second_schema
+        assert PARSED_SCHEMA_CACHE.stats.hits == 1
+
+    @pytest.mark.parametrize("encoder_name", ENCODER_NAMES)
+    def test_schema_is_not_cached_without_a_version(self, encoder_name, fastavro, request):
+        subject = request.getfixturevalue(encoder_name)
+        schema_response = {RESPONSE_KEY_SCHEMA: json.dumps(SCHEMA_DICT)}
+
+        subject._schema(schema_response)
+        subject._schema(schema_response)
+
+        assert fastavro.parse_schema.call_count == 2
+        assert PARSED_SCHEMA_CACHE.stats.size == 0
+
+    @pytest.mark.parametrize("encoder_class", [AvroEncoderJson, AvroEncoderBinaryFile, AvroEncoderBinaryMessage])
+    def test_schema_uses_a_provided_cache(self, encoder_class, schema_registry, fastavro):
+        parsed_schema_cache = ParsedSchemaCache()
+        subject = encoder_class(schema_registry, SUBJECT, parsed_schema_cache)
+
+        subject._schema(SCHEMA_RESPONSE)
+
+        assert parsed_schema_cache.stats.size == 1
+        assert PARSED_SCHEMA_CACHE.stats.size == 0
+
     @pytest.mark.parametrize("encoder_name", ENCODER_NAMES)
     def test_schema_version_extracts_the_version(self, encoder_name, request):
         subject = request.getfixturevalue(encoder_name)
         assert subject._schema_version(SCHEMA_RESPONSE) == 7
 
     @pytest.mark.parametrize("encoder_name", ENCODER_NAMES)
-    def test_validate_calls_fastavro_validate(self, encoder_name, fastavro, request):
+    def test_validate_uses_a_validator_compiled_from_the_schema(self, encoder_name, fastavro, request):
         subject = request.getfixturevalue(encoder_name)
 
-        with patch("lab_share_lib.rabbit.avro_encoder.validate") as validate:
+        with patch("lab_share_lib.rabbit.avro_encoder.compile_validator") as compile_validator:
             data_obj = {"key": "value"}
             subject.validate(data_obj, "5")
 
-        validate.assert_called_once_with(data_obj, fastavro.parse_schema.return_value)
+        compile_validator.assert_called_once_with(fastavro.parse_schema.return_value)
+        compile_validator.return_value.assert_called_once_with(data_obj)
+
+    @pytest.mark.parametrize("encoder_name", ENCODER_NAMES)
+    def test_validate_caches_the_compiled_validator(self, encoder_name, request):
+        subject = request.getfixturevalue(encoder_name)
+
+        with patch("lab_share_lib.rabbit.avro_encoder.compile_validator") as compile_validator:
+            subject.validate("first", "5")
+            subject.validate("second", "5")
+
+        compile_validator.assert_called_once()
+        assert compile_validator.return_value.call_count == 2
+
+    @pytest.mark.parametrize("encoder_name", ENCODER_NAMES)
+    def test_validate_raises_validation_error_for_invalid_data(self, encoder_name, request):
+        subject = request.getfixturevalue(encoder_name)
+
+        subject.validate(MESSAGE_BODY, "5")
+        with pytest.raises(ValidationError):
+            subject.validate(42, "5")
+
+
+@pytest.mark.parametrize(
+    "encoder_name, message, expected",
+    [
+        ("json_subject", b'{"name": "sample"}', True),
+        ("json_subject", b"[1, 2]", True),
+        ("json_subject", b"Obj\x01", False),
+        ("binary_file_subject", b"Obj\x01\x04\x14", True),
+        ("binary_file_subject", b"Obj\x02", False),
+        ("binary_file_subject", b"Ob", False),
+        ("binary_message_subject", b"\xc3\x01\x00", True),
+        ("binary_message_subject", b"\xc3", False),
+        ("binary_message_subject", b"", False),
+        ("confluent_subject", b"\x00\x00\x00\x00\x2a", True),
+        ("confluent_subject", b"\xc3\x01\x00", False),
+        ("confluent_subject", b"", False),
+    ],
+)
+def test_recognises_checks_the_magic_bytes(request, encoder_name, message, expected):
+    subject = request.getfixturevalue(encoder_name)
+
+    assert subject.recognises(message) is expected
+    assert subject.recognises(memoryview(bytearray(message))) is expected
+
+
+class TestBytesReader:
+    def test_bytes_are_read_with_a_bytes_io_from_the_position(self):
+        reader = _bytes_reader(b"0123456789", 4)
+
+        assert isinstance(reader, BytesIO)
+        assert reader.read() == b"456789"
+
+    def test_a_memoryview_of_whole_bytes_is_read_with_a_bytes_io(self):
+        assert isinstance(_bytes_reader(memoryview(b"0123456789")), BytesIO)
+
+    @pytest.mark.parametrize("message", [bytearray(b"0123456789"), memoryview(b"--0123456789")[2:]])
+    def test_other_buffers_are_read_through_a_memoryview(self, message):
+        reader = _bytes_reader(message, 4)
+
+        assert isinstance(reader, _BufferReader)
+        assert reader.read() == b"456789"
+
+    def test_buffer_reader_reads_and_tells_the_position(self):
+        reader = _BufferReader(memoryview(b"0123456789"))
+
+        assert reader.read(3) == b"012"
+        assert reader.tell() == 3
+        assert reader.read(100) == b"3456789"
+        assert reader.read(1) == b""
+
+    @pytest.mark.parametrize("offset, whence, expected", [(2, SEEK_SET, 2), (-2, SEEK_END, 8), (3, SEEK_CUR, 4)])
+    def test_buffer_reader_seeks(self, offset, whence, expected):
+        reader = _BufferReader(memoryview(b"0123456789"), 1)
+
+        assert reader.seek(offset, whence) == expected
+        assert reader.read(1) == str(expected).encode()
 
 
 class TestAvroEncoderJson:
@@ -140,8 +322,8 @@ class TestAvroEncoderJson:
         result = json_subject.decode(MESSAGE_BODY.encode(), "1", schema_version)
 
         fastavro.json_reader.assert_called_once_with(ANY, fastavro.parse_schema.return_value)
-        string_reader = fastavro.json_reader.call_args.args[0]
-        assert string_reader.read() == MESSAGE_BODY
+        bytes_reader = fastavro.json_reader.call_args.args[0]
+        assert bytes_reader.read() == MESSAGE_BODY.encode()
 
         assert result == SCHEMA_DICT
 
@@ -154,6 +336,14 @@ class TestAvroEncoderJson:
 
         assert list(result) == records
 
+    @pytest.mark.parametrize("buffer_type", [bytes, bytearray, memoryview])
+    def test_decode_accepts_any_buffer_type(self, json_subject, buffer_type):
+        message = json_subject.encode([MESSAGE_BODY], "5")
+
+        result = json_subject.decode(buffer_type(message.body), "1", "5")
+
+        assert list(result) == [MESSAGE_BODY]
+
 
 class TestAvroEncoderBinaryFile:
     @pytest.fixture
@@ -192,6 +382,74 @@ class TestAvroEncoderBinaryFile:
 
         assert list(result) == records
 
+    @pytest.mark.parametrize("buffer_type", [bytes, bytearray, memoryview])
+    def test_decode_accepts_any_buffer_type(self, binary_file_subject, buffer_type, file):
+        result = binary_file_subject.decode(buffer_type(file), "1", "5")
+
+        assert list(result) == [MESSAGE_BODY]
+
+    def test_decode_reads_a_slice_of_a_larger_buffer(self, binary_file_subject, file):
+        buffer = memoryview(b"prefix" + file + b"suffix")
+
+        result = binary_file_subject.decode(buffer[6:-6], "1", "5")
+
+        assert list(result) == [MESSAGE_BODY]
+
+
+class TestAvroEncoderBinaryFileLargeMessages:
+    RECORD_SCHEMA = {
+        "type": "record",
+        "name": "sample",
+        "fields": [{"name": "name", "type": "string"}, {"name": "count", "type": "int"}],
+    }
+    RECORDS = [{"name": f"sample {index}", "count": index} for index in range(2000)]
+
+    @pytest.fixture
+    def subject(self):
+        schema_registry = MagicMock()
+        schema_registry.get_schema.return_value = {
+            RESPONSE_KEY_SCHEMA: json.dumps(self.RECORD_SCHEMA),
+            RESPONSE_KEY_VERSION: 3,
+        }
+
+        return AvroEncoderBinaryFile(schema_registry, "create-sample")
+
+    @pytest.fixture
+    def message(self, subject):
+        return subject.encode(self.RECORDS, "3").body
+
+    def test_decode_blocks_yields_records_a_block_at_a_time(self, subject, message):
+        blocks = list(subject.decode_blocks(message, "3"))
+
+        assert len(blocks) > 1
+        assert [record for block in blocks for record in block] == self.RECORDS
+
+    def test_decode_blocks_does_not_decode_until_iterated(self, subject, message):
+        subject._schema_registry.get_schema.reset_mock()
+
+        blocks = subject.decode_blocks(message, "3")
+        subject._schema_registry.get_schema.assert_not_called()
+
+        first_block = next(blocks)
+        assert first_block == self.RECORDS[: len(first_block)]
+
+    @pytest.mark.parametrize("chunk_size", [1, 10000, 1024 * 1024])
+    def test_decode_parallel_yields_records_in_order(self, subject, message, chunk_size):
+        result = list(subject.decode_parallel(message, "3", max_workers=2, chunk_size=chunk_size))
+
+        assert result == self.RECORDS
+
+    def test_decode_parallel_handles_compressed_messages(self, subject):
+        subject.set_compression_codec("deflate")
+        message = subject.encode(self.RECORDS, "3").body
+
+        assert list(subject.decode_parallel(message, "3", max_workers=2, chunk_size=10000)) == self.RECORDS
+
+    def test_decode_parallel_handles_an_empty_message(self, subject):
+        message = subject.encode([], "3").body
+
+        assert list(subject.decode_parallel(message, "3", max_workers=1)) == []
+
 
 class TestAvroEncoderBinaryMessage:
     @pytest.fixture
@@ -246,6 +504,251 @@ class TestAvroEncoderBinaryMessage:
 
         assert result == records
 
+    @pytest.mark.parametrize("buffer_type", [bytes, bytearray, memoryview])
+    def test_decode_accepts_any_buffer_type(self, binary_message_subject, buffer_type, message):
+        result = binary_message_subject.decode(buffer_type(message), "1", "5")
+
+        assert result == [MESSAGE_BODY]
+
+    def test_decode_reads_a_slice_of_a_larger_buffer(self, binary_message_subject, message):
+        buffer = memoryview(b"prefix" + message)
+
+        result = binary_message_subject.decode(buffer[6:], "1", "5")
+
+        assert result == [MESSAGE_BODY]
+
+    @pytest.mark.parametrize("schema_version", ["5", "42"])
+    def test_encode_many_encodes_each_record_as_a_message(self, binary_message_subject, schema_version, message):
+        result = binary_message_subject.encode_many([MESSAGE_BODY, MESSAGE_BODY], schema_version)
+
+        assert [encoded.body for encoded in result] == [message, message]
+        assert [encoded.version for encoded in result] == ["7", "7"]
+
+    def test_encode_many_fetches_the_schema_once(self, binary_message_subject, schema_registry):
+        binary_message_subject.encode_many([MESSAGE_BODY] * 10, "5")
+
+        schema_registry.get_schema.assert_called_once_with(SUBJECT, "5")
+
+    def test_encode_many_returns_an_empty_list_for_no_records(self, binary_message_subject):
+        assert binary_message_subject.encode_many([], "5") == []
+
+    def test_encode_many_and_decode_actions_work_together(self, binary_message_subject):
+        records = ["first", "a much longer second record", "third"]
+
+        messages = binary_message_subject.encode_many(records, "5")
+        result = [binary_message_subject.decode(encoded.body, "1", encoded.version)[0] for encoded in messages]
+
+        assert result == records
+
+    def test_encode_single_object_indexes_the_schema_by_fingerprint(self, binary_message_subject, message):
+        binary_message_subject.encode_single_object(MESSAGE_BODY, "5")
+
+        indexed_schema = PARSED_SCHEMA_CACHE.find_by_fingerprint(message[2:10])
+
+        assert indexed_schema is not None
+        assert indexed_schema.subject == SUBJECT
+        assert indexed_schema.version == "7"
+
+    def test_decode_finds_a_known_writer_schema_by_fingerprint(self, binary_message_subject, schema_registry):
+        encoded = binary_message_subject.encode_single_object(MESSAGE_BODY, "7")
+        schema_registry.get_schema.reset_mock()
+
+        result = binary_message_subject.decode(encoded.body, "1", "7")
+
+        assert result == [MESSAGE_BODY]
+        schema_registry.get_schema.assert_called_once_with(SUBJECT, "1")  # Only the reader schema was fetched
+
+    def test_decode_fetches_the_writer_version_for_an_unknown_fingerprint(
+        self, binary_message_subject, schema_registry, message
+    ):
+        result = binary_message_subject.decode(message, "1", "7")
+
+        assert result == [MESSAGE_BODY]
+        schema_registry.get_schema.assert_any_call(SUBJECT, "7")
+
+    def test_decode_warns_when_the_fingerprint_does_not_match_the_headers(
+        self, binary_message_subject, message, logger
+    ):
+        wrong_fingerprint_message = message[:2] + bytes(8) + message[10:]
+
+        result = binary_message_subject.decode(wrong_fingerprint_message, "1", "7")
+
+        assert result == [MESSAGE_BODY]
+        logger.warning.assert_called_once()
+        assert "does not match" in logger.warning.call_args.args[0]
+
+    def test_decode_reuses_the_resolution_plan_for_a_version_pair(self, binary_message_subject, message):
+        for _ in range(3):
+            binary_message_subject.decode(message, "1", "7")
+
+        assert RESOLUTION_PLAN_CACHE.stats.misses == 1
+        assert RESOLUTION_PLAN_CACHE.stats.hits == 2
+
+    def test_decode_skips_resolution_when_the_schemas_have_the_same_fingerprint(
+        self, binary_message_subject, message, fastavro
+    ):
+        with patch.object(AvroEncoderBinaryMessage, "_fingerprint", return_value=message[2:10]):
+            binary_message_subject.decode(message, "1", "7")
+
+        fastavro.schemaless_reader.assert_called_once_with(ANY, ANY, None)
+
+    def test_decode_resolves_an_evolved_reader_schema(self, schema_registry):
+        name_field = {"name": "name", "type": "string"}
+        volume_field = {"name": "volume", "type": "int", "default": 10}
+        record_schema = {"type": "record", "name": "sample", "fields": [name_field]}
+        evolved_schema = {"type": "record", "name": "sample", "fields": [name_field, volume_field]}
+        schema_responses = {
+            "1": {RESPONSE_KEY_SCHEMA: json.dumps(record_schema), RESPONSE_KEY_VERSION: 1},
+            "2": {RESPONSE_KEY_SCHEMA: json.dumps(evolved_schema), RESPONSE_KEY_VERSION: 2},
+        }
+        schema_registry.get_schema.side_effect = lambda _, version: schema_responses[version]
+        subject = AvroEncoderBinaryMessage(schema_registry, SUBJECT)
+
+        encoded = subject.encode_single_object({"name": "sample 1"}, "1")
+        results = [subject.decode(encoded.body, "2", "1") for _ in range(2)]
+
+        assert results == [[{"name": "sample 1", "volume": 10}]] * 2
+        assert RESOLUTION_PLAN_CACHE.stats.hits == 1
+
+    def test_decode_uses_the_header_version_when_versions_share_a_fingerprint(self, schema_registry):
+        # Parsing Canonical Form leaves out logical types, so these versions have the same fingerprint.
+        long_schema = {"type": "record", "name": "event", "fields": [{"name": "t", "type": "long"}]}
+        timestamp_field = {"name": "t", "type": {"type": "long", "logicalType": "timestamp-millis"}}
+        timestamp_schema = {"type": "record", "name": "event", "fields": [timestamp_field]}
+        schema_responses = {
+            "1": {RESPONSE_KEY_SCHEMA: json.dumps(long_schema), RESPONSE_KEY_VERSION: 1},
+            "2": {RESPONSE_KEY_SCHEMA: json.dumps(timestamp_schema), RESPONSE_KEY_VERSION: 2},
+        }
+        schema_registry.get_schema.side_effect = lambda _, version: schema_responses[version]
+        subject = AvroEncoderBinaryMessage(schema_registry, SUBJECT)
+        timestamp = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+        first = subject.encode_single_object({"t": 1704067200000}, "1")
+        second = subject.encode_single_object({"t": timestamp}, "2")
+        assert first.body[2:10] == second.body[2:10]
+
+        assert subject.decode(first.body, "1", "1") == [{"t": 1704067200000}]
+        assert subject.decode(second.body, "2", "2") == [{"t": timestamp}]
+
+    def test_decode_finds_the_writer_schema_by_fingerprint_without_a_version_number(
+        self, binary_message_subject, schema_registry
+    ):
+        encoded = binary_message_subject.encode_single_object(MESSAGE_BODY, "7")
+        schema_registry.get_schema.reset_mock()
+
+        result = binary_message_subject.decode(encoded.body, "1", "latest")
+
+        assert result == [MESSAGE_BODY]
+        schema_registry.get_schema.assert_called_once_with(SUBJECT, "1")
+
+    def test_warm_indexes_the_schema_by_fingerprint(self, binary_message_subject, message):
+        binary_message_subject.warm(["7"])
+
+        assert PARSED_SCHEMA_CACHE.find_by_fingerprint(message[2:10]) is not None
+
+    def test_decode_rejects_a_message_without_the_marker_before_fetching_schemas(
+        self, binary_message_subject, schema_registry
+    ):
+        with pytest.raises(ValueError):
+            binary_message_subject.decode(b"Obj\x01", "1", "7")
+
+        schema_registry.get_schema.assert_not_called()
+
+
+class TestAvroEncoderConfluent:
+    SCHEMA_ID = 42
+
+    @pytest.fixture
+    def schema_registry(self, schema_registry):
+        schema_registry.get_schema.return_value = {**SCHEMA_RESPONSE, RESPONSE_KEY_ID: self.SCHEMA_ID}
+        schema_registry.get_schema_by_id.return_value = {RESPONSE_KEY_SCHEMA: json.dumps(SCHEMA_DICT)}
+
+        return schema_registry
+
+    @pytest.fixture
+    def message(self, binary_message):
+        # The same record as the single-object encoded message, with a Confluent header in place of its marker and
+        # fingerprint.
+        return b"\x00" + self.SCHEMA_ID.to_bytes(4, "big") + binary_message[10:]
+
+    def test_encoder_type_returns_confluent(self, confluent_subject):
+        assert confluent_subject.encoder_type == "confluent"
+
+    def test_encode_encodes_the_message(self, confluent_subject, message):
+        result = confluent_subject.encode([MESSAGE_BODY], "5")
+
+        assert result.body == message
+        assert result.version == "7"
+
+    def test_encode_many_encodes_each_record_as_a_message(self, confluent_subject, message):
+        result = confluent_subject.encode_many([MESSAGE_BODY, MESSAGE_BODY], "5")
+
+        assert [encoded.body for encoded in result] == [message, message]
+
+    def test_encode_rejects_a_schema_response_without_an_id(self, confluent_subject, schema_registry):
+        schema_registry.get_schema.return_value = SCHEMA_RESPONSE
+
+        with pytest.raises(ValueError, match="has no schema ID"):
+            confluent_subject.encode([MESSAGE_BODY], "5")
+
+    def test_encode_rejects_more_than_one_record(self, confluent_subject):
+        with pytest.raises(ValueError, match="AvroEncoderConfluent only supports encoding exactly one object"):
+            confluent_subject.encode([MESSAGE_BODY, MESSAGE_BODY], "5")
+
+    @pytest.mark.parametrize("buffer_type", [bytes, bytearray, memoryview])
+    def test_decode_decodes_the_message(self, confluent_subject, schema_registry, buffer_type, message):
+        result = confluent_subject.decode(buffer_type(message), "1", "5")
+
+        assert result == [MESSAGE_BODY]
+        schema_registry.get_schema_by_id.assert_called_once_with(self.SCHEMA_ID)
+
+    def test_decode_caches_the_writer_schema_by_id(self, confluent_subject, schema_registry, message):
+        for _ in range(3):
+            confluent_subject.decode(message, "1", "5")
+
+        schema_registry.get_schema_by_id.assert_called_once_with(self.SCHEMA_ID)
+
+    def test_decode_ignores_the_version_in_the_headers(self, confluent_subject, schema_registry, message):
+        confluent_subject.decode(message, "1", "not a version")
+
+        schema_registry.get_schema.assert_called_once_with(SUBJECT, "1")
+
+    def test_both_encode_and_decode_actions_work_together(self, confluent_subject):
+        messages = confluent_subject.encode_many(["first", "a much longer second record"], "5")
+
+        assert [confluent_subject.decode(encoded.body, "1", encoded.version)[0] for encoded in messages] == [
+            "first",
+            "a much longer second record",
+        ]
+
+    def test_decode_resolves_an_evolved_reader_schema(self, schema_registry):
+        name_field = {"name": "name", "type": "string"}
+        volume_field = {"name": "volume", "type": "int", "default": 10}
+        record_schema = {"type": "record", "name": "sample", "fields": [name_field]}
+        evolved_schema = {"type": "record", "name": "sample", "fields": [name_field, volume_field]}
+        schema_registry.get_schema.side_effect = lambda _, version: {
+            "1": {RESPONSE_KEY_SCHEMA: json.dumps(record_schema), RESPONSE_KEY_VERSION: 1, RESPONSE_KEY_ID: 11},
+            "2": {RESPONSE_KEY_SCHEMA: json.dumps(evolved_schema), RESPONSE_KEY_VERSION: 2, RESPONSE_KEY_ID: 12},
+        }[version]
+        schema_registry.get_schema_by_id.return_value = {RESPONSE_KEY_SCHEMA: json.dumps(record_schema)}
+        subject = AvroEncoderConfluent(schema_registry, SUBJECT)
+
+        encoded = subject.encode_single_object({"name": "sample 1"}, "1")
+
+        assert encoded.body[:5] == b"\x00\x00\x00\x00\x0b"
+        assert subject.decode(encoded.body, "2", "1") == [{"name": "sample 1", "volume": 10}]
+        schema_registry.get_schema_by_id.assert_called_once_with(11)
+
+    @pytest.mark.parametrize("message", [b"\xc3\x01" + bytes(9), b"\x00\x00\x00", b""])
+    def test_decode_rejects_a_message_without_the_header_before_fetching_schemas(
+        self, confluent_subject, schema_registry, message
+    ):
+        with pytest.raises(ValueError, match="Confluent wire format"):
+            confluent_subject.decode(message, "1", "7")
+
+        schema_registry.get_schema.assert_not_called()
+        schema_registry.get_schema_by_id.assert_not_called()
+
 
 class TestDeprecatedAvroEncoderClasses:
     def test_avro_encoder_is_an_instance_of_avro_encoder_json(self, schema_registry):
@@ -0,0 +1,256 @@
+from threading import Event
+from unittest.mock import patch
+
+import pytest
+
+from lab_share_lib.config.rabbit_server_details import RabbitServerDetails
+from lab_share_lib.constants import (
+    RABBITMQ_HEADER_KEY_ENCODER_TYPE,
+    RABBITMQ_HEADER_KEY_SUBJECT,
+    RABBITMQ_HEADER_KEY_VERSION,
+)
+from lab_share_lib.exceptions import ConnectionBlockedError, TransientRabbitError
+from lab_share_lib.processing.rabbit_message import RabbitMessage
+from lab_share_lib.rabbit.background_publisher import BackgroundPublisher
+from lab_share_lib.rabbit.basic_publisher import OutgoingMessage, PublishResult
+
+DEFAULT_SERVER_DETAILS = RabbitServerDetails(
+    uses_ssl=False, host="host", port=5672, username="username", password="password", vhost="vhost"
+)
+
+
+@pytest.fixture(autouse=True)
+def logger():
+    with patch("lab_share_lib.rabbit.background_publisher.LOGGER") as logger:
+        yield logger
+
+
+@pytest.fixture
+def basic_publisher():
+    with patch("lab_share_lib.rabbit.background_publisher.BasicPublisher") as basic_publisher:
+        publisher = basic_publisher.return_value
+        publisher.batches = []
+
+        def publish_batch(messages):
+            publisher.batches.append(messages)
+            return [PublishResult(message, True, 1) for message in messages]
+
+        publisher.publish_batch.side_effect = publish_batch
+        yield publisher
+
+
+@pytest.fixture
+def subject(basic_publisher):
+    subject = BackgroundPublisher(DEFAULT_SERVER_DETAILS, 0, 5)
+    yield subject
+    if subject.is_alive():
+        subject.stop(timeout=5)
+
+
+def message(index=0):
+    return OutgoingMessage("exchange", "routing_key", f"body {index}".encode(), "subject", "1", "binary")
+
+
+def publish(subject, index=0):
+    return subject.publish_message(*message(index))
+
+
+def test_init_sets_the_thread_name_and_daemon(subject):
+    assert subject.name == "BackgroundPublisher"
+    assert subject.daemon is True
+
+
+def test_init_creates_a_basic_publisher():
+    with patch("lab_share_lib.rabbit.background_publisher.BasicPublisher") as basic_publisher:
+        BackgroundPublisher(
+            DEFAULT_SERVER_DETAILS, 5, 36, verify_cert=False, blocked_connection_timeout=10.0, blocked_buffer_size=50
+        )
+
+    basic_publisher.assert_called_once_with(DEFAULT_SERVER_DETAILS, 5, 36, False, blocked_connection_timeout=10.0)
+
+
+def test_publish_message_resolves_once_the_message_is_published(subject, basic_publisher):
+    subject.start()
+
+    future = publish(subject)
+
+    assert future.result(timeout=5) == PublishResult(message(), True, 1)
+    assert basic_publisher.batches == [[message()]]
+
+
+def test_publish_message_fails_when_the_message_is_not_published(subject, basic_publisher):
+    basic_publisher.publish_batch.side_effect = lambda messages: [PublishResult(m, False, 5) for m in messages]
+    subject.start()
+
+    future = publish(subject)
+
+    with pytest.raises(TransientRabbitError):
+        future.result(timeout=5)
+
+
+def test_publish_message_fails_when_publishing_raises(subject, basic_publisher, logger):
+    basic_publisher.publish_batch.side_effect = ValueError("Boom")
+    subject.start()
+
+    future = publish(subject)
+
+    with pytest.raises(ValueError, match="Boom"):
+        future.result(timeout=5)
+    logger.exception.assert_called_once()
+    assert subject.is_healthy
+
+
+def test_queued_messages_are_published_as_one_batch(subject, basic_publisher):
+    futures = [publish(subject, index) for index in range(3)]
+    subject.start()
+
+    assert [future.result(timeout=5).message for future in futures] == [message(index) for index in range(3)]
+    assert basic_publisher.batches == [[message(0), message(1), message(2)]]
+
+
+def test_batches_are_limited_to_the_max_batch_size(basic_publisher):
+    subject = BackgroundPublisher(DEFAULT_SERVER_DETAILS, 0, 5, max_batch_size=2)
+    futures = [publish(subject, index) for index in range(5)]
+    subject.start()
+    subject.stop(timeout=5)
+
+    assert all(future.result(timeout=5).published for future in futures)
+    assert [len(batch) for batch in basic_publisher.batches] == [2, 2, 1]
+
+
+def test_cancelled_messages_are_not_published(subject, basic_publisher):
+    cancelled = publish(subject, 0)
+    published = publish(subject, 1)
+    cancelled.cancel()
+    subject.start()
+
+    assert published.result(timeout=5).message == message(1)
+    assert basic_publisher.batches == [[message(1)]]
+
+
+def test_publish_message_raises_when_the_queue_stays_full(basic_publisher):
+    subject = BackgroundPublisher(DEFAULT_SERVER_DETAILS, 0, 5, max_queue_size=2, put_timeout=0.01)
+    publish(subject, 0)
+    publish(subject, 1)
+
+    with pytest.raises(TransientRabbitError, match="full"):
+        publish(subject, 2)
+
+    assert subject.queue_size == 2
+
+
+def test_publish_message_blocks_until_the_queue_has_room(basic_publisher):
+    subject = BackgroundPublisher(DEFAULT_SERVER_DETAILS, 0, 5, max_queue_size=1)
+    release = Event()
+    basic_publisher.publish_batch.side_effect = lambda messages: (
+        release.wait(5),
+        [PublishResult(m, True, 1) for m in messages],
+    )[1]
+    subject.start()
+    first = publish(subject, 0)
+    second = publish(subject, 1)  # Queued while the first is being published.
+
+    release.set()
+
+    assert first.result(timeout=5).published
+    assert second.result(timeout=5).published
+    subject.stop(timeout=5)
+
+
+def test_publish_rabbit_message_queues_the_message_with_its_headers(subject, basic_publisher):
+    rabbit_message = RabbitMessage(
+        encoded_body=b"body",
+        headers={
+            RABBITMQ_HEADER_KEY_ENCODER_TYPE: "json",
+            RABBITMQ_HEADER_KEY_VERSION: "3",
+            RABBITMQ_HEADER_KEY_SUBJECT: "test-subject",
+        },
+    )
+    subject.start()
+
+    future = subject.publish_rabbit_message(rabbit_message, "exchange", "routing_key")
+
+    assert future.result(timeout=5).message == OutgoingMessage(
+        "exchange", "routing_key", b"body", "test-subject", "3", "json"
+    )
+
+
+def test_stop_publishes_queued_messages_and_closes_the_connection(subject, basic_publisher):
+    futures = [publish(subject, index) for index in range(3)]
+    subject.start()
+
+    subject.stop(timeout=5)
+
+    assert not subject.is_alive()
+    assert not subject.is_healthy
+    assert all(future.done() and future.result().published for future in futures)
+    basic_publisher.close.assert_called_once()
+
+
+def test_publish_message_after_stop_raises(subject):
+    subject.start()
+    subject.stop(timeout=5)
+
+    with pytest.raises(RuntimeError, match="stopped"):
+        publish(subject)
+
+
+def test_idle_publisher_keeps_the_connection_alive(subject, basic_publisher):
+    kept_alive = Event()
+    basic_publisher.keep_alive.side_effect = kept_alive.set
+
+    with patch("lab_share_lib.rabbit.background_publisher.RABBITMQ_PUBLISH_KEEP_ALIVE_INTERVAL", 0.01):
+        subject.start()
+        assert kept_alive.wait(5)
+
+
+class TestBlockedConnection:
+    @pytest.fixture
+    def blocked(self, basic_publisher):
+        """Makes the BasicPublisher report the connection blocked until the event is set."""
+        unblocked = Event()
+
+        def publish_batch(messages):
+            if not unblocked.is_set():
+                return [PublishResult(message, False, 0) for message in messages]
+
+            basic_publisher.batches.append(messages)
+            return [PublishResult(message, True, 1) for message in messages]
+
+        basic_publisher.publish_batch.side_effect = publish_batch
+        return unblocked
+
+    def test_messages_fail_fast_without_a_buffer(self, subject, blocked):
+        subject.start()
+
+        future = publish(subject)
+
+        with pytest.raises(ConnectionBlockedError):
+            future.result(timeout=5)
+
+    def test_messages_are_held_and_published_once_unblocked(self, basic_publisher, blocked):
+        subject = BackgroundPublisher(DEFAULT_SERVER_DETAILS, 0, 5, blocked_buffer_size=2)
+        futures = [publish(subject, index) for index in range(3)]
+
+        with patch("lab_share_lib.rabbit.background_publisher.RABBITMQ_PUBLISH_KEEP_ALIVE_INTERVAL", 0.01):
+            subject.start()
+            with pytest.raises(ConnectionBlockedError):
+                futures[2].result(timeout=5)
+            assert not futures[0].done()
+
+            blocked.set()
+
+            assert [future.result(timeout=5).message for future in futures[:2]] == [message(0), message(1)]
+            subject.stop(timeout=5)
+
+        assert basic_publisher.batches == [[message(0), message(1)]]
+
+    def test_stop_fails_messages_held_while_blocked(self, basic_publisher, blocked):
+        subject = BackgroundPublisher(DEFAULT_SERVER_DETAILS, 0, 5, blocked_buffer_size=10)
+        future = publish(subject)
+        subject.start()
+
+        subject.stop(timeout=5)
+
+        with pytest.raises(ConnectionBlockedError, match="stopped"):
+            future.result(timeout=5)
@@ -1,10 +1,12 @@
-from typing import cast
-from unittest.mock import MagicMock, patch
+from threading import Event, Lock, Thread
+from typing import Any, cast
+from unittest.mock import MagicMock, call, patch
 import ssl
 import pika
 import pytest
 from pika import PlainCredentials
-from pika.spec import PERSISTENT_DELIVERY_MODE
+from pika.frame import Method
+from pika.spec import PERSISTENT_DELIVERY_MODE, Basic
 
 from lab_share_lib.processing.rabbit_message import RabbitMessage
 
@@ -14,7 +16,8 @@ from lab_share_lib.constants import (
     RABBITMQ_HEADER_KEY_ENCODER_TYPE,
     RABBITMQ_HEADER_VALUE_ENCODER_TYPE_DEFAULT,
 )
-from lab_share_lib.rabbit.basic_publisher import BasicPublisher
+from lab_share_lib.exceptions import ConnectionBlockedError
+from lab_share_lib.rabbit.basic_publisher import BasicPublisher, OutgoingMessage, PublisherKeepAlive, PublishResult
 from lab_share_lib.config.rabbit_server_details import RabbitServerDetails
 
 DEFAULT_SERVER_DETAILS = RabbitServerDetails(
@@ -92,7 +95,7 @@ def test_publish_message_publishes_the_message(
     blocking_connection.return_value.channel.assert_called_once()
     channel.confirm_delivery.assert_called_once()
     channel.basic_publish.assert_called_once()
-    blocking_connection.return_value.close.assert_called_once()
+    blocking_connection.return_value.close.assert_not_called()
 
     assert channel.basic_publish.call_args.kwargs["exchange"] == exchange
     assert channel.basic_publish.call_args.kwargs["routing_key"] == routing_key
@@ -104,6 +107,130 @@ def test_publish_message_publishes_the_message(
     assert message_properties.headers[RABBITMQ_HEADER_KEY_VERSION] == schema_version
 
 
+def test_publish_message_reuses_the_connection_and_channel(subject, blocking_connection, channel):
+    subject.publish_message("exchange", "routing_key", b"body 1", "subject", "1")
+    subject.publish_message("exchange", "routing_key", b"body 2", "subject", "1")
+
+    blocking_connection.assert_called_once()
+    blocking_connection.return_value.channel.assert_called_once()
+    channel.confirm_delivery.assert_called_once()
+    assert channel.basic_publish.call_count == 2
+
+
+def test_publish_message_reuses_properties_for_the_same_headers(subject, channel):
+    subject.publish_message("exchange", "routing_key", b"body 1", "subject", "1", "binary")
+    subject.publish_message("exchange", "routing_key", b"body 2", "subject", "1", "binary")
+    subject.publish_message("exchange", "routing_key", b"body 3", "subject", "2", "binary")
+
+    properties = [call.kwargs["properties"] for call in channel.basic_publish.call_args_list]
+    assert properties[0] is properties[1]
+    assert properties[2] is not properties[0]
+    assert properties[2].headers == {
+        RABBITMQ_HEADER_KEY_SUBJECT: "subject",
+        RABBITMQ_HEADER_KEY_VERSION: "2",
+        RABBITMQ_HEADER_KEY_ENCODER_TYPE: "binary",
+    }
+
+
+def test_publish_message_reopens_a_closed_connection(subject, blocking_connection, channel):
+    subject.publish_message("exchange", "routing_key", b"body 1", "subject", "1")
+    blocking_connection.return_value.is_open = False
+    channel.is_open = False
+
+    subject.publish_message("exchange", "routing_key", b"body 2", "subject", "1")
+
+    assert blocking_connection.call_count == 2
+    assert channel.basic_publish.call_count == 2
+
+
+def test_publish_message_reopens_a_closed_channel(subject, blocking_connection, channel):
+    subject.publish_message("exchange", "routing_key", b"body 1", "subject", "1")
+    channel.is_open = False
+
+    subject.publish_message("exchange", "routing_key", b"body 2", "subject", "1")
+
+    blocking_connection.assert_called_once()
+    assert blocking_connection.return_value.channel.call_count == 2
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        pika.exceptions.StreamLostError("Lost"),
+        pika.exceptions.ConnectionClosedByBroker(320, "Shutdown"),
+        pika.exceptions.ChannelClosedByBroker(404, "Not found"),
+    ],
+)
+def test_publish_message_reconnects_when_the_connection_is_lost_while_publishing(
+    subject, blocking_connection, channel, logger, error
+):
+    channel.basic_publish.side_effect = [error, None]
+
+    subject.publish_message("exchange", "routing_key", b"body", "subject", "1")
+
+    assert blocking_connection.call_count == 2
+    assert channel.basic_publish.call_count == 2
+    logger.warning.assert_called_once()
+    assert "successfully" in logger.info.call_args.args[0]
+
+
+def test_publish_message_raises_when_reconnecting_fails(subject, blocking_connection, channel):
+    channel.basic_publish.side_effect = pika.exceptions.StreamLostError("Lost")
+
+    with pytest.raises(pika.exceptions.StreamLostError):
+        subject.publish_message("exchange", "routing_key", b"body", "subject", "1")
+
+    assert blocking_connection.call_count == 2
+
+
+def test_keep_alive_processes_events_on_the_open_connection(subject, blocking_connection):
+    subject.publish_message("exchange", "routing_key", b"body", "subject", "1")
+
+    subject.keep_alive()
+
+    blocking_connection.return_value.process_data_events.assert_called_once_with(time_limit=0)
+
+
+def test_keep_alive_without_a_connection_does_nothing(subject, blocking_connection):
+    subject.keep_alive()
+
+    blocking_connection.assert_not_called()
+
+
+def test_keep_alive_closes_a_lost_connection(subject, blocking_connection, logger):
+    subject.publish_message("exchange", "routing_key", b"body", "subject", "1")
+    blocking_connection.return_value.process_data_events.side_effect = pika.exceptions.StreamLostError("Lost")
+
+    subject.keep_alive()
+
+    assert subject._connection is None
+    logger.warning.assert_called_once()
+
+
+def test_close_closes_the_open_connection(subject, blocking_connection):
+    subject.publish_message("exchange", "routing_key", b"body", "subject", "1")
+
+    subject.close()
+
+    blocking_connection.return_value.close.assert_called_once()
+    assert subject._connection is None
+
+
+def test_close_without_a_connection_does_nothing(subject, blocking_connection):
+    subject.close()
+
+    blocking_connection.assert_not_called()
+
+
+def test_publish_message_after_close_opens_a_new_connection(subject, blocking_connection):
+    subject.publish_message("exchange", "routing_key", b"body 1", "subject", "1")
+    subject.close()
+
+    subject.publish_message("exchange", "routing_key", b"body 2", "subject", "1")
+
+    assert blocking_connection.call_count == 2
+
+
 def test_publish_message_logs_start_and_finish_accurately(subject, logger, message_logger):
     subject.publish_message("arg1", "arg2", '{ "key": "value" }'.encode(), "arg4", "arg5")
 
@@ -214,3 +341,586 @@ def test_publish_rabbit_message_without_encoder_type_set(subject):
             schema_version="1",
             encoder_type=RABBITMQ_HEADER_VALUE_ENCODER_TYPE_DEFAULT,
         )
+
+
+class Broker:
+    """Stands in for the broker behind the batch channel, confirming published messages whenever the connection
+    processes events. Messages whose body or routing key is in `nacks` are nacked that many times before being acked,
+    and bodies in `drops` are never confirmed.
+    """
+
+    def __init__(self, connection, channel):
+        self.nacks: dict = {}
+        self.drops: set = set()
+        self.multiple = False
+        self.published: list = []
+        self._on_confirm: Any = None
+        self._unconfirmed: list = []
+        self._delivery_tag = 0
+        channel._impl.confirm_delivery.side_effect = self._confirm_delivery
+        channel.basic_publish.side_effect = self._publish
+        connection.process_data_events.side_effect = self._process_data_events
+
+    def _confirm_delivery(self, ack_nack_callback):
+        self._on_confirm = ack_nack_callback
+        self._delivery_tag = 0
+
+    def _publish(self, exchange, routing_key, body, properties):
+        self._delivery_tag += 1
+        self.published.append(body)
+        self._unconfirmed.append((self._delivery_tag, body, routing_key))
+
+    def _process_data_events(self, time_limit):
+        unconfirmed, self._unconfirmed = self._unconfirmed, []
+        if self.multiple and not self.nacks and not self.drops and unconfirmed:
+            self._on_confirm(Method(1, Basic.Ack(delivery_tag=unconfirmed[-1][0], multiple=True)))
+            return
+
+        for delivery_tag, body, routing_key in unconfirmed:
+            if body in self.drops:
+                continue
+            key = body if body in self.nacks else routing_key
+            if self.nacks.get(key, 0) > 0:
+                self.nacks[key] -= 1
+                self._on_confirm(Method(1, Basic.Nack(delivery_tag=delivery_tag)))
+            else:
+                self._on_confirm(Method(1, Basic.Ack(delivery_tag=delivery_tag)))
+
+
+class TestPublishBatch:
+    @pytest.fixture
+    def broker(self, blocking_connection, channel):
+        return Broker(blocking_connection.return_value, channel)
+
+    @staticmethod
+    def make_messages(count):
+        return [
+            OutgoingMessage("exchange", f"routing_key.{index}", f"body {index}".encode(), "subject", "1", "binary")
+            for index in range(count)
+        ]
+
+    def test_publish_batch_publishes_every_message(self, subject, broker, channel):
+        messages = self.make_messages(3)
+
+        results = subject.publish_batch(messages)
+
+        assert results == [PublishResult(message, True, 1) for message in messages]
+        assert [call.kwargs["routing_key"] for call in channel.basic_publish.call_args_list] == [
+            "routing_key.0",
+            "routing_key.1",
+            "routing_key.2",
+        ]
+        properties = channel.basic_publish.call_args.kwargs["properties"]
+        assert properties.delivery_mode == PERSISTENT_DELIVERY_MODE
+        assert properties.headers == {
+            RABBITMQ_HEADER_KEY_SUBJECT: "subject",
+            RABBITMQ_HEADER_KEY_VERSION: "1",
+            RABBITMQ_HEADER_KEY_ENCODER_TYPE: "binary",
+        }
+
+    def test_publish_batch_waits_for_confirms_together(self, subject, broker, blocking_connection):
+        subject.publish_batch(self.make_messages(10))
+
+        blocking_connection.return_value.process_data_events.assert_called_once()
+        blocking_connection.return_value.add_callback_threadsafe.assert_called_once()
+
+    def test_publish_batch_handles_confirms_for_multiple_messages(self, subject, broker):
+        broker.multiple = True
+        messages = self.make_messages(5)
+
+        assert subject.publish_batch(messages) == [PublishResult(message, True, 1) for message in messages]
+
+    def test_publish_batch_does_not_use_blocking_confirms(self, subject, broker, channel):
+        subject.publish_batch(self.make_messages(2))
+
+        channel.confirm_delivery.assert_not_called()
+        channel._impl.confirm_delivery.assert_called_once()
+
+    def test_publish_batch_retries_only_the_messages_that_were_nacked(self, subject, broker, logger):
+        messages = self.make_messages(3)
+        broker.nacks = {b"body 1": 2}
+
+        results = subject.publish_batch(messages)
+
+        assert results == [
+            PublishResult(messages[0], True, 1),
+            PublishResult(messages[1], True, 3),
+            PublishResult(messages[2], True, 1),
+        ]
+        assert broker.published == [b"body 0", b"body 1", b"body 2", b"body 1", b"body 1"]
+        assert logger.warning.call_count == 2
+        logger.error.assert_not_called()
+
+    def test_publish_batch_gives_up_after_the_maximum_number_of_attempts(self, subject, broker, logger):
+        messages = self.make_messages(2)
+        broker.nacks = {b"body 0": 100}
+
+        results = subject.publish_batch(messages)
+
+        assert results == [PublishResult(messages[0], False, 5), PublishResult(messages[1], True, 1)]
+        logger.error.assert_called_once()
+        assert "NOT PUBLISHED" in logger.error.call_args.args[0]
+
+    def test_publish_batch_retries_messages_that_are_not_confirmed_in_time(self, broker, logger):
+        subject = BasicPublisher(DEFAULT_SERVER_DETAILS, 0, 2, confirm_timeout=0.01)
+        messages = self.make_messages(2)
+        broker.drops = {b"body 1"}
+
+        results = subject.publish_batch(messages)
+
+        assert results == [PublishResult(messages[0], True, 1), PublishResult(messages[1], False, 2)]
+        assert "Timed out" in logger.warning.call_args_list[0].args[0]
+
+    def test_publish_batch_reconnects_when_the_connection_is_lost(self, subject, broker, blocking_connection, channel):
+        publish = channel.basic_publish.side_effect
+        errors = [pika.exceptions.StreamLostError("Lost")]
+
+        def lose_connection_once(**kwargs):
+            if errors:
+                raise errors.pop()
+            publish(**kwargs)
+
+        channel.basic_publish.side_effect = lose_connection_once
+        messages = self.make_messages(2)
+
+        results = subject.publish_batch(messages)
+
+        assert results == [PublishResult(messages[0], True, 2), PublishResult(messages[1], True, 2)]
+        assert blocking_connection.call_count == 2
+        assert channel._impl.confirm_delivery.call_count == 2
+
+    def test_publish_batch_reuses_the_batch_channel(self, subject, broker, blocking_connection, channel):
+        subject.publish_batch(self.make_messages(2))
+        results = subject.publish_batch(self.make_messages(2))
+
+        assert all(result.published for result in results)
+        blocking_connection.assert_called_once()
+        channel._impl.confirm_delivery.assert_called_once()
+
+    def test_publish_batch_with_no_messages(self, subject, broker, channel):
+        assert subject.publish_batch([]) == []
+
+        channel.basic_publish.assert_not_called()
+
+
+class TestPublishFanout:
+    DESTINATIONS = [("audit", "audit.key"), ("downstream", "downstream.key"), ("warehouse", "warehouse.key")]
+
+    @pytest.fixture
+    def broker(self, blocking_connection, channel):
+        return Broker(blocking_connection.return_value, channel)
+
+    @pytest.fixture
+    def message(self):
+        return RabbitMessage(
+            encoded_body=b"body",
+            headers={
+                RABBITMQ_HEADER_KEY_ENCODER_TYPE: "json",
+                RABBITMQ_HEADER_KEY_VERSION: "3",
+                RABBITMQ_HEADER_KEY_SUBJECT: "test-subject",
+            },
+        )
+
+    def test_publish_fanout_publishes_the_message_to_every_destination(self, subject, broker, channel, message):
+        results = subject.publish_fanout(message, self.DESTINATIONS)
+
+        assert results == [
+            PublishResult(OutgoingMessage(exchange, routing_key, b"body", "test-subject", "3", "json"), True, 1)
+            for exchange, routing_key in self.DESTINATIONS
+        ]
+        calls = channel.basic_publish.call_args_list
+        assert [(call.kwargs["exchange"], call.kwargs["routing_key"]) for call in calls] == self.DESTINATIONS
+        assert all(call.kwargs["body"] is message.encoded_body for call in calls)
+        assert len({id(call.kwargs["properties"]) for call in calls}) == 1
+        assert calls[0].kwargs["properties"].headers == {
+            RABBITMQ_HEADER_KEY_SUBJECT: "test-subject",
+            RABBITMQ_HEADER_KEY_VERSION: "3",
+            RABBITMQ_HEADER_KEY_ENCODER_TYPE: "json",
+        }
+
+    def test_publish_fanout_uses_one_channel_and_waits_for_confirms_together(
+        self, subject, broker, blocking_connection, channel, message
+    ):
+        subject.publish_fanout(message, self.DESTINATIONS)
+
+        blocking_connection.assert_called_once()
+        blocking_connection.return_value.channel.assert_called_once()
+        blocking_connection.return_value.process_data_events.assert_called_once()
+
+    def test_publish_fanout_retries_only_the_destinations_that_were_not_confirmed(self, subject, broker, message):
+        broker.nacks = {"downstream.key": 1}
+
+        results = subject.publish_fanout(message, self.DESTINATIONS)
+
+        assert [(result.message.exchange, result.published, result.attempts) for result in results] == [
+            ("audit", True, 1),
+            ("downstream", True, 2),
+            ("warehouse", True, 1),
+        ]
+        assert len(broker.published) == 4
+
+    def test_publish_fanout_reports_destinations_that_were_not_published(self, subject, broker, message, logger):
+        broker.nacks = {"warehouse.key": 100}
+
+        results = subject.publish_fanout(message, self.DESTINATIONS)
+
+        assert [result.published for result in results] == [True, True, False]
+        assert results[2].attempts == 5
+        assert "NOT PUBLISHED" in logger.error.call_args.args[0]
+
+    def test_publish_fanout_with_no_destinations(self, subject, broker, channel, message):
+        assert subject.publish_fanout(message, []) == []
+
+        channel.basic_publish.assert_not_called()
+
+
+class TestOutbox:
+    @pytest.fixture
+    def outbox(self):
+        outbox = MagicMock()
+        outbox.__len__.return_value = 0
+        return outbox
+
+    @pytest.fixture
+    def subject(self, outbox):
+        return BasicPublisher(DEFAULT_SERVER_DETAILS, 5, 36, outbox=outbox)
+
+    def test_constructor_starts_draining_the_outbox_with_a_single_attempt_publisher(self, subject, outbox):
+        outbox.start_draining.assert_called_once()
+        drainer_publisher, retry_delay = outbox.start_draining.call_args.args
+        assert isinstance(drainer_publisher, BasicPublisher)
+        assert drainer_publisher is not subject
+        assert drainer_publisher._publish_max_retries == 1
+        assert retry_delay == 5
+
+    def test_publish_message_publishes_when_the_outbox_is_empty(self, subject, outbox, channel, logger):
+        subject.publish_message("exchange", "routing_key", b"body", "subject", "1")
+
+        channel.basic_publish.assert_called_once()
+        outbox.append.assert_not_called()
+        assert "successfully" in logger.info.call_args.args[0]
+
+    @pytest.mark.parametrize(
+        "error",
+        [pika.exceptions.UnroutableError([]), pika.exceptions.NackError([]), pika.exceptions.AMQPConnectionError()],
+    )
+    def test_publish_message_saves_the_message_when_it_cannot_be_published(self, subject, outbox, channel, error):
+        channel.basic_publish.side_effect = error
+
+        with patch("lab_share_lib.rabbit.basic_publisher.time.sleep") as sleep:
+            subject.publish_message("exchange", "routing_key", b"body", "subject", "1", "binary")
+
+        outbox.append.assert_called_once_with(
+            OutgoingMessage("exchange", "routing_key", b"body", "subject", "1", "binary")
+        )
+        sleep.assert_not_called()
+
+    def test_publish_message_saves_the_message_behind_waiting_messages(self, subject, outbox, channel):
+        outbox.__len__.return_value = 3
+
+        subject.publish_message("exchange", "routing_key", b"body", "subject", "1")
+
+        channel.basic_publish.assert_not_called()
+        outbox.append.assert_called_once_with(OutgoingMessage("exchange", "routing_key", b"body", "subject", "1"))
+
+    def test_publish_batch_saves_the_messages_that_were_not_confirmed_without_retrying(
+        self, outbox, blocking_connection, channel
+    ):
+        subject = BasicPublisher(DEFAULT_SERVER_DETAILS, 5, 36, confirm_timeout=0.01, outbox=outbox)
+        broker = Broker(blocking_connection.return_value, channel)
+        broker.nacks = {b"body 1": 1, b"body 3": 1}
+        broker.drops = {b"body 2"}
+        messages = TestPublishBatch.make_messages(4)
+
+        with patch("lab_share_lib.rabbit.basic_publisher.time.sleep") as sleep:
+            results = subject.publish_batch(messages)
+
+        assert results == [
+            PublishResult(messages[0], True, 1),
+            PublishResult(messages[1], False, 1, saved=True),
+            PublishResult(messages[2], False, 1, saved=True),
+            PublishResult(messages[3], False, 1, saved=True),
+        ]
+        assert outbox.append.call_args_list == [call(messages[1]), call(messages[2]), call(messages[3])]
+        sleep.assert_not_called()
+
+    def test_publish_batch_saves_the_whole_batch_behind_waiting_messages(self, subject, outbox, channel):
+        outbox.__len__.return_value = 3
+        messages = TestPublishBatch.make_messages(2)
+
+        results = subject.publish_batch(messages)
+
+        channel.basic_publish.assert_not_called()
+        assert results == [PublishResult(message, False, 0, saved=True) for message in messages]
+        assert outbox.append.call_args_list == [call(message) for message in messages]
+
+    def test_publish_batch_saves_the_whole_batch_when_the_connection_is_lost(
+        self, subject, outbox, blocking_connection
+    ):
+        blocking_connection.side_effect = pika.exceptions.AMQPConnectionError()
+        messages = TestPublishBatch.make_messages(2)
+
+        with patch("lab_share_lib.rabbit.basic_publisher.time.sleep") as sleep:
+            results = subject.publish_batch(messages)
+
+        assert results == [PublishResult(message, False, 1, saved=True) for message in messages]
+        assert outbox.append.call_args_list == [call(message) for message in messages]
+        sleep.assert_not_called()
+
+    def test_publish_fanout_saves_the_destinations_that_were_not_confirmed(
+        self, subject, outbox, blocking_connection, channel
+    ):
+        broker = Broker(blocking_connection.return_value, channel)
+        broker.nacks = {"routing_key.2": 1}
+        message = RabbitMessage(
+            encoded_body=b"body",
+            headers={RABBITMQ_HEADER_KEY_VERSION: "3", RABBITMQ_HEADER_KEY_SUBJECT: "test-subject"},
+        )
+        destinations = [("exchange", "routing_key.1"), ("exchange", "routing_key.2")]
+
+        with patch("lab_share_lib.rabbit.basic_publisher.time.sleep") as sleep:
+            results = subject.publish_fanout(message, destinations)
+
+        assert [(result.published, result.saved) for result in results] == [(True, False), (False, True)]
+        outbox.append.assert_called_once_with(results[1].message)
+        sleep.assert_not_called()
+
+
+class TestFlowControl:
+    @pytest.fixture
+    def connection(self, blocking_connection):
+        return blocking_connection.return_value
+
+    @staticmethod
+    def block(connection):
+        on_blocked = connection.add_on_connection_blocked_callback.call_args.args[0]
+        on_blocked(connection, Method(0, pika.spec.Connection.Blocked(reason="low on memory")))
+
+    @staticmethod
+    def unblock_on_next_events(connection):
+        on_unblocked = connection.add_on_connection_unblocked_callback.call_args.args[0]
+        connection.process_data_events.side_effect = lambda time_limit: on_unblocked(
+            connection, Method(0, pika.spec.Connection.Unblocked())
+        )
+
+    def test_constructor_sets_the_blocked_connection_timeout(self):
+        subject = BasicPublisher(DEFAULT_SERVER_DETAILS, 0, 3, blocked_connection_timeout=12.5)
+
+        assert subject._connection_params.blocked_connection_timeout == 12.5
+
+    def test_publish_message_registers_blocked_callbacks_on_the_connection(self, subject, connection):
+        subject.publish_message("exchange", "routing_key", b"body", "subject", "1")
+
+        connection.add_on_connection_blocked_callback.assert_called_once()
+        connection.add_on_connection_unblocked_callback.assert_called_once()
+
+    def test_publish_message_fails_fast_while_blocked(self, subject, connection, channel):
+        subject.publish_message("exchange", "routing_key", b"body", "subject", "1")
+        self.block(connection)
+
+        with pytest.raises(ConnectionBlockedError):
+            subject.publish_message("exchange", "routing_key", b"body", "subject", "1")
+
+        assert channel.basic_publish.call_count == 1
+        assert subject.flow_control_stats.blocked
+        assert subject.flow_control_stats.rejected == 1
+
+    def test_publish_message_buffers_while_blocked_and_publishes_once_unblocked(self, connection, channel):
+        subject = BasicPublisher(DEFAULT_SERVER_DETAILS, 0, 5, blocked_buffer_size=2)
+        subject.publish_message("exchange", "routing_key", b"body 0", "subject", "1")
+        self.block(connection)
+
+        subject.publish_message("exchange", "routing_key", b"body 1", "subject", "1")
+        subject.publish_message("exchange", "routing_key", b"body 2", "subject", "1")
+        with pytest.raises(ConnectionBlockedError):
+            subject.publish_message("exchange", "routing_key", b"body 3", "subject", "1")
+        assert subject.flow_control_stats.buffered == 2
+
+        broker = Broker(connection, channel)
+        on_unblocked = connection.add_on_connection_unblocked_callback.call_args.args[0]
+        on_unblocked(connection, Method(0, pika.spec.Connection.Unblocked()))
+        subject.publish_message("exchange", "routing_key", b"body 4", "subject", "1")
+
+        assert broker.published == [b"body 1", b"body 2", b"body 4"]
+        assert subject.flow_control_stats.buffered == 0
+        assert not subject.flow_control_stats.blocked
+
+    def test_publish_message_notices_the_connection_was_unblocked(self, subject, connection, channel):
+        subject.publish_message("exchange", "routing_key", b"body", "subject", "1")
+        self.block(connection)
+        self.unblock_on_next_events(connection)
+
+        subject.publish_message("exchange", "routing_key", b"body", "subject", "1")
+
+        assert channel.basic_publish.call_count == 2
+        assert subject.flow_control_stats.times_blocked == 1
+
+    def test_keep_alive_publishes_buffered_messages_once_unblocked(self, connection, channel):
+        subject = BasicPublisher(DEFAULT_SERVER_DETAILS, 0, 5, blocked_buffer_size=10)
+        subject.publish_message("exchange", "routing_key", b"body 0", "subject", "1")
+        self.block(connection)
+        subject.publish_message("exchange", "routing_key", b"body 1", "subject", "1")
+
+        subject.keep_alive()
+        assert subject.flow_control_stats.buffered == 1
+
+        broker = Broker(connection, channel)
+        process_data_events = connection.process_data_events.side_effect
+        self.unblock_on_next_events(connection)
+        unblock = connection.process_data_events.side_effect
+
+        def unblock_then_confirm(time_limit):
+            unblock(time_limit)
+            process_data_events(time_limit)
+
+        connection.process_data_events.side_effect = unblock_then_confirm
+        subject.keep_alive()
+
+        assert broker.published == [b"body 1"]
+        assert subject.flow_control_stats.buffered == 0
+
+    def test_publish_message_raises_when_blocked_for_too_long(self, subject, connection, channel):
+        channel.basic_publish.side_effect = pika.exceptions.ConnectionBlockedTimeout()
+
+        with pytest.raises(ConnectionBlockedError):
+            subject.publish_message("exchange", "routing_key", b"body", "subject", "1")
+
+        # Reconnecting won't help while the broker's alarm lasts, so the publish isn't tried again.
+        assert channel.basic_publish.call_count == 1
+        connection.close.assert_called_once()
+
+    def test_publish_batch_publishes_nothing_while_blocked(self, subject, connection, channel):
+        subject.publish_message("exchange", "routing_key", b"body", "subject", "1")
+        self.block(connection)
+        message = OutgoingMessage("exchange", "routing_key", b"body", "subject", "1")
+
+        assert subject.publish_batch([message]) == [PublishResult(message, False, 0)]
+        assert channel.basic_publish.call_count == 1
+
+    def test_close_ends_the_blocked_period(self, subject, connection):
+        subject.publish_message("exchange", "routing_key", b"body", "subject", "1")
+        self.block(connection)
+
+        subject.close()
+
+        assert not subject.flow_control_stats.blocked
+        assert subject.flow_control_stats.times_blocked == 1
+
+    def test_publish_message_saves_to_the_outbox_while_blocked(self, connection, channel):
+        outbox = MagicMock()
+        outbox.__len__.return_value = 0
+        subject = BasicPublisher(DEFAULT_SERVER_DETAILS, 0, 5, outbox=outbox)
+        subject.publish_message("exchange", "routing_key", b"body", "subject", "1")
+        self.block(connection)
+
+        subject.publish_message("exchange", "routing_key", b"body 1", "subject", "1")
+
+        outbox.append.assert_called_once_with(OutgoingMessage("exchange", "routing_key", b"body 1", "subject", "1"))
+        assert subject.flow_control_stats.rejected == 0
+
+    def test_publish_batch_saves_to_the_outbox_while_blocked(self, connection, channel):
+        outbox = MagicMock()
+        outbox.__len__.return_value = 0
+        subject = BasicPublisher(DEFAULT_SERVER_DETAILS, 0, 5, outbox=outbox)
+        subject.publish_message("exchange", "routing_key", b"body", "subject", "1")
+        self.block(connection)
+        messages = TestPublishBatch.make_messages(2)
+
+        results = subject.publish_batch(messages)
+
+        assert results == [PublishResult(message, False, 0, saved=True) for message in messages]
+        assert outbox.append.call_args_list == [call(message) for message in messages]
+        assert channel.basic_publish.call_count == 1
+
+
+class TestThreadSafety:
+    def test_publish_message_publishes_one_message_at_a_time_from_many_threads(
+        self, subject, blocking_connection, channel
+    ):
+        publishing = Lock()
+        overlapped = []
+
+        def basic_publish(**kwargs):
+            if not publishing.acquire(blocking=False):
+                overlapped.append(kwargs["body"])
+                return
+            try:
+                Event().wait(0.001)
+            finally:
+                publishing.release()
+
+        channel.basic_publish.side_effect = basic_publish
+
+        def worker(number):
+            for index in range(10):
+                subject.publish_message("exchange", "routing_key", f"{number}-{index}".encode(), "subject", "1")
+
+        threads = [Thread(target=worker, args=(number,)) for number in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert overlapped == []
+        assert channel.basic_publish.call_count == 40
+        blocking_connection.assert_called_once()
+
+    def test_close_waits_for_a_publish_in_progress(self, subject, blocking_connection, channel):
+        publishing, closed = Event(), Event()
+        closed_while_publishing = []
+
+        def basic_publish(**kwargs):
+            publishing.set()
+            closed_while_publishing.append(closed.wait(0.05))
+
+        channel.basic_publish.side_effect = basic_publish
+        publisher = Thread(target=subject.publish_message, args=("exchange", "routing_key", b"body", "subject", "1"))
+        publisher.start()
+        publishing.wait()
+
+        subject.close()
+        closed.set()
+        publisher.join()
+
+        assert closed_while_publishing == [False]
+        blocking_connection.return_value.close.assert_called_once()
+
+
+class TestPublisherKeepAlive:
+    def test_run_keeps_the_publisher_alive_until_stopped(self):
+        publisher = MagicMock()
+        kept_alive = Event()
+        publisher.keep_alive.side_effect = kept_alive.set
+        subject = PublisherKeepAlive(publisher, interval=0.01)
+
+        subject.start()
+        assert kept_alive.wait(1)
+        subject.stop()
+
+        assert not subject.is_alive()
+        publisher.close.assert_called_once()
+
+    def test_run_carries_on_after_an_error(self, logger):
+        publisher = MagicMock()
+        kept_alive = Event()
+
+        def keep_alive():
+            if publisher.keep_alive.call_count == 1:
+                raise Exception("error")
+            kept_alive.set()
+
+        publisher.keep_alive.side_effect = keep_alive
+        subject = PublisherKeepAlive(publisher, interval=0.01)
+
+        subject.start()
+        assert kept_alive.wait(1)
+        subject.stop()
+
+        logger.exception.assert_called_once()
+
+    def test_stop_before_start(self):
+        publisher = MagicMock()
+
+        PublisherKeepAlive(publisher).stop()
+
+        publisher.keep_alive.assert_not_called()
@@ -0,0 +1,202 @@
+import json
+from unittest.mock import MagicMock, patch
+
+import fastavro
+import pytest
+
+from lab_share_lib.rabbit.avro_encoder import AvroEncoderBinaryFile, AvroEncoderBinaryMessage
+from lab_share_lib.rabbit.columnar import ColumnType, column_types, columns_from_records, records_from_columns
+from lab_share_lib.rabbit.parsed_schema_cache import PARSED_SCHEMA_CACHE
+from lab_share_lib.rabbit.resolution_plan import RESOLUTION_PLAN_CACHE
+from lab_share_lib.rabbit.schema_registry import RESPONSE_KEY_SCHEMA, RESPONSE_KEY_VERSION
+
+np = pytest.importorskip("numpy")
+
+SCHEMA: dict = {
+    "type": "record",
+    "name": "sample",
+    "fields": [
+        {"name": "name", "type": "string"},
+        {"name": "wells", "type": "int"},
+        {"name": "volume", "type": ["null", "double"], "default": None},
+        {"name": "picked", "type": "boolean"},
+        {"name": "tags", "type": {"type": "array", "items": "string"}},
+        {"name": "comment", "type": ["null", "string"], "default": None},
+    ],
+}
+PARSED_SCHEMA = fastavro.parse_schema(SCHEMA)
+RECORDS = [
+    {"name": "first", "wells": 1, "volume": 1.5, "picked": True, "tags": ["a"], "comment": None},
+    {"name": "second", "wells": 2, "volume": None, "picked": False, "tags": [], "comment": "spilt"},
+    {"name": "third", "wells": 3, "volume": 3.5, "picked": True, "tags": ["b", "c"], "comment": None},
+]
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    PARSED_SCHEMA_CACHE.clear()
+    RESOLUTION_PLAN_CACHE.clear()
+    yield
+    PARSED_SCHEMA_CACHE.clear()
+    RESOLUTION_PLAN_CACHE.clear()
+
+
+@pytest.fixture
+def schema_registry():
+    schema_registry = MagicMock()
+    schema_registry.get_schema.return_value = {RESPONSE_KEY_SCHEMA: json.dumps(SCHEMA), RESPONSE_KEY_VERSION: 3}
+
+    return schema_registry
+
+
+@pytest.fixture
+def columns():
+    return {
+        "name": np.array(["first", "second", "third"], dtype=object),
+        "wells": np.array([1, 2, 3], dtype="int32"),
+        "volume": np.ma.MaskedArray([1.5, 0.0, 3.5], mask=[False, True, False]),
+        "picked": np.array([True, False, True]),
+        "tags": [["a"], [], ["b", "c"]],
+        "comment": [None, "spilt", None],
+    }
+
+
+def assert_columns_match_records(columns, records):
+    assert list(columns) == [field["name"] for field in SCHEMA["fields"]]
+    for name, column in columns.items():
+        assert len(column) == len(records)
+        for index, record in enumerate(records):
+            if record[name] is None:
+                assert column.mask[index]
+            else:
+                assert column[index] == record[name]
+
+
+def test_column_types_maps_fields_to_numpy_types():
+    assert column_types(PARSED_SCHEMA) == {
+        "name": ColumnType(object, False),
+        "wells": ColumnType(np.dtype("int32"), False),
+        "volume": ColumnType(np.dtype("float64"), True),
+        "picked": ColumnType(np.dtype("bool"), False),
+        "tags": ColumnType(object, False),
+        "comment": ColumnType(object, True),
+    }
+
+
+def test_column_types_uses_objects_for_unions_of_several_types():
+    schema = fastavro.parse_schema(
+        {"type": "record", "name": "r", "fields": [{"name": "value", "type": ["null", "int", "string"]}]}
+    )
+
+    assert column_types(schema) == {"value": ColumnType(object, True)}
+
+
+def test_column_types_rejects_schemas_that_are_not_records():
+    with pytest.raises(ValueError, match="only possible for record schemas"):
+        column_types(fastavro.parse_schema("string"))
+
+
+def test_column_types_raises_an_import_error_without_numpy():
+    with patch("lab_share_lib.rabbit.columnar.np", None):
+        with pytest.raises(ImportError, match="NumPy is required"):
+            column_types(PARSED_SCHEMA)
+
+
+def test_columns_from_records_builds_typed_and_masked_arrays():
+    columns = columns_from_records(iter(RECORDS), PARSED_SCHEMA)
+
+    assert_columns_match_records(columns, RECORDS)
+    assert columns["wells"].dtype == np.dtype("int32")
+    assert columns["picked"].dtype == np.dtype("bool")
+    assert columns["name"].dtype == np.dtype(object)
+    assert isinstance(columns["volume"], np.ma.MaskedArray)
+    assert columns["volume"].dtype == np.dtype("float64")
+    assert columns["tags"].shape == (3,)
+    assert columns["tags"][2] == ["b", "c"]
+
+
+def test_columns_from_records_masks_nullable_columns_without_nulls():
+    columns = columns_from_records([RECORDS[0], RECORDS[2]], PARSED_SCHEMA)
+
+    assert isinstance(columns["volume"], np.ma.MaskedArray)
+    assert not columns["volume"].mask.any()
+
+
+def test_columns_from_records_returns_empty_columns_for_no_records():
+    columns = columns_from_records([], PARSED_SCHEMA)
+
+    assert list(columns) == [field["name"] for field in SCHEMA["fields"]]
+    assert all(len(column) == 0 for column in columns.values())
+
+
+def test_records_from_columns_writes_masked_values_as_none(columns):
+    records = [dict(record) for record in records_from_columns(columns)]
+
+    assert records == RECORDS
+
+
+def test_records_from_columns_reuses_one_dict(columns):
+    records = list(records_from_columns(columns))
+
+    assert all(record is records[0] for record in records)
+
+
+def test_records_from_columns_rejects_columns_of_different_lengths():
+    with pytest.raises(ValueError, match="same number of values"):
+        list(records_from_columns({"name": ["first"], "wells": [1, 2]}))
+
+
+class TestAvroEncoderBinaryFileColumns:
+    @pytest.fixture
+    def subject(self, schema_registry):
+        return AvroEncoderBinaryFile(schema_registry, "sample")
+
+    def test_encode_columns_encodes_the_same_message_as_encode(self, subject, columns):
+        message = subject.encode_columns(columns, "3")
+
+        assert list(subject.decode(message.body, "3", message.version)) == RECORDS
+        assert message.version == "3"
+
+    def test_encode_columns_writes_defaults_for_missing_columns(self, subject, columns):
+        del columns["comment"]
+
+        message = subject.encode_columns(columns, "3")
+
+        assert [record["comment"] for record in subject.decode(message.body, "3", message.version)] == [None] * 3
+
+    def test_decode_columns_decodes_records_into_columns(self, subject):
+        message = subject.encode(RECORDS, "3")
+
+        columns = subject.decode_columns(message.body, "3")
+
+        assert_columns_match_records(columns, RECORDS)
+
+    def test_encode_columns_and_decode_columns_work_together(self, subject, columns):
+        message = subject.encode_columns(columns, "3")
+
+        assert_columns_match_records(subject.decode_columns(message.body, "3"), RECORDS)
+
+
+class TestAvroEncoderBinaryMessageColumns:
+    @pytest.fixture
+    def subject(self, schema_registry):
+        return AvroEncoderBinaryMessage(schema_registry, "sample")
+
+    def test_encode_columns_encodes_each_record_as_a_message(self, subject, columns):
+        messages = subject.encode_columns(columns, "3")
+
+        assert [encoded.body for encoded in messages] == [
+            subject.encode_single_object(record, "3").body for record in RECORDS
+        ]
+
+    def test_decode_columns_decodes_each_message_into_columns(self, subject):
+        messages = subject.encode_many(RECORDS, "3")
+
+        columns = subject.decode_columns((encoded.body for encoded in messages), "3", "3")
+
+        assert_columns_match_records(columns, RECORDS)
+
+    def test_encode_columns_and_decode_columns_work_together(self, subject, columns):
+        messages = subject.encode_columns(columns, "3")
+
+        assert_columns_match_records(subject.decode_columns([m.body for m in messages], "3", "3"), RECORDS)
@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+from lab_share_lib.rabbit.avro_encoder import AvroEncoderBinaryMessage
+from lab_share_lib.rabbit.file_schema_registry import FileSchemaRegistry
+from lab_share_lib.rabbit.parsed_schema_cache import PARSED_SCHEMA_CACHE
+from lab_share_lib.rabbit.resolution_plan import RESOLUTION_PLAN_CACHE
+from lab_share_lib.rabbit.schema_registry import SchemaRegistry, SchemaRegistryBase
+
+SUBJECT = "create-plate-map"
+SCHEMA_V1 = {"type": "record", "name": "sample", "fields": [{"name": "name", "type": "string"}]}
+SCHEMA_V2 = {
+    "type": "record",
+    "name": "sample",
+    "fields": [{"name": "name", "type": "string"}, {"name": "volume", "type": "int", "default": 10}],
+}
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    PARSED_SCHEMA_CACHE.clear()
+    RESOLUTION_PLAN_CACHE.clear()
+    yield
+    PARSED_SCHEMA_CACHE.clear()
+    RESOLUTION_PLAN_CACHE.clear()
+
+
+@pytest.fixture
+def schema_dir(tmp_path):
+    subject_dir = tmp_path / SUBJECT
+    subject_dir.mkdir()
+    (subject_dir / "1.avsc").write_text(json.dumps(SCHEMA_V1))
+    (subject_dir / "2.avsc").write_text(json.dumps(SCHEMA_V2))
+    (subject_dir / "10.avsc").write_text(json.dumps(SCHEMA_V2))
+    (subject_dir / "README.md").write_text("Not a schema")
+    (subject_dir / "draft.avsc").write_text("Not a version")
+    (tmp_path / "notes.txt").write_text("Not a subject")
+
+    return tmp_path
+
+
+@pytest.fixture
+def subject(schema_dir):
+    return FileSchemaRegistry(str(schema_dir))
+
+
+def test_file_schema_registry_is_a_schema_registry_without_an_http_client(subject):
+    assert isinstance(subject, SchemaRegistryBase)
+    assert not isinstance(subject, SchemaRegistry)
+
+
+def test_get_schema_returns_the_numbered_version(subject):
+    assert subject.get_schema(SUBJECT, "1") == {"subject": SUBJECT, "version": 1, "schema": json.dumps(SCHEMA_V1)}
+
+
+def test_get_schema_resolves_latest_to_the_highest_version(subject):
+    assert subject.get_schema(SUBJECT)["version"] == 10
+    assert subject.get_schema(SUBJECT, "latest")["version"] == 10
+
+
+def test_get_schema_returns_an_error_for_a_missing_subject(subject):
+    assert subject.get_schema("no-such-subject", "1")["error_code"] == 40401
+
+
+@pytest.mark.parametrize("version", ["3", "draft", "-1"])
+def test_get_schema_returns_an_error_for_a_missing_version(subject, version):
+    assert subject.get_schema(SUBJECT, version)["error_code"] == 40402
+
+
+def test_get_schema_by_id_returns_an_error(subject):
+    assert subject.get_schema_by_id(1)["error_code"] == 40403
+
+
+def test_get_schema_reads_schemas_into_memory(subject, schema_dir):
+    (schema_dir / SUBJECT / "1.avsc").unlink()
+
+    assert subject.get_schema(SUBJECT, "1")["schema"] == json.dumps(SCHEMA_V1)
+
+
+def test_get_schema_works_with_encoders(subject):
+    encoder = AvroEncoderBinaryMessage(subject, SUBJECT)
+
+    encoded = encoder.encode_single_object({"name": "sample 1"}, "1")
+
+    assert encoder.decode(encoded.body, "latest", encoded.version) == [{"name": "sample 1", "volume": 10}]
+
+
+def test_constructor_raises_for_a_missing_directory(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        FileSchemaRegistry(str(tmp_path / "missing"))
@@ -0,0 +1,127 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+from pika.frame import Method
+from pika.spec import Connection
+
+from lab_share_lib.exceptions import ConnectionBlockedError, TransientRabbitError
+from lab_share_lib.rabbit.basic_publisher import OutgoingMessage
+from lab_share_lib.rabbit.flow_control import FlowControl, FlowControlStats
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def logger():
+    with patch("lab_share_lib.rabbit.flow_control.LOGGER") as logger:
+        yield logger
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def subject(clock):
+    return FlowControl(2, clock=clock)
+
+
+def blocked_frame(reason="low on memory"):
+    return Method(0, Connection.Blocked(reason=reason))
+
+
+def message(index=0):
+    return OutgoingMessage("exchange", "routing_key", f"body {index}".encode(), "subject", "1")
+
+
+def test_new_flow_control_is_not_blocked(subject):
+    assert not subject.is_blocked
+    assert subject.stats == FlowControlStats(
+        blocked=False, times_blocked=0, blocked_seconds=0.0, buffered=0, buffer_size=2, rejected=0
+    )
+
+
+def test_on_blocked_blocks_and_logs_the_reason(subject, logger):
+    subject.on_blocked(MagicMock(), blocked_frame("low on disk"))
+
+    assert subject.is_blocked
+    assert "low on disk" in logger.warning.call_args.args[0]
+
+
+def test_on_unblocked_unblocks(subject, logger):
+    subject.on_blocked(MagicMock(), blocked_frame())
+    subject.on_unblocked(MagicMock(), Method(0, Connection.Unblocked()))
+
+    assert not subject.is_blocked
+    logger.info.assert_called_once()
+
+
+def test_on_unblocked_when_not_blocked_does_nothing(subject, logger):
+    subject.on_unblocked()
+
+    assert not subject.is_blocked
+    logger.info.assert_not_called()
+
+
+def test_stats_count_the_time_spent_blocked(subject, clock):
+    subject.on_blocked(MagicMock(), blocked_frame())
+    clock.now += 5
+    subject.on_blocked(MagicMock(), blocked_frame())  # Repeated notifications don't restart the clock.
+    clock.now += 5
+    assert subject.stats.blocked_seconds == 10.0
+
+    subject.on_unblocked()
+    clock.now += 100
+    subject.on_blocked(MagicMock(), blocked_frame())
+    clock.now += 2
+
+    stats = subject.stats
+    assert stats.blocked
+    assert stats.times_blocked == 2
+    assert stats.blocked_seconds == 12.0
+
+
+def test_buffer_holds_messages_until_they_are_released(subject):
+    subject.buffer(message(0))
+    subject.buffer(message(1))
+
+    assert subject.buffered == 2
+    assert subject.release() == [message(0), message(1)]
+    assert subject.buffered == 0
+    assert subject.release() == []
+
+
+def test_buffer_raises_when_the_buffer_is_full(subject):
+    subject.buffer(message(0))
+    subject.buffer(message(1))
+
+    with pytest.raises(ConnectionBlockedError) as exc_info:
+        subject.buffer(message(2))
+
+    assert isinstance(exc_info.value, TransientRabbitError)
+    assert subject.stats.rejected == 1
+    assert subject.stats.buffered == 2
+
+
+def test_buffer_with_no_buffer_always_raises(clock):
+    subject = FlowControl(0, clock=clock)
+
+    with pytest.raises(ConnectionBlockedError):
+        subject.buffer(message())
+
+    assert subject.stats.rejected == 1
+
+
+def test_reject_raises_and_counts_the_rejection(subject):
+    with pytest.raises(ConnectionBlockedError, match="no buffer"):
+        subject.reject("there is no buffer")
+
+    assert subject.stats.rejected == 1
+    assert subject.stats.buffered == 0
@@ -0,0 +1,166 @@
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from lab_share_lib.exceptions import TransientRabbitError
+from lab_share_lib.rabbit.hedged_fetcher import HedgedFetcher, _percentile
+from lab_share_lib.rabbit.schema_cache import FetchResult
+
+FAST = "http://fast-registry"
+SLOW = "http://slow-registry"
+DOWN = "http://down-registry"
+PATH = "subjects/create-plate-map/versions/7"
+HEDGE_DELAY = 0.05
+
+
+class Registries:
+    """Stands in for the session, answering each base URI after its delay or failing for DOWN."""
+
+    def __init__(self, delays):
+        self.delays = delays
+        self.requested = []
+
+    def fetch_json(self, url, verify):
+        base_uri = url[: -len(PATH) - 1]
+        self.requested.append(base_uri)
+
+        if base_uri == DOWN:
+            raise TransientRabbitError(f"Unable to connect to schema registry at {url}")
+
+        time.sleep(self.delays.get(base_uri, 0))
+
+        return FetchResult({"from": base_uri}, ok=True)
+
+
+@pytest.fixture
+def registries():
+    return Registries({FAST: 0, SLOW: 1.0})
+
+
+def make_subject(base_uris, registries, **kwargs):
+    session = MagicMock()
+    session.fetch_json.side_effect = registries.fetch_json
+
+    return HedgedFetcher(base_uris, session, hedge_delay=HEDGE_DELAY, **kwargs)
+
+
+@pytest.mark.parametrize(
+    "samples, percentile, expected",
+    [
+        ([3.0, 1.0, 2.0, 4.0], 50, 2.0),
+        ([3.0, 1.0, 2.0, 4.0], 95, 4.0),
+        ([3.0, 1.0, 2.0, 4.0], 100, 4.0),
+        ([5.0], 1, 5.0),
+    ],
+)
+def test_percentile_uses_the_nearest_rank(samples, percentile, expected):
+    assert _percentile(samples, percentile) == expected
+
+
+def test_constructor_needs_several_base_uris(registries):
+    with pytest.raises(ValueError, match="at least two base URIs"):
+        make_subject([FAST], registries)
+
+
+@pytest.mark.parametrize("hedge_percentile", [0, 101])
+def test_constructor_rejects_invalid_percentiles(registries, hedge_percentile):
+    with pytest.raises(ValueError, match="hedge_percentile"):
+        make_subject([FAST, SLOW], registries, hedge_percentile=hedge_percentile)
+
+
+def test_fetch_json_uses_the_first_endpoint_when_it_answers_in_time(registries):
+    subject = make_subject([FAST, SLOW], registries)
+
+    assert subject.fetch_json(PATH, True) == FetchResult({"from": FAST}, ok=True)
+    assert registries.requested == [FAST]
+
+
+def test_fetch_json_hedges_on_the_next_endpoint_when_the_first_is_slow(registries):
+    subject = make_subject([SLOW, FAST], registries)
+
+    started_at = time.monotonic()
+    result = subject.fetch_json(PATH, True)
+
+    assert result == FetchResult({"from": FAST}, ok=True)
+    assert registries.requested == [SLOW, FAST]
+    assert time.monotonic() - started_at < 0.5  # Didn't wait for the slow endpoint
+
+
+def test_fetch_json_fails_over_straight_away_when_an_endpoint_fails(registries):
+    subject = make_subject([DOWN, FAST], registries)
+
+    assert subject.fetch_json(PATH, True) == FetchResult({"from": FAST}, ok=True)
+    assert registries.requested == [DOWN, FAST]
+
+
+def test_fetch_json_waits_for_a_slow_endpoint_when_the_others_fail(registries):
+    registries.delays[SLOW] = 0.1
+    subject = make_subject([SLOW, DOWN], registries)
+
+    assert subject.fetch_json(PATH, True) == FetchResult({"from": SLOW}, ok=True)
+
+
+def test_fetch_json_raises_when_every_endpoint_fails(registries):
+    subject = make_subject([DOWN, DOWN], registries)
+
+    with pytest.raises(TransientRabbitError):
+        subject.fetch_json(PATH, True)
+
+
+def test_fetch_json_avoids_failed_endpoints_for_the_cooldown(registries):
+    subject = make_subject([DOWN, FAST], registries, failure_cooldown=60)
+    subject.fetch_json(PATH, True)
+    registries.requested.clear()
+
+    subject.fetch_json(PATH, True)
+
+    assert registries.requested == [FAST]
+    assert [stats.healthy for stats in subject.stats] == [False, True]
+
+
+def test_fetch_json_prefers_the_fastest_endpoint(registries):
+    registries.delays[SLOW] = 0.02
+    subject = make_subject([SLOW, FAST], registries)
+    subject.fetch_json(PATH, True)  # Hedging isn't needed, so only SLOW has a latency
+    registries.requested.clear()
+
+    # Let FAST record a latency by making SLOW miss the hedge delay once.
+    registries.delays[SLOW] = 0.2
+    subject.fetch_json(PATH, True)
+    registries.requested.clear()
+
+    assert subject.fetch_json(PATH, True) == FetchResult({"from": FAST}, ok=True)
+    assert registries.requested[0] == FAST
+
+
+def test_fetch_json_hedges_after_the_percentile_of_recent_latencies(registries):
+    clock_values = iter(range(1000))
+    subject = make_subject([FAST, SLOW], registries, clock=lambda: float(next(clock_values)))
+
+    for _ in range(10):
+        subject.fetch_json(PATH, True)
+
+    assert subject.stats[0].hedge_delay == 1.0
+    assert subject.stats[1].hedge_delay == HEDGE_DELAY  # Not enough latencies seen yet
+
+
+def test_stats_count_requests_and_failures(registries):
+    subject = make_subject([DOWN, FAST], registries)
+
+    subject.fetch_json(PATH, True)
+
+    down_stats, fast_stats = subject.stats
+    assert (down_stats.base_uri, down_stats.requests, down_stats.failures) == (DOWN, 1, 1)
+    assert (fast_stats.base_uri, fast_stats.requests, fast_stats.failures) == (FAST, 1, 0)
+    assert down_stats.median_latency is None
+    assert fast_stats.median_latency is not None
+
+
+def test_close_shuts_down_the_executor(registries):
+    subject = make_subject([FAST, SLOW], registries)
+
+    subject.close()
+
+    with pytest.raises(RuntimeError):
+        subject.fetch_json(PATH, True)
@@ -0,0 +1,154 @@
+from functools import partial
+from threading import Thread
+from unittest.mock import Mock
+
+import pytest
+
+from lab_share_lib.rabbit.parsed_schema_cache import CacheStats, FingerprintedSchema, ParsedSchemaCache
+
+
+@pytest.fixture
+def subject():
+    return ParsedSchemaCache(max_size=2)
+
+
+def test_constructor_rejects_a_max_size_below_one():
+    with pytest.raises(ValueError):
+        ParsedSchemaCache(max_size=0)
+
+
+def test_get_parses_and_returns_the_schema_on_a_miss(subject):
+    parse = Mock(return_value="parsed")
+
+    assert subject.get("subject", "1", parse) == "parsed"
+    parse.assert_called_once_with()
+
+
+def test_get_returns_the_cached_schema_on_a_hit(subject):
+    subject.get("subject", "1", Mock(return_value="parsed"))
+    parse = Mock(return_value="other")
+
+    assert subject.get("subject", "1", parse) == "parsed"
+    parse.assert_not_called()
+
+
+def test_get_caches_each_subject_and_version_separately(subject):
+    subject.get("subject", "1", Mock(return_value="subject 1"))
+
+    assert subject.get("subject", "2", Mock(return_value="subject 2")) == "subject 2"
+    assert subject.get("other", "1", Mock(return_value="other 1")) == "other 1"
+
+
+def test_get_evicts_the_least_recently_used_schema(subject):
+    subject.get("subject", "1", Mock(return_value="1"))
+    subject.get("subject", "2", Mock(return_value="2"))
+    subject.get("subject", "1", Mock())  # Makes version 2 the least recently used
+    subject.get("subject", "3", Mock(return_value="3"))
+
+    assert subject.get("subject", "1", Mock(return_value="new 1")) == "1"
+    assert subject.get("subject", "2", Mock(return_value="new 2")) == "new 2"
+
+
+def test_stats_counts_hits_and_misses(subject):
+    subject.get("subject", "1", Mock())
+    subject.get("subject", "1", Mock())
+    subject.get("subject", "2", Mock())
+
+    assert subject.stats == CacheStats(hits=1, misses=2, size=2, max_size=2)
+
+
+def test_clear_empties_the_cache_and_resets_stats(subject):
+    subject.get("subject", "1", Mock())
+    subject.clear()
+
+    assert subject.stats == CacheStats(hits=0, misses=0, size=0, max_size=2)
+
+
+def test_get_is_safe_to_call_from_many_threads():
+    subject = ParsedSchemaCache(max_size=10)
+
+    def worker():
+        for version in range(20):
+            assert subject.get("subject", str(version), partial(int, version)) == version
+
+    threads = [Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = subject.stats
+    assert stats.hits + stats.misses == 8 * 20
+    assert stats.size == 10
+
+
+def test_get_fingerprinted_returns_the_schema_with_its_fingerprint(subject):
+    fingerprint = Mock(return_value=b"12345678")
+
+    result = subject.get_fingerprinted("subject", "1", Mock(return_value="parsed"), fingerprint)
+
+    assert result == FingerprintedSchema("subject", "1", "parsed", b"12345678")
+    fingerprint.assert_called_once_with("parsed")
+
+
+def test_get_fingerprinted_only_calculates_the_fingerprint_once(subject):
+    fingerprint = Mock(return_value=b"12345678")
+
+    subject.get_fingerprinted("subject", "1", Mock(return_value="parsed"), fingerprint)
+    subject.get_fingerprinted("subject", "1", Mock(return_value="parsed"), fingerprint)
+
+    fingerprint.assert_called_once()
+
+
+def test_get_fingerprinted_reuses_a_schema_parsed_by_get(subject):
+    subject.get("subject", "1", Mock(return_value="parsed"))
+    parse = Mock()
+
+    result = subject.get_fingerprinted("subject", "1", parse, Mock(return_value=b"12345678"))
+
+    assert result.schema == "parsed"
+    parse.assert_not_called()
+
+
+def test_find_fingerprinted_finds_a_schema_by_subject_and_version(subject):
+    subject.get_fingerprinted("subject", "1", Mock(return_value="parsed"), Mock(return_value=b"12345678"))
+
+    assert subject.find_fingerprinted("subject", "1") == FingerprintedSchema("subject", "1", "parsed", b"12345678")
+    assert subject.find_fingerprinted("subject", "2") is None
+
+
+def test_find_fingerprinted_returns_none_for_a_schema_without_a_fingerprint(subject):
+    subject.get("subject", "1", Mock(return_value="parsed"))
+
+    assert subject.find_fingerprinted("subject", "1") is None
+
+
+def test_find_by_fingerprint_finds_a_fingerprinted_schema(subject):
+    subject.get_fingerprinted("subject", "1", Mock(return_value="parsed"), Mock(return_value=b"12345678"))
+
+    assert subject.find_by_fingerprint(b"12345678") == FingerprintedSchema("subject", "1", "parsed", b"12345678")
+
+
+def test_find_by_fingerprint_returns_none_for_an_unknown_fingerprint(subject):
+    subject.get("subject", "1", Mock(return_value="parsed"))
+
+    assert subject.find_by_fingerprint(b"12345678") is None
+
+
+def test_find_by_fingerprint_forgets_evicted_schemas(subject):
+    subject.get_fingerprinted("subject", "1", Mock(return_value="1"), Mock(return_value=b"fp000001"))
+    subject.get("subject", "2", Mock(return_value="2"))
+    subject.get("subject", "3", Mock(return_value="3"))
+
+    assert subject.find_by_fingerprint(b"fp000001") is None
+
+
+def test_find_by_fingerprint_keeps_a_shared_fingerprint_when_the_other_schema_is_evicted(subject):
+    subject.get_fingerprinted("subject", "1", Mock(return_value="1"), Mock(return_value=b"same0000"))
+    subject.get_fingerprinted("subject", "2", Mock(return_value="2"), Mock(return_value=b"same0000"))
+    subject.get("subject", "3", Mock(return_value="3"))  # Evicts version 1
+
+    result = subject.find_by_fingerprint(b"same0000")
+
+    assert result is not None
+    assert result.version == "2"
@@ -0,0 +1,209 @@
+import os
+from threading import Event
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from lab_share_lib.config.rabbit_server_details import RabbitServerDetails
+from lab_share_lib.rabbit.basic_publisher import OutgoingMessage, PublishResult
+from lab_share_lib.rabbit.publish_outbox import OutboxDrainer, PublishOutbox, get_publish_outbox
+
+DEFAULT_SERVER_DETAILS = RabbitServerDetails(
+    uses_ssl=False, host="host", port=5672, username="username", password="password", vhost="vhost"
+)
+
+
+@pytest.fixture(autouse=True)
+def logger():
+    with patch("lab_share_lib.rabbit.publish_outbox.LOGGER") as logger:
+        yield logger
+
+
+@pytest.fixture
+def outbox(tmp_path):
+    outbox = PublishOutbox(str(tmp_path / "outbox.sqlite3"))
+    yield outbox
+    outbox.close()
+
+
+@pytest.fixture
+def publisher():
+    publisher = MagicMock()
+    publisher.publish_batch.side_effect = lambda messages: [PublishResult(m, True, 1) for m in messages]
+    return publisher
+
+
+def message(index=0):
+    return OutgoingMessage("exchange", f"routing_key.{index}", f"body {index}".encode(), "subject", "1", "binary")
+
+
+class TestPublishOutbox:
+    def test_new_outbox_is_empty(self, outbox):
+        assert len(outbox) == 0
+        assert outbox.peek(10) == []
+        assert outbox.wait(0) is False
+
+    def test_peek_returns_messages_oldest_first(self, outbox):
+        for index in range(3):
+            outbox.append(message(index))
+
+        assert len(outbox) == 3
+        assert [entry[1] for entry in outbox.peek(2)] == [message(0), message(1)]
+        assert outbox.wait(0) is True
+
+    def test_remove_removes_only_the_given_messages(self, outbox):
+        for index in range(3):
+            outbox.append(message(index))
+        entries = outbox.peek(3)
+
+        outbox.remove([entries[0][0], entries[2][0]])
+
+        assert len(outbox) == 1
+        assert [entry[1] for entry in outbox.peek(3)] == [message(1)]
+
+    def test_remove_all_messages_empties_the_outbox(self, outbox):
+        outbox.append(message())
+
+        outbox.remove([entry[0] for entry in outbox.peek(1)])
+
+        assert len(outbox) == 0
+        assert outbox.wait(0) is False
+
+    def test_messages_survive_reopening_the_outbox(self, tmp_path, logger):
+        path = str(tmp_path / "nested" / "outbox.sqlite3")
+        outbox = PublishOutbox(path)
+        outbox.append(message(0))
+        outbox.append(message(1))
+        outbox.close()
+
+        reopened = PublishOutbox(path)
+
+        assert len(reopened) == 2
+        assert [entry[1] for entry in reopened.peek(10)] == [message(0), message(1)]
+        assert reopened.wait(0) is True
+        logger.warning.assert_called_once()
+        reopened.close()
+
+    def test_wake_wakes_a_waiting_thread_until_the_next_peek(self, outbox):
+        outbox.wake()
+
+        assert outbox.wait(0) is True
+        assert outbox.peek(10) == []
+        assert outbox.wait(0) is False
+
+    def test_start_draining_starts_one_drainer(self, outbox, publisher):
+        with patch("lab_share_lib.rabbit.publish_outbox.OutboxDrainer") as drainer:
+            drainer.return_value.is_alive.return_value = True
+            outbox.start_draining(publisher, 5)
+            outbox.start_draining(MagicMock(), 5)
+
+        drainer.assert_called_once_with(outbox, publisher, 5)
+        drainer.return_value.start.assert_called_once()
+
+
+class TestOutboxDrainer:
+    def test_drain_once_publishes_and_removes_messages_in_order(self, outbox, publisher):
+        for index in range(3):
+            outbox.append(message(index))
+
+        assert OutboxDrainer(outbox, publisher, 0).drain_once() is True
+
+        publisher.publish_batch.assert_called_once_with([message(0), message(1), message(2)])
+        assert len(outbox) == 0
+
+    def test_drain_once_publishes_up_to_the_batch_size(self, outbox, publisher):
+        for index in range(3):
+            outbox.append(message(index))
+
+        OutboxDrainer(outbox, publisher, 0, batch_size=2).drain_once()
+
+        assert [entry[1] for entry in outbox.peek(10)] == [message(2)]
+
+    def test_drain_once_keeps_messages_that_were_not_published(self, outbox, publisher):
+        outbox.append(message(0))
+        outbox.append(message(1))
+        publisher.publish_batch.side_effect = lambda messages: [
+            PublishResult(messages[0], False, 1),
+            PublishResult(messages[1], True, 1),
+        ]
+
+        assert OutboxDrainer(outbox, publisher, 0).drain_once() is False
+
+        assert [entry[1] for entry in outbox.peek(10)] == [message(0)]
+
+    def test_drain_once_keeps_messages_when_publishing_raises(self, outbox, publisher, logger):
+        outbox.append(message())
+        publisher.publish_batch.side_effect = ValueError("Boom")
+
+        assert OutboxDrainer(outbox, publisher, 0).drain_once() is False
+
+        assert len(outbox) == 1
+        logger.exception.assert_called_once()
+
+    def test_run_drains_the_outbox_until_stopped(self, outbox, publisher):
+        drained = Event()
+
+        def publish_batch(messages):
+            drained.set()
+            return [PublishResult(m, True, 1) for m in messages]
+
+        publisher.publish_batch.side_effect = publish_batch
+        drainer = OutboxDrainer(outbox, publisher, 0)
+        drainer.start()
+
+        outbox.append(message())
+        assert drained.wait(5)
+        drainer.stop(timeout=5)
+
+        assert not drainer.is_alive()
+        assert len(outbox) == 0
+        publisher.close.assert_called_once()
+
+    def test_run_waits_before_retrying_failed_messages(self, outbox, publisher):
+        outbox.append(message())
+        attempts = []
+
+        def publish_batch(messages):
+            attempts.append(messages)
+            return [PublishResult(m, len(attempts) > 1, 1) for m in messages]
+
+        publisher.publish_batch.side_effect = publish_batch
+        drainer = OutboxDrainer(outbox, publisher, 0.01)
+        drainer.start()
+
+        for _ in range(500):
+            if len(outbox) == 0:
+                break
+            Event().wait(0.01)
+        drainer.stop(timeout=5)
+
+        assert len(attempts) == 2
+        assert len(outbox) == 0
+
+    def test_idle_drainer_keeps_the_connection_alive(self, outbox, publisher):
+        kept_alive = Event()
+        publisher.keep_alive.side_effect = kept_alive.set
+
+        with patch("lab_share_lib.rabbit.publish_outbox.RABBITMQ_PUBLISH_KEEP_ALIVE_INTERVAL", 0.01):
+            drainer = OutboxDrainer(outbox, publisher, 0)
+            drainer.start()
+            assert kept_alive.wait(5)
+            drainer.stop(timeout=5)
+
+
+class TestGetPublishOutbox:
+    def test_outboxes_are_named_after_the_server(self, tmp_path):
+        outbox = get_publish_outbox(str(tmp_path), DEFAULT_SERVER_DETAILS)
+
+        assert outbox.path == os.path.join(str(tmp_path), "host_5672_vhost.sqlite3")
+        assert os.path.exists(outbox.path)
+
+    def test_publishers_to_the_same_server_share_an_outbox(self, tmp_path):
+        other_server_details = RabbitServerDetails(
+            uses_ssl=False, host="other", port=5672, username="username", password="password", vhost="vhost"
+        )
+
+        outbox = get_publish_outbox(str(tmp_path), DEFAULT_SERVER_DETAILS)
+
+        assert get_publish_outbox(str(tmp_path), DEFAULT_SERVER_DETAILS) is outbox
+        assert get_publish_outbox(str(tmp_path), other_server_details) is not outbox
@@ -1,6 +1,11 @@
+import logging
+import time
 from unittest.mock import MagicMock, call, patch
+
 import pytest
 
+from lab_share_lib.exceptions import TransientRabbitError
+
 from lab_share_lib.rabbit.rabbit_stack import RabbitStack
 
 
@@ -113,3 +118,68 @@ class TestRabbitStack:
             background_consumer_b.start.assert_not_called()
         else:
             background_consumer_b.start.assert_called_once()
+
+    def test_bring_stack_up_does_not_prewarm_by_default(self, subject, rabbit_message_processor_class):
+        subject.bring_stack_up()
+
+        rabbit_message_processor_class.return_value.prewarm.assert_not_called()
+
+    def test_bring_stack_up_prewarms_before_starting_consumers(
+        self, subject, rabbit_message_processor_class, background_consumer_a
+    ):
+        background_consumer_a.is_healthy = False
+        events = []
+
+        def prewarm(_):
+            events.append("prewarm")
+            return []
+
+        rabbit_message_processor_class.return_value.prewarm.side_effect = prewarm
+        background_consumer_a.start.side_effect = lambda: events.append("start")
+
+        subject.bring_stack_up(prewarm=True)
+
+        assert events == ["prewarm", "prewarm", "start"]
+
+    def test_bring_stack_up_only_prewarms_once(self, subject, rabbit_message_processor_class):
+        rabbit_message_processor_class.return_value.prewarm.return_value = []
+
+        subject.bring_stack_up(prewarm=True)
+        subject.bring_stack_up(prewarm=True)
+
+        assert rabbit_message_processor_class.return_value.prewarm.call_count == 2  # Once for each server
+
+    def test_prewarm_runs_the_tasks_of_every_message_processor(self, subject, rabbit_message_processor_class):
+        tasks = [MagicMock(), MagicMock()]
+        rabbit_message_processor_class.return_value.prewarm.side_effect = lambda executor: [
+            executor.submit(tasks.pop())
+        ]
+
+        subject.prewarm()
+
+        assert tasks == []
+
+    def test_prewarm_logs_and_returns_how_long_it_took(self, subject, rabbit_message_processor_class, caplog):
+        caplog.set_level(logging.INFO)
+        rabbit_message_processor_class.return_value.prewarm.side_effect = lambda executor: [
+            executor.submit(time.sleep, 0.01)
+        ]
+
+        duration = subject.prewarm()
+
+        assert duration >= 0.01
+        assert "Prewarmed RabbitStack in" in caplog.text
+        assert "(2 tasks, 0 failed)" in caplog.text
+
+    def test_prewarm_logs_failed_tasks_and_carries_on(self, subject, rabbit_message_processor_class, caplog):
+        caplog.set_level(logging.INFO)
+
+        def fail():
+            raise TransientRabbitError("Schema registry unreachable")
+
+        rabbit_message_processor_class.return_value.prewarm.side_effect = lambda executor: [executor.submit(fail)]
+
+        subject.prewarm()
+
+        assert "Schema registry unreachable" in caplog.text
+        assert "(2 tasks, 2 failed)" in caplog.text
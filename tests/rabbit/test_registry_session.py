@@ -0,0 +1,122 @@
+from unittest.mock import MagicMock, call, patch
+
+import pytest
+import responses
+from requests import ConnectionError, ReadTimeout
+
+from lab_share_lib.exceptions import TransientRabbitError
+from lab_share_lib.rabbit.registry_session import RegistrySession
+from lab_share_lib.rabbit.schema_cache import FetchResult
+
+URL = "http://schema_registry.com/subjects/test/versions/1"
+
+
+@pytest.fixture
+def sleep():
+    return MagicMock()
+
+
+@pytest.fixture
+def subject(sleep):
+    return RegistrySession(max_retries=3, backoff_base=0.1, backoff_max=0.3, sleep=sleep, jitter=lambda: 1.0)
+
+
+def test_constructor_rejects_negative_max_retries():
+    with pytest.raises(ValueError):
+        RegistrySession(max_retries=-1)
+
+
+def test_constructor_pools_connections_for_http_and_https(subject):
+    for prefix in ["http://", "https://"]:
+        adapter = subject._session.get_adapter(prefix)
+        assert adapter._pool_maxsize == 10
+        assert adapter.max_retries.total == 0
+
+
+def test_backoff_doubles_up_to_the_maximum(subject):
+    assert [subject.backoff(attempt) for attempt in range(4)] == pytest.approx([0.1, 0.2, 0.3, 0.3])
+
+
+def test_backoff_applies_jitter():
+    subject = RegistrySession(backoff_base=1.0, backoff_max=10.0, jitter=lambda: 0.25)
+
+    assert subject.backoff(2) == 1.0
+
+
+@responses.activate
+def test_fetch_json_returns_successful_responses(subject, sleep):
+    responses.add(responses.GET, URL, json={"version": 1}, status=200)
+
+    assert subject.fetch_json(URL, True) == FetchResult({"version": 1}, ok=True)
+    sleep.assert_not_called()
+
+
+@responses.activate
+def test_fetch_json_returns_client_errors_without_retrying(subject, sleep):
+    responses.add(responses.GET, URL, json={"error_code": 40402}, status=404)
+
+    assert subject.fetch_json(URL, True) == FetchResult({"error_code": 40402}, ok=False)
+    assert len(responses.calls) == 1
+    sleep.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "failure",
+    [
+        {"body": ConnectionError("Connection refused")},
+        {"body": ReadTimeout("Read timed out")},
+        {"json": {"error_code": 50001}, "status": 500},
+        {"json": {"error_code": 50301}, "status": 503},
+        {"json": {"error_code": 42901}, "status": 429},
+    ],
+)
+@responses.activate
+def test_fetch_json_retries_transient_failures_with_backoff(subject, sleep, failure):
+    responses.add(responses.GET, URL, **failure)
+    responses.add(responses.GET, URL, **failure)
+    responses.add(responses.GET, URL, json={"version": 1}, status=200)
+
+    assert subject.fetch_json(URL, True) == FetchResult({"version": 1}, ok=True)
+    assert len(responses.calls) == 3
+    assert sleep.call_args_list == [call(pytest.approx(0.1)), call(pytest.approx(0.2))]
+
+
+@responses.activate
+def test_fetch_json_raises_transient_rabbit_error_once_retries_run_out(subject, sleep):
+    responses.add(responses.GET, URL, body=ConnectionError("Connection refused"))
+
+    with pytest.raises(TransientRabbitError) as ex_info:
+        subject.fetch_json(URL, True)
+
+    assert URL in ex_info.value.message
+    assert len(responses.calls) == 4
+    assert sleep.call_count == 3
+
+
+@responses.activate
+def test_fetch_json_raises_transient_rabbit_error_for_invalid_json_without_retrying(subject, sleep):
+    responses.add(responses.GET, URL, body="<html>Not JSON</html>", status=200)
+
+    with pytest.raises(TransientRabbitError):
+        subject.fetch_json(URL, True)
+
+    assert len(responses.calls) == 1
+    sleep.assert_not_called()
+
+
+@responses.activate
+def test_fetch_json_reuses_one_session(subject):
+    responses.add(responses.GET, URL, json={"version": 1}, status=200)
+
+    with patch.object(subject._session, "get", wraps=subject._session.get) as get:
+        subject.fetch_json(URL, False)
+        subject.fetch_json(URL, False)
+
+    assert get.call_args_list == [call(URL, verify=False, timeout=(3.05, 10.0))] * 2
+
+
+def test_close_closes_the_session(subject):
+    with patch.object(subject._session, "close") as close:
+        subject.close()
+
+    close.assert_called_once()
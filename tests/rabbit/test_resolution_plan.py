@@ -0,0 +1,172 @@
+from io import BytesIO
+
+import fastavro
+import pytest
+from fastavro.read import SchemaResolutionError
+
+from lab_share_lib.rabbit.avro_encoder import AvroEncoderBinaryMessage
+from lab_share_lib.rabbit.parsed_schema_cache import CacheStats, FingerprintedSchema
+from lab_share_lib.rabbit.resolution_plan import ResolutionPlan, ResolutionPlanCache, plan_resolution
+
+BARCODE = {"name": "barcode", "type": "string"}
+WELLS = {"name": "wells", "type": "int"}
+WEIGHT = {"name": "weight", "type": ["null", "double"]}
+SAMPLE_FIELD = {
+    "name": "sample",
+    "type": {"type": "record", "name": "sample", "fields": [{"name": "name", "type": "string"}]},
+}
+WRITER_SCHEMA = {"type": "record", "name": "plate", "fields": [BARCODE, WELLS, WEIGHT, SAMPLE_FIELD]}
+DATUM = {"barcode": "PLATE-1", "wells": 96, "weight": 1.5, "sample": {"name": "sample 1"}}
+
+
+def fingerprinted(schema, version="1"):
+    parsed_schema = fastavro.parse_schema(schema)
+
+    return FingerprintedSchema("plate", version, parsed_schema, AvroEncoderBinaryMessage._fingerprint(parsed_schema))
+
+
+def with_fields(*fields, name="plate"):
+    return {"type": "record", "name": name, "fields": list(fields)}
+
+
+PLANNED_READER_SCHEMAS = [
+    WRITER_SCHEMA,
+    with_fields(BARCODE, WELLS, {**WEIGHT, "default": None}, SAMPLE_FIELD),
+    with_fields(*WRITER_SCHEMA["fields"], {"name": "volume", "type": "int", "default": 10}),
+    with_fields(
+        *WRITER_SCHEMA["fields"], {"name": "tags", "type": {"type": "array", "items": "string"}, "default": []}
+    ),
+    with_fields(BARCODE, SAMPLE_FIELD),
+    with_fields(SAMPLE_FIELD, WEIGHT, BARCODE, WELLS),
+    with_fields(WELLS, {"name": "volume", "type": ["null", "int"], "default": None}),
+]
+
+RESOLVED_READER_SCHEMAS = [
+    with_fields(BARCODE, {"name": "wells", "type": "long"}),
+    with_fields(BARCODE, {"name": "wells", "type": "long"}, name="renamed_plate"),
+    with_fields(BARCODE, {"name": "well_count", "type": "int", "aliases": ["wells"], "default": 0}),
+    with_fields(
+        BARCODE,
+        {
+            "name": "sample",
+            "type": {"type": "record", "name": "sample", "fields": [{"name": "name", "type": ["null", "string"]}]},
+        },
+    ),
+    with_fields(BARCODE, {"name": "volume", "type": "int"}),
+]
+
+
+def read(plan, encoded):
+    datum = fastavro.schemaless_reader(BytesIO(encoded), plan.writer_schema, plan.reader_schema)
+
+    return plan.complete(datum) if plan.reader_schema is None else datum
+
+
+@pytest.fixture
+def encoded():
+    bytes_writer = BytesIO()
+    fastavro.schemaless_writer(bytes_writer, fastavro.parse_schema(WRITER_SCHEMA), DATUM)
+
+    return bytes_writer.getvalue()
+
+
+@pytest.mark.parametrize("reader_schema", PLANNED_READER_SCHEMAS)
+def test_plan_resolution_reads_compatible_records_without_fastavro_resolving_them(reader_schema, encoded):
+    writer, reader = fingerprinted(WRITER_SCHEMA), fingerprinted(reader_schema, "2")
+
+    plan = plan_resolution(writer, reader)
+
+    assert plan.reader_schema is None
+    result = read(plan, encoded)
+    expected = fastavro.schemaless_reader(BytesIO(encoded), writer.schema, reader.schema)
+    assert result == expected
+    assert list(result) == list(expected)  # type: ignore
+
+
+@pytest.mark.parametrize("reader_schema", RESOLVED_READER_SCHEMAS)
+def test_plan_resolution_leaves_other_changes_to_fastavro(reader_schema, encoded):
+    writer, reader = fingerprinted(WRITER_SCHEMA), fingerprinted(reader_schema, "2")
+
+    assert plan_resolution(writer, reader) == ResolutionPlan(writer.schema, reader.schema)
+
+
+def test_plan_resolution_leaves_schema_resolution_errors_to_fastavro(encoded):
+    plan = plan_resolution(fingerprinted(WRITER_SCHEMA), fingerprinted(with_fields({"name": "volume", "type": "int"})))
+
+    with pytest.raises(SchemaResolutionError):
+        read(plan, encoded)
+
+
+def test_plan_resolution_skips_resolution_for_identical_schemas():
+    writer = fingerprinted(WRITER_SCHEMA)
+    reader = fingerprinted(WRITER_SCHEMA, "2")
+
+    assert plan_resolution(writer, reader) == ResolutionPlan(writer.schema, None)
+
+
+def test_plan_resolution_resolves_schemas_that_only_differ_in_logical_type():
+    writer = fingerprinted("long")
+    reader = fingerprinted({"type": "long", "logicalType": "timestamp-millis"}, "2")
+    assert writer.fingerprint == reader.fingerprint
+
+    assert plan_resolution(writer, reader) == ResolutionPlan(writer.schema, reader.schema)
+
+
+def test_plan_resolution_resolves_schemas_that_are_not_records():
+    writer = fingerprinted("int")
+    reader = fingerprinted("long", "2")
+
+    assert plan_resolution(writer, reader) == ResolutionPlan(writer.schema, reader.schema)
+
+
+class TestResolutionPlanCache:
+    @pytest.fixture
+    def subject(self):
+        return ResolutionPlanCache()
+
+    @pytest.fixture
+    def writer(self):
+        return fingerprinted(WRITER_SCHEMA)
+
+    @pytest.fixture
+    def readers(self):
+        return [
+            fingerprinted(reader_schema, str(version)) for version, reader_schema in enumerate(RESOLVED_READER_SCHEMAS)
+        ]
+
+    def test_constructor_rejects_a_max_size_below_one(self):
+        with pytest.raises(ValueError):
+            ResolutionPlanCache(max_size=0)
+
+    def test_get_reuses_the_plan_for_a_pair_of_schemas(self, subject, writer, readers):
+        first_plan = subject.get(writer, readers[0])
+        second_plan = subject.get(writer, readers[0])
+
+        assert second_plan is first_plan
+        assert subject.stats == CacheStats(hits=1, misses=1, size=1, max_size=256)
+
+    def test_get_keeps_a_plan_per_version_for_versions_with_the_same_fingerprint(self, subject, writer, readers):
+        first_plan = subject.get(writer, readers[0])
+        second_plan = subject.get(writer._replace(version="2", schema={**writer.schema}), readers[0])
+
+        assert second_plan is not first_plan
+        assert subject.stats.size == 2
+
+    def test_get_evicts_the_least_recently_used_plan(self, writer, readers):
+        subject = ResolutionPlanCache(max_size=2)
+        subject.get(writer, readers[0])
+        subject.get(writer, readers[1])
+        subject.get(writer, readers[0])
+        subject.get(writer, readers[2])
+
+        subject.get(writer, readers[0])
+        subject.get(writer, readers[1])
+
+        assert subject.stats == CacheStats(hits=2, misses=4, size=2, max_size=2)
+
+    def test_clear_empties_the_cache(self, subject, writer, readers):
+        subject.get(writer, readers[0])
+
+        subject.clear()
+
+        assert subject.stats == CacheStats(hits=0, misses=0, size=0, max_size=256)
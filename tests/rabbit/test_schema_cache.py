@@ -0,0 +1,257 @@
+from threading import Event, Thread
+from typing import Any, List
+from unittest.mock import MagicMock
+
+import pytest
+
+from lab_share_lib.exceptions import TransientRabbitError
+from lab_share_lib.rabbit.schema_cache import FetchResult, SchemaCache
+
+ALIAS_TTL = 60.0
+NEGATIVE_TTL = 5.0
+RESPONSE = {"schema": "a schema", "version": 7}
+NEW_RESPONSE = {"schema": "a new schema", "version": 8}
+NOT_FOUND_RESPONSE = {"error_code": 40401, "message": "Subject not found."}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def subject(clock):
+    return SchemaCache(max_size=3, alias_ttl=ALIAS_TTL, negative_ttl=NEGATIVE_TTL, clock=clock)
+
+
+@pytest.fixture
+def fetch():
+    return MagicMock(return_value=FetchResult(RESPONSE, ok=True))
+
+
+@pytest.fixture
+def refreshed():
+    refreshed = Event()
+
+    def start_refresh(self, key, fetch, immutable):
+        self._refresh(key, fetch, immutable)
+        refreshed.set()
+
+    return refreshed, start_refresh
+
+
+def test_constructor_rejects_a_max_size_below_one():
+    with pytest.raises(ValueError):
+        SchemaCache(max_size=0)
+
+
+def test_get_fetches_responses_that_are_not_cached(subject, fetch):
+    assert subject.get("key", fetch, immutable=True) == RESPONSE
+    fetch.assert_called_once()
+
+
+def test_get_keeps_immutable_responses_forever(subject, fetch, clock):
+    subject.get("key", fetch, immutable=True)
+    clock.now += 365 * 24 * 60 * 60
+
+    assert subject.get("key", fetch, immutable=True) == RESPONSE
+    fetch.assert_called_once()
+    assert subject.stats.hits == 1
+
+
+def test_get_keeps_alias_responses_until_the_alias_ttl_passes(subject, fetch, clock):
+    subject.get("key", fetch, immutable=False)
+    clock.now += ALIAS_TTL - 1
+
+    assert subject.get("key", fetch, immutable=False) == RESPONSE
+    fetch.assert_called_once()
+
+
+def test_get_returns_an_expired_alias_response_while_refreshing_it_in_the_background(subject, clock):
+    release_refresh = Event()
+    responses = iter([FetchResult(RESPONSE, ok=True), FetchResult(NEW_RESPONSE, ok=True)])
+
+    def fetch():
+        response = next(responses)
+        if response.body is NEW_RESPONSE:
+            release_refresh.wait(5)
+        return response
+
+    subject.get("key", fetch, immutable=False)
+    clock.now += ALIAS_TTL
+
+    assert subject.get("key", fetch, immutable=False) == RESPONSE  # Doesn't wait for the refresh
+    assert subject.get("key", fetch, immutable=False) == RESPONSE  # Doesn't start a second refresh
+
+    release_refresh.set()
+    for _ in range(500):
+        if subject.stats.refreshes:
+            break
+        Event().wait(0.01)
+
+    assert subject.get("key", fetch, immutable=False) == NEW_RESPONSE
+    assert subject.stats.stale_hits == 2
+    assert subject.stats.refreshes == 1
+
+
+def test_get_keeps_the_stale_response_when_a_refresh_fails(subject, clock, refreshed, monkeypatch):
+    refresh_done, start_refresh = refreshed
+    monkeypatch.setattr(SchemaCache, "_start_refresh", start_refresh)
+    fetch = MagicMock(side_effect=[FetchResult(RESPONSE, ok=True), TransientRabbitError("Registry down")])
+
+    subject.get("key", fetch, immutable=False)
+    clock.now += ALIAS_TTL
+    subject.get("key", fetch, immutable=False)
+
+    assert refresh_done.is_set()
+    assert subject.stats.refresh_failures == 1
+    clock.now += NEGATIVE_TTL - 1
+    assert subject.get("key", fetch, immutable=False) == RESPONSE
+    assert fetch.call_count == 2  # No further refresh until the negative TTL has passed
+
+
+def test_get_caches_unsuccessful_responses_for_the_negative_ttl(subject, clock):
+    fetch = MagicMock(return_value=FetchResult(NOT_FOUND_RESPONSE, ok=False))
+
+    assert subject.get("key", fetch, immutable=True) == NOT_FOUND_RESPONSE
+    assert subject.get("key", fetch, immutable=True) == NOT_FOUND_RESPONSE
+    fetch.assert_called_once()
+
+    clock.now += NEGATIVE_TTL
+    subject.get("key", fetch, immutable=True)
+
+    assert fetch.call_count == 2
+    assert subject.stats.negative_hits == 1
+
+
+def test_get_caches_errors_for_the_negative_ttl(subject, clock):
+    fetch = MagicMock(side_effect=[TransientRabbitError("Registry down"), FetchResult(RESPONSE, ok=True)])
+
+    for _ in range(2):
+        with pytest.raises(TransientRabbitError, match="Registry down"):
+            subject.get("key", fetch, immutable=True)
+
+    fetch.assert_called_once()
+
+    clock.now += NEGATIVE_TTL
+
+    assert subject.get("key", fetch, immutable=True) == RESPONSE
+    assert subject.stats.negative_hits == 1
+
+
+def test_get_evicts_the_least_recently_used_response(subject, fetch):
+    for key in ["a", "b", "c"]:
+        subject.get(key, fetch, immutable=True)
+    subject.get("a", fetch, immutable=True)
+
+    subject.get("d", fetch, immutable=True)
+    subject.get("b", fetch, immutable=True)
+
+    assert fetch.call_count == 5
+    assert subject.stats.evictions == 2
+    assert subject.stats.size == 3
+
+
+def test_clear_empties_the_cache(subject, fetch):
+    subject.get("key", fetch, immutable=True)
+
+    subject.clear()
+
+    assert subject.stats.size == 0
+    assert subject.stats.misses == 0
+
+
+class TestCoalescing:
+    THREAD_COUNT = 10
+
+    @pytest.fixture
+    def fetch_started(self):
+        return Event()
+
+    @pytest.fixture
+    def release_fetch(self):
+        return Event()
+
+    def get_concurrently(self, subject, fetch, fetch_started):
+        results: List[Any] = [None] * self.THREAD_COUNT
+
+        def get(index):
+            try:
+                results[index] = subject.get("key", fetch, immutable=True)
+            except Exception as ex:
+                results[index] = ex
+
+        leader = Thread(target=get, args=(0,))
+        leader.start()
+        assert fetch_started.wait(5)
+
+        followers = [Thread(target=get, args=(index,)) for index in range(1, self.THREAD_COUNT)]
+        for follower in followers:
+            follower.start()
+
+        return [leader, *followers], results
+
+    def wait_for_followers(self, subject):
+        for _ in range(500):
+            if subject.stats.coalesced == self.THREAD_COUNT - 1:
+                return
+            Event().wait(0.01)
+
+    def test_concurrent_misses_share_one_fetch(self, subject, fetch_started, release_fetch):
+        def fetch():
+            fetch_started.set()
+            release_fetch.wait(5)
+            return FetchResult(RESPONSE, ok=True)
+
+        mock_fetch = MagicMock(side_effect=fetch)
+        threads, results = self.get_concurrently(subject, mock_fetch, fetch_started)
+        self.wait_for_followers(subject)
+        release_fetch.set()
+        for thread in threads:
+            thread.join(5)
+
+        assert results == [RESPONSE] * self.THREAD_COUNT
+        mock_fetch.assert_called_once()
+        assert subject.stats.misses == 1
+        assert subject.stats.coalesced == self.THREAD_COUNT - 1
+
+    def test_concurrent_misses_share_the_error_of_one_fetch(self, subject, fetch_started, release_fetch):
+        def fetch():
+            fetch_started.set()
+            release_fetch.wait(5)
+            raise TransientRabbitError("Registry down")
+
+        mock_fetch = MagicMock(side_effect=fetch)
+        threads, results = self.get_concurrently(subject, mock_fetch, fetch_started)
+        self.wait_for_followers(subject)
+        release_fetch.set()
+        for thread in threads:
+            thread.join(5)
+
+        assert all(isinstance(result, TransientRabbitError) for result in results)
+        mock_fetch.assert_called_once()
+
+    def test_misses_for_different_keys_are_not_coalesced(self, subject, fetch):
+        subject.get("a", fetch, immutable=True)
+        subject.get("b", fetch, immutable=True)
+
+        assert fetch.call_count == 2
+        assert subject.stats.coalesced == 0
+
+    def test_a_miss_after_a_fetch_finishes_fetches_again_once_the_response_expires(self, subject, clock):
+        fetch = MagicMock(return_value=FetchResult(NOT_FOUND_RESPONSE, ok=False))
+
+        subject.get("key", fetch, immutable=True)
+        clock.now += NEGATIVE_TTL
+        subject.get("key", fetch, immutable=True)
+
+        assert fetch.call_count == 2
+        assert subject._in_flight == {}
@@ -1,16 +1,33 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Barrier, Thread
+from typing import List
+
 import pytest
 import responses
+from requests import ConnectionError
 
 from lab_share_lib.exceptions import TransientRabbitError
-from lab_share_lib.rabbit.schema_registry import SchemaRegistry
-from unittest.mock import patch
+from lab_share_lib.rabbit.registry_session import RegistrySession
+from lab_share_lib.rabbit.schema_cache import SCHEMA_CACHE
+from lab_share_lib.rabbit.schema_registry import SchemaRegistry, SchemaRegistryBase, is_immutable_url
+from unittest.mock import MagicMock, patch
 
 BASE_URI = "http://schema_registry.com"
 
 
+@pytest.fixture(autouse=True)
+def clear_schema_cache():
+    SCHEMA_CACHE.clear()
+    yield
+    SCHEMA_CACHE.clear()
+
+
 @pytest.fixture
 def subject():
-    subject = SchemaRegistry(BASE_URI)
+    subject = SchemaRegistry(BASE_URI, session=RegistrySession(sleep=lambda _: None))
     yield subject
 
 
@@ -18,13 +35,22 @@ def test_constructor_stores_values_correctly(subject):
     assert subject._base_uri == BASE_URI
 
 
+def test_schema_registry_is_a_schema_registry_base(subject):
+    assert isinstance(subject, SchemaRegistryBase)
+
+
+def test_schema_registry_base_cannot_be_instantiated():
+    with pytest.raises(TypeError):
+        SchemaRegistryBase()  # type: ignore[abstract]
+
+
 def test_by_default_enable_verify_certs():
     subject = SchemaRegistry(BASE_URI)
 
     with patch("lab_share_lib.rabbit.schema_registry.get_json_from_url") as get_json:
         subject.get_schema("test", "1")
 
-        get_json.assert_called_once_with(f"{BASE_URI}/subjects/test/versions/1", True)
+        get_json.assert_called_once_with(f"{BASE_URI}/subjects/test/versions/1", True, subject._session)
 
 
 def test_can_enable_verify_certs():
@@ -33,7 +59,7 @@ def test_can_enable_verify_certs():
     with patch("lab_share_lib.rabbit.schema_registry.get_json_from_url") as get_json:
         subject.get_schema("test", "1")
 
-        get_json.assert_called_once_with(f"{BASE_URI}/subjects/test/versions/1", True)
+        get_json.assert_called_once_with(f"{BASE_URI}/subjects/test/versions/1", True, subject._session)
 
 
 def test_can_disable_verify_certs():
@@ -42,7 +68,7 @@ def test_can_disable_verify_certs():
     with patch("lab_share_lib.rabbit.schema_registry.get_json_from_url") as get_json:
         subject.get_schema("test", "1")
 
-        get_json.assert_called_once_with(f"{BASE_URI}/subjects/test/versions/1", False)
+        get_json.assert_called_once_with(f"{BASE_URI}/subjects/test/versions/1", False, subject._session)
 
 
 @pytest.mark.parametrize(
@@ -132,3 +158,278 @@ def test_get_schema_raises_transient_rabbit_error_on_exception(subject):
         subject.get_schema("no-schema-here", "42")
 
     assert BASE_URI in ex_info.value.message
+
+
+@responses.activate
+def test_get_schema_refetches_latest_once_it_expires(subject):
+    url = f"{BASE_URI}/subjects/create-plate-map/versions/latest"
+    responses.add(responses.GET, url, json={"version": 7}, status=200)
+
+    assert subject.get_schema("create-plate-map") == {"version": 7}
+
+    responses.replace(responses.GET, url, json={"version": 8}, status=200)
+    with patch.object(SCHEMA_CACHE, "_clock", return_value=float("inf")):
+        with patch.object(SCHEMA_CACHE, "_start_refresh", side_effect=SCHEMA_CACHE._refresh):
+            assert subject.get_schema("create-plate-map") == {"version": 7}
+
+    assert subject.get_schema("create-plate-map") == {"version": 8}
+
+
+@responses.activate
+def test_get_schema_caches_missing_schemas_briefly(subject):
+    url = f"{BASE_URI}/subjects/create-plate-map/versions/99"
+    responses.add(responses.GET, url, json={"error_code": 40402}, status=404)
+
+    assert subject.get_schema("create-plate-map", "99") == {"error_code": 40402}
+    assert subject.get_schema("create-plate-map", "99") == {"error_code": 40402}
+
+    assert len(responses.calls) == 1
+    assert subject.cache_stats.negative_hits == 1
+
+    with patch.object(SCHEMA_CACHE, "_clock", return_value=float("inf")):
+        subject.get_schema("create-plate-map", "99")
+
+    assert len(responses.calls) == 2
+
+
+@responses.activate
+def test_get_schema_shares_the_cache_between_registries(subject):
+    url = f"{BASE_URI}/subjects/create-plate-map/versions/7"
+    responses.add(responses.GET, url, json={"version": 7}, status=200)
+
+    subject.get_schema("create-plate-map", "7")
+    SchemaRegistry(BASE_URI).get_schema("create-plate-map", "7")
+
+    assert len(responses.calls) == 1
+
+
+def test_constructor_creates_a_session_by_default():
+    assert isinstance(SchemaRegistry(BASE_URI)._session, RegistrySession)
+
+
+def test_close_closes_the_session():
+    session = MagicMock()
+    subject = SchemaRegistry(BASE_URI, session=session)
+
+    subject.close()
+
+    session.close.assert_called_once()
+
+
+@responses.activate
+def test_get_schema_retries_server_errors(subject):
+    url = f"{BASE_URI}/subjects/create-plate-map/versions/7"
+    responses.add(responses.GET, url, json={"error_code": 50001}, status=503)
+    responses.add(responses.GET, url, json={"version": 7}, status=200)
+
+    assert subject.get_schema("create-plate-map", "7") == {"version": 7}
+    assert len(responses.calls) == 2
+
+
+class TestSnapshots:
+    @pytest.fixture
+    def subject(self, tmp_path):
+        return SchemaRegistry(BASE_URI, session=RegistrySession(sleep=lambda _: None), snapshot_dir=str(tmp_path))
+
+    @pytest.fixture
+    def restarted(self, subject, tmp_path):
+        def restart():
+            SCHEMA_CACHE.clear()
+            return SchemaRegistry(
+                BASE_URI, session=RegistrySession(max_retries=0, sleep=lambda _: None), snapshot_dir=str(tmp_path)
+            )
+
+        return restart
+
+    @responses.activate
+    def test_get_schema_saves_fetched_schemas(self, subject, tmp_path):
+        url = f"{BASE_URI}/subjects/create-plate-map/versions/7"
+        responses.add(responses.GET, url, json={"version": 7}, status=200)
+
+        subject.get_schema("create-plate-map", "7")
+
+        saved = tmp_path / "subjects" / "create-plate-map" / "versions" / "7.json"
+        assert saved.read_text() == '{"version": 7}'
+
+    @responses.activate
+    def test_get_schema_loads_numbered_versions_from_the_snapshot(self, subject, restarted):
+        url = f"{BASE_URI}/subjects/create-plate-map/versions/7"
+        responses.add(responses.GET, url, json={"version": 7}, status=200)
+        subject.get_schema("create-plate-map", "7")
+
+        assert restarted().get_schema("create-plate-map", "7") == {"version": 7}
+        assert len(responses.calls) == 1
+
+    @responses.activate
+    def test_get_schema_fetches_latest_from_the_registry(self, subject, restarted):
+        url = f"{BASE_URI}/subjects/create-plate-map/versions/latest"
+        responses.add(responses.GET, url, json={"version": 7}, status=200)
+        subject.get_schema("create-plate-map")
+
+        responses.replace(responses.GET, url, json={"version": 8}, status=200)
+
+        assert restarted().get_schema("create-plate-map") == {"version": 8}
+        assert len(responses.calls) == 2
+
+    @responses.activate
+    def test_get_schema_uses_the_saved_latest_while_the_registry_is_down(self, subject, restarted, caplog):
+        url = f"{BASE_URI}/subjects/create-plate-map/versions/latest"
+        responses.add(responses.GET, url, json={"version": 7}, status=200)
+        subject.get_schema("create-plate-map")
+
+        responses.replace(responses.GET, url, body=ConnectionError("Connection refused"))
+
+        assert restarted().get_schema("create-plate-map") == {"version": 7}
+        assert "can't be reached" in caplog.text
+
+    @responses.activate
+    def test_get_schema_raises_when_the_registry_is_down_and_nothing_was_saved(self, restarted):
+        responses.add(
+            responses.GET,
+            f"{BASE_URI}/subjects/create-plate-map/versions/latest",
+            body=ConnectionError("Connection refused"),
+        )
+
+        with pytest.raises(TransientRabbitError):
+            restarted().get_schema("create-plate-map")
+
+    @responses.activate
+    def test_get_schema_does_not_save_unsuccessful_responses(self, subject, tmp_path):
+        url = f"{BASE_URI}/subjects/create-plate-map/versions/99"
+        responses.add(responses.GET, url, json={"error_code": 40402}, status=404)
+
+        assert subject.get_schema("create-plate-map", "99") == {"error_code": 40402}
+        assert not (tmp_path / "subjects").exists()
+
+
+@responses.activate
+def test_get_schema_by_id_gets_the_schema_from_the_ids_endpoint(subject):
+    url = f"{BASE_URI}/schemas/ids/42"
+    responses.add(responses.GET, url, json={"schema": "Some schema"}, status=200)
+
+    assert subject.get_schema_by_id(42) == {"schema": "Some schema"}
+    assert responses.calls[0].request.url == url
+
+
+@responses.activate
+def test_get_schema_by_id_caches_responses_forever(subject):
+    responses.add(responses.GET, f"{BASE_URI}/schemas/ids/42", json={"schema": "Some schema"}, status=200)
+    subject.get_schema_by_id(42)
+
+    with patch.object(SCHEMA_CACHE, "_clock", return_value=float("inf")):
+        assert subject.get_schema_by_id(42) == {"schema": "Some schema"}
+
+    assert len(responses.calls) == 1
+
+
+@pytest.mark.parametrize(
+    "url, expected",
+    [
+        (f"{BASE_URI}/subjects/test/versions/7", True),
+        (f"{BASE_URI}/subjects/test/versions/latest", False),
+        (f"{BASE_URI}/schemas/ids/42", True),
+        (f"{BASE_URI}/schemas/ids/42/versions", False),
+    ],
+)
+def test_is_immutable_url(url, expected):
+    assert is_immutable_url(url) is expected
+
+
+class TestConcurrentRequests:
+    THREAD_COUNT = 20
+    RESPONSE_DELAY = 0.2
+
+    @pytest.fixture
+    def registry_server(self):
+        requested_paths: List[str] = []
+        delay = self.RESPONSE_DELAY
+
+        class SlowRegistryHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                requested_paths.append(self.path)
+                time.sleep(delay)
+                body = json.dumps({"schema": "Some schema", "version": 7}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), SlowRegistryHandler)
+        server_thread = Thread(target=server.serve_forever, daemon=True)
+        server_thread.start()
+
+        yield f"http://127.0.0.1:{server.server_address[1]}", requested_paths
+
+        server.shutdown()
+        server.server_close()
+
+    @pytest.mark.parametrize("version", ["7", "latest"])
+    def test_concurrent_misses_make_one_request(self, registry_server, version):
+        base_uri, requested_paths = registry_server
+        # Each consumer thread has its own processor and so its own registry.
+        registries = [SchemaRegistry(base_uri) for _ in range(self.THREAD_COUNT)]
+        barrier = Barrier(self.THREAD_COUNT)
+
+        def get_schema(registry):
+            barrier.wait(5)
+            return registry.get_schema("create-plate-map", version)
+
+        with ThreadPoolExecutor(max_workers=self.THREAD_COUNT) as executor:
+            results = list(executor.map(get_schema, registries))
+
+        assert results == [{"schema": "Some schema", "version": 7}] * self.THREAD_COUNT
+        assert requested_paths == [f"/subjects/create-plate-map/versions/{version}"]
+        assert SCHEMA_CACHE.stats.misses == 1
+        assert SCHEMA_CACHE.stats.coalesced == self.THREAD_COUNT - 1
+
+
+class TestSeveralBaseUris:
+    OTHER_BASE_URI = "http://other_schema_registry.com"
+
+    @pytest.fixture
+    def subject(self):
+        return SchemaRegistry([BASE_URI, self.OTHER_BASE_URI], session=RegistrySession(max_retries=0))
+
+    def test_constructor_keeps_the_first_base_uri(self, subject):
+        assert subject._base_uri == BASE_URI
+
+    def test_constructor_rejects_no_base_uris(self):
+        with pytest.raises(ValueError, match="at least one base URI"):
+            SchemaRegistry([])
+
+    def test_endpoint_stats_is_empty_for_a_single_base_uri(self):
+        assert SchemaRegistry(BASE_URI).endpoint_stats == []
+
+    @responses.activate
+    def test_get_schema_gets_the_schema_from_the_first_base_uri(self, subject):
+        responses.add(responses.GET, f"{BASE_URI}/subjects/test/versions/7", json={"version": 7}, status=200)
+
+        assert subject.get_schema("test", "7") == {"version": 7}
+        assert [stats.requests for stats in subject.endpoint_stats] == [1, 0]
+
+    @responses.activate
+    def test_get_schema_fails_over_to_the_next_base_uri(self, subject):
+        responses.add(responses.GET, f"{BASE_URI}/subjects/test/versions/7", body=ConnectionError("Refused"))
+        responses.add(responses.GET, f"{self.OTHER_BASE_URI}/subjects/test/versions/7", json={"version": 7}, status=200)
+
+        assert subject.get_schema("test", "7") == {"version": 7}
+        assert [stats.healthy for stats in subject.endpoint_stats] == [False, True]
+
+    @responses.activate
+    def test_get_schema_caches_responses_under_the_first_base_uri(self, subject):
+        responses.add(responses.GET, f"{BASE_URI}/subjects/test/versions/7", body=ConnectionError("Refused"))
+        responses.add(responses.GET, f"{self.OTHER_BASE_URI}/subjects/test/versions/7", json={"version": 7}, status=200)
+        subject.get_schema("test", "7")
+
+        assert SchemaRegistry(BASE_URI).get_schema("test", "7") == {"version": 7}
+        assert len(responses.calls) == 2
+
+    def test_close_closes_the_hedged_fetcher(self, subject):
+        with patch.object(subject._hedged_fetcher, "close") as close:
+            subject.close()
+
+        close.assert_called_once()
@@ -0,0 +1,93 @@
+import json
+import os
+from unittest.mock import patch
+
+import pytest
+
+from lab_share_lib.rabbit.schema_snapshot import SchemaSnapshot
+
+PATH = "subjects/create-plate-map/versions/7"
+RESPONSE = {"schema": "a schema", "version": 7}
+
+
+@pytest.fixture
+def subject(tmp_path):
+    return SchemaSnapshot(str(tmp_path))
+
+
+def test_file_path_mirrors_the_registry_path(subject, tmp_path):
+    assert subject.file_path(PATH) == os.path.join(tmp_path, "subjects", "create-plate-map", "versions", "7.json")
+
+
+def test_file_path_keeps_files_inside_the_directory(subject, tmp_path):
+    file_path = subject.file_path("subjects/../../etc/versions/1")
+
+    assert os.path.realpath(file_path).startswith(os.path.realpath(tmp_path))
+    assert file_path == os.path.join(tmp_path, "subjects", "%2E%2E", "%2E%2E", "etc", "versions", "1.json")
+
+
+def test_file_path_quotes_characters_that_are_not_safe_in_file_names(subject, tmp_path):
+    assert subject.file_path("subjects/a b:c/versions/1") == os.path.join(
+        tmp_path, "subjects", "a%20b%3Ac", "versions", "1.json"
+    )
+
+
+def test_load_returns_none_for_responses_that_were_not_saved(subject):
+    assert subject.load(PATH) is None
+
+
+def test_save_and_load_round_trip(subject):
+    subject.save(PATH, RESPONSE)
+
+    assert subject.load(PATH) == RESPONSE
+
+
+def test_save_replaces_a_saved_response(subject):
+    subject.save(PATH, RESPONSE)
+    subject.save(PATH, {"version": 8})
+
+    assert subject.load(PATH) == {"version": 8}
+
+
+def test_save_leaves_no_temporary_files(subject, tmp_path):
+    subject.save(PATH, RESPONSE)
+
+    assert os.listdir(os.path.dirname(subject.file_path(PATH))) == ["7.json"]
+
+
+def test_save_keeps_the_previous_response_when_writing_fails(subject):
+    subject.save(PATH, RESPONSE)
+
+    with patch("lab_share_lib.rabbit.schema_snapshot.json.dump", side_effect=OSError("Disk full")):
+        subject.save(PATH, {"version": 8})
+
+    assert subject.load(PATH) == RESPONSE
+    assert os.listdir(os.path.dirname(subject.file_path(PATH))) == ["7.json"]
+
+
+def test_save_logs_failures_instead_of_raising(subject, tmp_path, caplog):
+    blocking_file = tmp_path / "subjects"
+    blocking_file.write_text("Not a directory")
+
+    subject.save(PATH, RESPONSE)
+
+    assert "Unable to save schema snapshot" in caplog.text
+
+
+def test_load_ignores_unreadable_files(subject, caplog):
+    file_path = subject.file_path(PATH)
+    os.makedirs(os.path.dirname(file_path))
+    with open(file_path, "w") as snapshot_file:
+        snapshot_file.write('{"schema": ')
+
+    assert subject.load(PATH) is None
+    assert "Ignoring unreadable schema snapshot" in caplog.text
+
+
+def test_load_reads_files_written_by_other_processes(subject):
+    file_path = subject.file_path(PATH)
+    os.makedirs(os.path.dirname(file_path))
+    with open(file_path, "w") as snapshot_file:
+        json.dump(RESPONSE, snapshot_file)
+
+    assert subject.load(PATH) == RESPONSE
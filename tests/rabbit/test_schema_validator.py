@@ -0,0 +1,241 @@
+import datetime
+from decimal import Decimal
+from unittest.mock import patch
+from uuid import UUID
+
+import fastavro
+import pytest
+from fastavro.validation import ValidationError, validate
+
+from lab_share_lib.rabbit.schema_validator import _PredicateCompiler, compile_validator
+
+SCHEMA = fastavro.parse_schema(
+    {
+        "type": "record",
+        "name": "plate",
+        "namespace": "lab",
+        "fields": [
+            {"name": "barcode", "type": "string"},
+            {"name": "wells", "type": "int"},
+            {"name": "weight", "type": ["null", "double"], "default": None},
+            {"name": "status", "type": {"type": "enum", "name": "status", "symbols": ["NEW", "DONE"]}},
+            {"name": "checksum", "type": {"type": "fixed", "name": "checksum", "size": 4}},
+            {"name": "tags", "type": {"type": "array", "items": "string"}, "default": []},
+            {"name": "counts", "type": {"type": "map", "values": "long"}, "default": {}},
+            {"name": "created", "type": {"type": "long", "logicalType": "timestamp-millis"}},
+            {
+                "name": "sample",
+                "type": [
+                    "null",
+                    {
+                        "type": "record",
+                        "name": "sample",
+                        "fields": [
+                            {"name": "name", "type": "string"},
+                            {"name": "parent", "type": ["null", "sample"], "default": None},
+                        ],
+                    },
+                ],
+                "default": None,
+            },
+        ],
+    }
+)
+
+VALID_PLATE = {
+    "barcode": "PLATE-1",
+    "wells": 96,
+    "weight": 1.5,
+    "status": "NEW",
+    "checksum": b"\x00\x01\x02\x03",
+    "tags": ["a", "b"],
+    "counts": {"a": 1},
+    "created": datetime.datetime(2022, 1, 1, tzinfo=datetime.timezone.utc),
+    "sample": {"name": "child", "parent": {"name": "parent", "parent": None}},
+}
+
+
+def plate(**changes):
+    return {**VALID_PLATE, **changes}
+
+
+def without(key):
+    return {field: value for field, value in VALID_PLATE.items() if field != key}
+
+
+DATA = [
+    VALID_PLATE,
+    plate(weight=None),
+    plate(weight=2),
+    plate(sample=None),
+    without("tags"),
+    without("weight"),
+    plate(created=1640995200000),
+    plate(barcode=1),
+    plate(wells=True),
+    plate(wells=1 << 31),
+    plate(wells=1.5),
+    plate(weight="heavy"),
+    plate(weight=False),
+    plate(status="LOST"),
+    plate(checksum=b"\x00"),
+    plate(tags=["a", 1]),
+    plate(tags="ab"),
+    plate(tags=("a", "b")),
+    plate(counts={1: 1}),
+    plate(counts={"a": 1.5}),
+    plate(created="yesterday"),
+    plate(sample={"name": "child", "parent": {"name": 1}}),
+    plate(sample=("lab.sample", {"name": "child"})),
+    plate(sample={"-type": "lab.sample", "name": "child"}),
+    without("barcode"),
+    "not a record",
+    None,
+]
+
+
+@pytest.mark.parametrize("datum", DATA)
+def test_compiled_validator_agrees_with_fastavro(datum):
+    fastavro_result = validate(datum, SCHEMA, raise_errors=False)
+    validator = compile_validator(SCHEMA)
+
+    if fastavro_result:
+        validator(datum)
+    else:
+        with pytest.raises(ValidationError):
+            validator(datum)
+
+
+@pytest.mark.parametrize("datum", DATA)
+def test_predicates_never_accept_data_fastavro_rejects(datum):
+    is_valid = _PredicateCompiler(SCHEMA).compile(SCHEMA)
+
+    if is_valid(datum):
+        assert validate(datum, SCHEMA, raise_errors=False)
+
+
+def test_compiled_validator_does_not_fall_back_to_fastavro_for_valid_data():
+    validator = compile_validator(SCHEMA)
+
+    with patch("lab_share_lib.rabbit.schema_validator.validate", wraps=validate) as fastavro_validate:
+        validator(VALID_PLATE)
+        validator(plate(created=1640995200000))
+
+    fastavro_validate.assert_not_called()
+
+
+LOGICAL_TYPE_SCHEMAS = {
+    "timestamp-millis": {"type": "long", "logicalType": "timestamp-millis"},
+    "timestamp-micros": {"type": "long", "logicalType": "timestamp-micros"},
+    "local-timestamp-millis": {"type": "long", "logicalType": "local-timestamp-millis"},
+    "date": {"type": "int", "logicalType": "date"},
+    "time-millis": {"type": "int", "logicalType": "time-millis"},
+    "time-micros": {"type": "long", "logicalType": "time-micros"},
+    "uuid": {"type": "string", "logicalType": "uuid"},
+    "bytes-decimal": {"type": "bytes", "logicalType": "decimal", "precision": 4, "scale": 2},
+    "fixed-decimal": {
+        "type": "fixed",
+        "name": "amount",
+        "size": 4,
+        "logicalType": "decimal",
+        "precision": 4,
+        "scale": 2,
+    },
+    "unknown": {"type": "string", "logicalType": "postcode"},
+}
+
+LOGICAL_TYPE_DATA = [
+    datetime.datetime(2022, 1, 1, tzinfo=datetime.timezone.utc),
+    datetime.datetime(2022, 1, 1),
+    datetime.date(2022, 1, 1),
+    "2022-01-01",
+    datetime.time(12, 30),
+    UUID("12345678-1234-5678-1234-567812345678"),
+    "12345678-1234-5678-1234-567812345678",
+    Decimal("12.34"),
+    Decimal("1.234"),
+    1640995200000,
+    1 << 40,
+    b"\x00\x01\x02\x03",
+    1.5,
+    None,
+]
+
+
+@pytest.mark.parametrize("schema", LOGICAL_TYPE_SCHEMAS.values(), ids=LOGICAL_TYPE_SCHEMAS.keys())
+@pytest.mark.parametrize("datum", LOGICAL_TYPE_DATA)
+def test_logical_type_predicates_never_accept_data_fastavro_rejects(schema, datum):
+    parsed_schema = fastavro.parse_schema(schema)
+    is_valid = _PredicateCompiler(parsed_schema).compile(parsed_schema)
+
+    if is_valid(datum):
+        assert validate(datum, parsed_schema, raise_errors=False)
+
+
+@pytest.mark.parametrize("schema", LOGICAL_TYPE_SCHEMAS.values(), ids=LOGICAL_TYPE_SCHEMAS.keys())
+@pytest.mark.parametrize("datum", LOGICAL_TYPE_DATA)
+def test_compiled_validator_agrees_with_fastavro_for_logical_types(schema, datum):
+    parsed_schema = fastavro.parse_schema(schema)
+    validator = compile_validator(parsed_schema)
+
+    try:
+        fastavro_result = validate(datum, parsed_schema, raise_errors=False)
+    except ValueError:
+        with pytest.raises(ValueError):
+            validator(datum)
+        return
+
+    if fastavro_result:
+        validator(datum)
+    else:
+        with pytest.raises(ValidationError):
+            validator(datum)
+
+
+def test_compiled_validator_validates_logical_types_without_parsing_their_schemas():
+    parsed_schema = fastavro.parse_schema(
+        {
+            "type": "array",
+            "items": {
+                "type": "record",
+                "name": "sample",
+                "fields": [
+                    {"name": "id", "type": {"type": "string", "logicalType": "uuid"}},
+                    {"name": "created", "type": {"type": "long", "logicalType": "timestamp-millis"}},
+                ],
+            },
+        }
+    )
+    validator = compile_validator(parsed_schema)
+    samples = [
+        {"id": UUID(int=index), "created": datetime.datetime(2022, 1, 1, tzinfo=datetime.timezone.utc)}
+        for index in range(96)
+    ]
+
+    with patch("lab_share_lib.rabbit.schema_validator.validate") as fastavro_validate:
+        validator(samples)
+
+    # fastavro's validate parses the schema it is given on every call.
+    fastavro_validate.assert_not_called()
+
+
+def test_compiled_validator_raises_the_fastavro_validation_error():
+    validator = compile_validator(SCHEMA)
+
+    with pytest.raises(ValidationError) as ex_info:
+        validator(plate(status="LOST"))
+
+    assert "lab.plate.status" in str(ex_info.value)
+
+
+@pytest.mark.parametrize(
+    "schema, datum",
+    [
+        ("string", "text"),
+        (["null", "int"], None),
+        ({"type": "map", "values": ["null", "string"]}, {"a": None, "b": "c"}),
+        ({"type": "bytes", "logicalType": "decimal", "precision": 4, "scale": 2}, Decimal("12.34")),
+    ],
+)
+def test_compiled_validator_handles_schemas_that_are_not_records(schema, datum):
+    compile_validator(fastavro.parse_schema(schema))(datum)
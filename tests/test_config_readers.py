@@ -13,6 +13,12 @@ def schema_registry_class():
         yield schema_registry
 
 
+@pytest.fixture
+def file_schema_registry_class():
+    with patch("lab_share_lib.config_readers.FileSchemaRegistry") as file_schema_registry:
+        yield file_schema_registry
+
+
 @pytest.fixture
 def basic_publisher_class():
     with patch("lab_share_lib.config_readers.BasicPublisher") as basic_publisher:
@@ -31,6 +37,35 @@ def test_get_redpanda_schema_registry(config, schema_registry_class):
     schema_registry_class.assert_called_once_with(config.REDPANDA_BASE_URI)
 
 
+def test_get_redpanda_schema_registry_with_a_snapshot_dir(config, schema_registry_class):
+    config.REDPANDA_SCHEMA_SNAPSHOT_DIR = "/var/cache/schemas"
+
+    get_redpanda_schema_registry(config)
+
+    schema_registry_class.assert_called_once_with(config.REDPANDA_BASE_URI, snapshot_dir="/var/cache/schemas")
+
+
+def test_get_redpanda_schema_registry_with_a_hedge_percentile(config, schema_registry_class):
+    config.REDPANDA_BASE_URI = ["http://redpanda-1", "http://redpanda-2"]
+    config.REDPANDA_HEDGE_PERCENTILE = 90.0
+
+    get_redpanda_schema_registry(config)
+
+    schema_registry_class.assert_called_once_with(["http://redpanda-1", "http://redpanda-2"], hedge_percentile=90.0)
+
+
+def test_get_redpanda_schema_registry_with_a_schema_files_dir(
+    config, schema_registry_class, file_schema_registry_class
+):
+    config.REDPANDA_SCHEMA_FILES_DIR = "/var/lib/schemas"
+
+    actual = get_redpanda_schema_registry(config)
+
+    assert actual == file_schema_registry_class.return_value
+    file_schema_registry_class.assert_called_once_with("/var/lib/schemas")
+    schema_registry_class.assert_not_called()
+
+
 def test_get_basic_publisher(
     rabbit_server_details,
     config,
@@ -43,3 +78,34 @@ def test_get_basic_publisher(
     basic_publisher_class.assert_called_once_with(
         rabbit_server_details, config.RABBITMQ_PUBLISH_RETRY_DELAY, config.RABBITMQ_PUBLISH_RETRIES
     )
+
+
+def test_get_basic_publisher_with_an_outbox_path(rabbit_server_details, config, basic_publisher_class):
+    config.RABBITMQ_PUBLISH_OUTBOX_PATH = "/var/lib/outbox"
+
+    with patch("lab_share_lib.config_readers.get_publish_outbox") as get_publish_outbox:
+        actual = get_basic_publisher(rabbit_server_details, config)
+
+    assert actual == basic_publisher_class.return_value
+    get_publish_outbox.assert_called_once_with("/var/lib/outbox", rabbit_server_details)
+    basic_publisher_class.assert_called_once_with(
+        rabbit_server_details,
+        config.RABBITMQ_PUBLISH_RETRY_DELAY,
+        config.RABBITMQ_PUBLISH_RETRIES,
+        outbox=get_publish_outbox.return_value,
+    )
+
+
+def test_get_basic_publisher_with_blocked_connection_options(rabbit_server_details, config, basic_publisher_class):
+    config.RABBITMQ_BLOCKED_CONNECTION_TIMEOUT = 30.0
+    config.RABBITMQ_PUBLISH_BLOCKED_BUFFER_SIZE = 100
+
+    get_basic_publisher(rabbit_server_details, config)
+
+    basic_publisher_class.assert_called_once_with(
+        rabbit_server_details,
+        config.RABBITMQ_PUBLISH_RETRY_DELAY,
+        config.RABBITMQ_PUBLISH_RETRIES,
+        blocked_connection_timeout=30.0,
+        blocked_buffer_size=100,
+    )